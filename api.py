@@ -0,0 +1,242 @@
+"""
+api.py
+
+API JSON dos KPIs, ao lado do dashboard, para ferramentas de BI e para o
+channel manager: os mesmos dados e a mesma lógica de app.py, sem a camada
+de gráficos. Exemplo:
+  uvicorn api:api --host 0.0.0.0 --port 8060
+
+Endpoints (GET):
+  /api/hoteis        hotéis disponíveis
+  /api/kpis          KPIs do período (?hotel=&inicio=&fim=&ano=&mes=; hotel=portfolio soma todos
+                     e traz os *_medio, médias dos cards de um hotel, como null)
+  /api/tipos-quarto  reservas por tipo de quarto no período (mesmos filtros, um hotel)
+  /api/reservas      reservas paginadas (?hotel=&page=&size=&ordenar=&direcao=&filtro=)
+
+Os handlers são assíncronos: o cálculo (pandas/numpy ou banco) roda no pool de
+threads e o loop de eventos segue atendendo as demais requisições. Threads, e
+não processos, porque as partições ficam na memória deste processo; para usar
+vários núcleos, suba vários workers (uvicorn --workers N).
+
+Cada resposta leva um ETag (hash do corpo). Com If-None-Match igual, a resposta
+é 304, sem corpo. Os corpos ficam em um cache LRU por versão dos dados: as
+linhas novas dos CSVs (procuradas a cada INTERVALO_ATUALIZACAO_SEGUNDOS) mudam a
+versão e, se mudarem os números, também o ETag.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+from datetime import date
+from typing import Optional
+
+import pandas as pd
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi_pagination import Page, Params
+from starlette.concurrency import run_in_threadpool
+
+import app as dashboard
+from data_processing import process_data, reservas
+from utils.cache import CacheLRU
+
+# Valor do parâmetro 'hotel' para a visão consolidada (PORTFOLIO no dashboard)
+PORTFOLIO_API = 'portfolio'
+
+# Limites usados quando só uma das datas do intervalo é informada
+DATA_MINIMA = date(1900, 1, 1)
+DATA_MAXIMA = date(2200, 12, 31)
+
+# Cache das respostas serializadas (corpo, ETag) por versão, caminho e parâmetros
+CACHE_RESPOSTAS_MAX_ITENS = 2048
+CACHE_RESPOSTAS_MAX_MB = 32
+
+cache_respostas = CacheLRU(
+    max_itens=CACHE_RESPOSTAS_MAX_ITENS,
+    ttl=dashboard.CACHE_TTL_SEGUNDOS,
+    max_bytes=CACHE_RESPOSTAS_MAX_MB * 1024 * 1024,
+)
+
+def _limpar(valor):
+    """
+    Converte o resultado para tipos do JSON: escalares do numpy viram números
+    do Python, NaN/infinito viram null e datas viram texto ISO.
+    """
+    if isinstance(valor, dict):
+        return {str(k): _limpar(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_limpar(v) for v in valor]
+    if isinstance(valor, (pd.Timestamp, date)):
+        return valor.strftime('%Y-%m-%d')
+    if hasattr(valor, 'item'):
+        valor = valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None
+    return valor
+
+def serializar(calcular, *args):
+    """Executa `calcular(*args)` e serializa o resultado: (corpo em bytes, ETag)."""
+    corpo = json.dumps(_limpar(calcular(*args)), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return corpo, f'"{hashlib.sha1(corpo).hexdigest()}"'
+
+def etag_confere(cabecalho, etag):
+    """Se o If-None-Match do cliente inclui o ETag atual (aceita '*' e ETags fracos 'W/')."""
+    if not cabecalho:
+        return False
+    candidatos = [c.strip() for c in cabecalho.split(',')]
+    return '*' in candidatos or any(c.removeprefix('W/') == etag for c in candidatos)
+
+async def responder(request, calcular, *args):
+    """
+    Resposta JSON de `calcular(dados, *args)`, calculada no pool de threads na
+    primeira vez e depois servida pelo cache de respostas; 304 se o cliente já
+    tem o mesmo corpo.
+    """
+    atual = dashboard.dados
+    chave = (atual['versao'], request.url.path, tuple(sorted(request.query_params.multi_items())))
+    encontrado, item = cache_respostas.obter(chave)
+    if not encontrado:
+        item = await run_in_threadpool(serializar, calcular, atual, *args)
+        cache_respostas.guardar(chave, item)
+    corpo, etag = item
+    cabecalhos = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if etag_confere(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=cabecalhos)
+    return Response(corpo, media_type='application/json', headers=cabecalhos)
+
+def escolher_hotel(atual, hotel, portfolio=True):
+    """
+    Hotel pedido (ou o padrão do dashboard); 'portfolio' vira PORTFOLIO quando
+    permitido. Hotel desconhecido: 404.
+    """
+    if hotel is None:
+        return dashboard.hotel_padrao(atual) if portfolio else next(iter(atual['hoteis']))
+    if hotel == PORTFOLIO_API and portfolio:
+        return dashboard.PORTFOLIO
+    if hotel not in atual['hoteis']:
+        raise HTTPException(status_code=404, detail=f"Hotel desconhecido: {hotel}")
+    return hotel
+
+def filtros_periodo(inicio, fim, ano, mes):
+    """Filtros no formato do dashboard: (ano, mês, data inicial, data final)."""
+    if inicio or fim:
+        inicio, fim = inicio or DATA_MINIMA, fim or DATA_MAXIMA
+        if inicio > fim:
+            raise HTTPException(status_code=422, detail="'inicio' deve ser anterior ou igual a 'fim'")
+        return ano, mes, inicio.isoformat(), fim.isoformat()
+    return ano, mes, None, None
+
+def validar_filtro(filtro):
+    """
+    Filtro de reservas com condição não interpretável, coluna desconhecida ou
+    operador/valor que não cabe no tipo da coluna: 422, em vez de a condição
+    ser ignorada (como na linha de filtro do dashboard).
+    """
+    invalidas = reservas.condicoes_invalidas(filtro, {c['id']: c['type'] for c in dashboard.COLUNAS_EXPLORADOR})
+    if invalidas:
+        raise HTTPException(status_code=422, detail=f"Condições de filtro inválidas: {'; '.join(invalidas)}")
+
+def descrever_periodo(filtros):
+    selected_year, selected_month, start_date, end_date = filtros
+    return {'ano': selected_year, 'mes': selected_month, 'inicio': start_date, 'fim': end_date}
+
+def parametros_periodo(
+    inicio: Optional[date] = Query(None, description='Data inicial (AAAA-MM-DD, inclusive)'),
+    fim: Optional[date] = Query(None, description='Data final (AAAA-MM-DD, inclusive)'),
+    ano: Optional[int] = Query(None, ge=1900, le=2200),
+    mes: Optional[int] = Query(None, ge=1, le=12),
+):
+    return filtros_periodo(inicio, fim, ano, mes)
+
+def calcular_hoteis(atual):
+    return {
+        'portfolio': len(atual['hoteis']) > 1,
+        'hoteis': [{'id': hotel, 'nome': h['nome']} for hotel, h in atual['hoteis'].items()],
+    }
+
+def calcular_kpis(atual, hotel, filtros):
+    return {
+        'hotel': PORTFOLIO_API if hotel == dashboard.PORTFOLIO else hotel,
+        'periodo': descrever_periodo(filtros),
+        'kpis': dashboard.kpis_periodo(atual, hotel, *filtros),
+    }
+
+def calcular_tipos_quarto(atual, hotel, filtros):
+    tipos = dashboard.tipos_quarto_hotel(atual, hotel, *filtros)
+    return {
+        'hotel': hotel,
+        'periodo': descrever_periodo(filtros),
+        'tipos': [{'tipo': t, 'reservas': q} for t, q in zip(tipos['Tipo'], tipos['Quantidade'])],
+    }
+
+def registros_reservas(pagina):
+    """Linhas de uma página de reservas com os valores brutos (datas em ISO)."""
+    registros = pd.DataFrame({c['id']: process_data.coluna(pagina, c['id']).to_numpy()
+                              for c in dashboard.COLUNAS_EXPLORADOR})
+    registros['data'] = pd.to_datetime(process_data.coluna(pagina, 'data')).dt.strftime('%Y-%m-%d').to_numpy()
+    return registros.to_dict('records')
+
+def calcular_reservas(atual, hotel, params, ordenacao, filtro):
+    linhas, total = dashboard.consultar_reservas_hotel(hotel, params.page - 1, params.size, ordenacao, filtro)
+    return Page.create(registros_reservas(linhas), params, total=total).dict()
+
+async def atualizar_periodicamente():
+    """Procura linhas novas nos CSVs a cada INTERVALO_ATUALIZACAO_SEGUNDOS (como o dashboard)."""
+    while True:
+        await asyncio.sleep(dashboard.INTERVALO_ATUALIZACAO_SEGUNDOS)
+        try:
+            if await run_in_threadpool(dashboard.atualizar_dados):
+                print(f"Novos dados incorporados (versão {dashboard.dados['versao']})")
+        except Exception as e:
+            print(f"Erro ao verificar novos dados: {e}")
+
+def create_api():
+    """
+    Monta a aplicação FastAPI. Os dados são carregados na inicialização (no pool
+    de threads), antes de a primeira requisição ser atendida.
+    """
+    api = FastAPI(title='Hotel Dashboard API', description='KPIs, tipos de quarto e reservas em JSON')
+    tarefas = []
+
+    @api.on_event('startup')
+    async def iniciar():
+        await run_in_threadpool(dashboard.garantir_dados)
+        tarefas.append(asyncio.create_task(atualizar_periodicamente()))
+
+    @api.on_event('shutdown')
+    async def encerrar():
+        for tarefa in tarefas:
+            tarefa.cancel()
+
+    @api.get('/api/hoteis')
+    async def hoteis(request: Request):
+        return await responder(request, calcular_hoteis)
+
+    @api.get('/api/kpis')
+    async def kpis(request: Request, hotel: Optional[str] = None, filtros=Depends(parametros_periodo)):
+        return await responder(request, calcular_kpis, escolher_hotel(dashboard.dados, hotel), filtros)
+
+    @api.get('/api/tipos-quarto')
+    async def tipos_quarto(request: Request, hotel: Optional[str] = None, filtros=Depends(parametros_periodo)):
+        return await responder(request, calcular_tipos_quarto,
+                                escolher_hotel(dashboard.dados, hotel, portfolio=False), filtros)
+
+    @api.get('/api/reservas')
+    async def reservas(
+        request: Request,
+        hotel: Optional[str] = None,
+        params: Params = Depends(),
+        ordenar: str = Query('data', description='Coluna de ordenação'),
+        direcao: str = Query('desc', regex='^(asc|desc)$'),
+        filtro: Optional[str] = Query(None, description="Filtro na sintaxe do explorador, ex.: {valor_diaria} > 1000"),
+    ):
+        if ordenar not in {c['id'] for c in dashboard.COLUNAS_EXPLORADOR}:
+            raise HTTPException(status_code=422, detail=f"Coluna de ordenação desconhecida: {ordenar}")
+        validar_filtro(filtro)
+        ordenacao = [{'column_id': ordenar, 'direction': direcao}]
+        return await responder(request, calcular_reservas,
+                               escolher_hotel(dashboard.dados, hotel, portfolio=False), params, ordenacao, filtro)
+
+    return api
+
+api = create_api()
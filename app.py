@@ -1,14 +1,23 @@
 import dash
+import flask
+import os
+import functools
+import hashlib
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dash import dcc, html, dash_table
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+import numpy as np
 import pandas as pd
 import dash_bootstrap_components as dbc
-from babel.numbers import format_currency
 
 # Módulos auxiliares
 from components import card, table, progress_list
-from utils import helpers
-from data_processing import process_data
+from utils import formatacao, kpis, instrumentacao
+from utils.cache import CacheLRU
+from data_processing import process_data, agregados, reservas, paralelo, previsao, relatorios
 from visualizations import charts
 
 # ------------------------------------------------
@@ -17,6 +26,49 @@ from visualizations import charts
 
 DATA_FILE = "data/hotel_luxo_jan2000_dez2024.csv"
 
+# Armazenamento: sem URL, o CSV fica em memória (DataFrame + cubo); com uma URL
+# SQLAlchemy (ex.: sqlite:///data/hotel.sqlite3, mysql+mysqlconnector://...), o CSV
+# é carregado no banco e filtros e agregações viram consultas SQL
+# (ver data_processing/armazenamento.py).
+URL_BANCO = os.environ.get('HOTEL_DB_URL')
+if URL_BANCO:
+    # O SQLAlchemy (~0,2 s para importar) só é carregado com o backend SQL
+    from data_processing import armazenamento
+
+# Momento da carga dos dados:
+#   'imediata' (padrão): em create_app, antes de atender requisições (com o
+#              preload_app do gunicorn, uma vez no mestre, compartilhada pelos workers)
+#   'fundo':   em uma thread iniciada por create_app, que também monta o conteúdo
+#              inicial (gráficos e cards ficam no cache); o processo já atende
+#   'adiada':  na primeira requisição
+# Nos dois últimos, a página abre logo e o conteúdo principal espera o fim da carga.
+MODO_CARGA = os.environ.get('HOTEL_CARGA', 'imediata')
+
+# Portfólio: um CSV por hotel nesta pasta (o nome do arquivo identifica o hotel).
+# Sem a pasta, o dashboard mostra apenas DATA_FILE.
+PASTA_HOTEIS = os.environ.get('HOTEL_PASTA_HOTEIS', 'data/hoteis')
+
+# Hotéis com as reservas (DataFrame + índice) em memória ao mesmo tempo; os demais
+# mantêm só o cubo de agregados (alguns MB), que basta para o portfólio
+MAX_HOTEIS_EM_MEMORIA = int(os.environ.get('HOTEL_MAX_HOTEIS_EM_MEMORIA', 4))
+
+# Valor do seletor de hotel para a visão consolidada de todos os hotéis
+PORTFOLIO = '__portfolio__'
+
+# Processos para a carga inicial: cubo calculado por ano e, com vários hotéis,
+# resumos calculados por hotel (ver data_processing/paralelo.py). 1 = em série.
+PROCESSOS_CARGA = int(os.environ.get('HOTEL_PROCESSOS', os.cpu_count() or 1))
+
+# CSVs acima deste tamanho são ingeridos em blocos: o cache colunar e o cubo são
+# montados com a memória limitada pelo bloco. Sem URL_BANCO, as reservas do hotel
+# ainda ficam inteiras em memória (lidas do cache colunar), e o pico de memória
+# acompanha o tamanho do arquivo; com URL_BANCO, nada do histórico fica em memória.
+LIMITE_LEITURA_UNICA_MB = 256
+TAMANHO_BLOCO_CSV = 250_000
+
+# Intervalo para procurar linhas acrescentadas ao CSV (carga incremental)
+INTERVALO_ATUALIZACAO_SEGUNDOS = 60
+
 MENU_ITEMS = [
     {"label": "Visão Geral", "href": "/"},
     {"label": "Desempenho de Reservas", "href": "/desempenho-reservas"},
@@ -28,25 +80,87 @@ MENU_ITEMS = [
     {"label": "Configurações", "href": "/configuracoes"},
 ]
 
-def load_data():
+# Precisão das colunas de KPIs (np.float32 reduz a memória pela metade)
+PRECISAO_KPIS = np.float64
+
+# Reservas em memória na forma compacta (process_data.compactar): só as colunas de
+# cada reserva, categorias e float32; os valores do dia ficam no cubo
+DADOS_COMPACTOS = os.environ.get('HOTEL_DADOS_COMPACTOS', '0') == '1'
+
+# Cache das partes do conteúdo principal por combinação de filtros
+CACHE_MAX_ITENS = 128
+CACHE_TTL_SEGUNDOS = 3600
+CACHE_MAX_MB = 64
+
+# Orçamento de pontos do gráfico de linhas (~ largura do gráfico em pixels)
+PONTOS_GRAFICO_LINHA = 2000
+
+# Reservas recentes: linhas por página (k) e opções oferecidas na tela
+RESERVAS_POR_PAGINA = 5
+OPCOES_RESERVAS_POR_PAGINA = [5, 10, 25, 50, 100]
+
+# Explorador de reservas (/desempenho-reservas): linhas por página e colunas exibidas
+EXPLORADOR_POR_PAGINA = 25
+COLUNAS_EXPLORADOR = [
+    {'name': 'Registro', 'id': 'id_registro', 'type': 'numeric'},
+    {'name': 'Data', 'id': 'data', 'type': 'datetime'},
+    {'name': 'Cliente', 'id': 'nome_cliente', 'type': 'text'},
+    {'name': 'Quarto', 'id': 'tipo_de_quarto', 'type': 'text'},
+    {'name': 'Pagamento', 'id': 'forma_de_pagamento', 'type': 'text'},
+    {'name': 'Quartos', 'id': 'quantidade_quartos', 'type': 'numeric'},
+    {'name': 'Diárias', 'id': 'quantidade_diarias', 'type': 'numeric'},
+    {'name': 'Valor Diária', 'id': 'valor_diaria', 'type': 'numeric'},
+    {'name': 'Valor Diárias', 'id': 'valor_total_diarias', 'type': 'numeric'},
+    {'name': 'Total Pago', 'id': 'total_pago', 'type': 'numeric'},
+]
+COLUNAS_EXPLORADOR_BRL = ['valor_diaria', 'valor_total_diarias', 'total_pago']
+
+# Previsão de demanda (data_processing/previsao.py): horizontes oferecidos (dias)
+# e dias de histórico exibidos antes da previsão
+HORIZONTES_PREVISAO = [30, 90, 180, 365]
+HISTORICO_PREVISAO_DIAS = 730
+OPCOES_SERIE_PREVISAO = [
+    {'label': 'Quartos ocupados', 'value': 'quartos_ocupados_dia'},
+    {'label': 'Receita de quartos', 'value': 'receita_quartos_dia'},
+]
+
+# Relatórios financeiros (data_processing/relatorios.py): gerados em threads à parte,
+# gravados nesta pasta (compartilhada pelos workers) e apagados depois da validade
+PASTA_RELATORIOS = os.environ.get('HOTEL_PASTA_RELATORIOS', os.path.join(tempfile.gettempdir(), 'hotel_relatorios'))
+RELATORIOS_SIMULTANEOS = 2
+RELATORIOS_VALIDADE_SEGUNDOS = 3600
+INTERVALO_RELATORIO_MS = 1000
+
+cache_conteudo = CacheLRU(
+    max_itens=CACHE_MAX_ITENS,
+    ttl=CACHE_TTL_SEGUNDOS,
+    max_bytes=CACHE_MAX_MB * 1024 * 1024,
+)
+
+def load_data(file_path=DATA_FILE, colunas=process_data.COLUNAS_DASHBOARD, ate=None):
     """
-    Carrega o DataFrame do arquivo CSV e processa; se falhar, encerra.
+    Carrega o DataFrame do arquivo CSV (até o byte `ate`, se informado) e processa; se falhar, encerra.
     """
-    df = process_data.load_and_process_data(DATA_FILE)
+    df = process_data.load_and_process_data(file_path, colunas=colunas, ate=ate)
     if df is None:
         print("Erro ao carregar os dados. O aplicativo não pode continuar.")
         exit()
-    return df
+    return process_data.indexar_por_data(df)
 
 def calculate_metrics(df):
     """
     Calcula métricas (Ocupacao, ADR, RevPAR etc.) e as adiciona ao DataFrame.
+    Os KPIs derivados vêm de utils.kpis, em uma única chamada vetorizada e com
+    divisões por zero resultando em 0.
     """
     try:
-        df['Ocupacao'] = helpers.calcular_ocupacao(df['quartos_ocupados_dia'], df['total_quartos'])
-        df['ADR'] = helpers.calcular_adr(df['receita_quartos_dia'], df['quartos_ocupados_dia'])
-        df['RevPAR'] = helpers.calcular_revpar(df['ADR'], df['Ocupacao'])
-        df['TRevPAR'] = helpers.calcular_trevpar(df['receita_total_dia'], df['total_quartos'])
+        matriz = kpis.calcular_kpis(
+            df['quartos_ocupados_dia'], df['total_quartos'],
+            df['receita_quartos_dia'], df['receita_total_dia'],
+            dtype=PRECISAO_KPIS,
+        )
+        for nome, valores in kpis.como_colunas(matriz).items():
+            df[nome] = valores
         df['GOP'] = df['lucro_operacional_bruto_dia']
         df['GOPPAR'] = df['goppar_dia']
         return df
@@ -54,30 +168,344 @@ def calculate_metrics(df):
         print(f"Erro ao calcular as métricas: {e}")
         exit()
 
-def prepare_table_data(df):
+def posicoes_recentes(intervalos, k, deslocamento=0):
     """
-    Retorna apenas 5 reservas recentes (nome_cliente, data, tipo_de_quarto, valor_total_diarias).
-    Converte datas e formata valores para BRL.
+    Posições das k linhas mais recentes, em ordem decrescente de data, pulando as
+    `deslocamento` primeiras (paginação). `intervalos` são faixas [a, b) de posições
+    de um DataFrame ordenado por data, em ordem crescente: as linhas são lidas do
+    fim de cada faixa, em O(k), sem ordenar nem copiar o restante.
     """
-    data_tabela = df[['nome_cliente', 'data', 'tipo_de_quarto', 'valor_total_diarias']].copy()
-    data_tabela['data'] = pd.to_datetime(data_tabela['data'])
-    data_tabela = data_tabela.sort_values(by='data', ascending=False)
-    data_tabela['data'] = data_tabela['data'].dt.strftime('%d/%m/%Y')
-    data_tabela['valor_total_diarias'] = data_tabela['valor_total_diarias'].apply(
-        lambda x: format_currency(x, 'BRL', locale='pt_BR')
-    )
-    return data_tabela.head(5)
+    posicoes = []
+    for a, b in reversed(intervalos):
+        if deslocamento >= b - a:
+            deslocamento -= b - a
+            continue
+        fim = b - deslocamento
+        deslocamento = 0
+        ini = max(a, fim - (k - len(posicoes)))
+        posicoes.extend(range(fim - 1, ini - 1, -1))
+        if len(posicoes) >= k:
+            break
+    return np.array(posicoes, dtype=np.int64)
+
+def contar_paginas(intervalos, k):
+    """
+    Número de páginas de k linhas nas faixas de posições (ao menos 1).
+    """
+    total = sum(b - a for a, b in intervalos)
+    return max(1, -(-total // k))
+
+def prepare_table_data(df, k=RESERVAS_POR_PAGINA, pagina=0, intervalos=None):
+    """
+    Retorna as k reservas mais recentes da página `pagina` (nome_cliente, data,
+    tipo_de_quarto, valor_total_diarias), com datas e valores formatados para BRL.
 
+    Com o DataFrame ordenado por data (process_data.indexar_por_data), as linhas
+    vêm do fim de `intervalos` (padrão: o DataFrame inteiro), em O(k). Sem essa
+    ordenação, usa seleção parcial (argpartition) sobre as datas em int64, em O(n).
+    """
+    if intervalos is None:
+        intervalos = [(0, len(df))]
+    deslocamento = pagina * k
+    if isinstance(df.index, pd.DatetimeIndex) and df.index.is_monotonic_increasing:
+        posicoes = posicoes_recentes(intervalos, k, deslocamento)
+    else:
+        candidatas = np.concatenate([np.arange(a, b) for a, b in intervalos] or [np.arange(0)])
+        datas = pd.to_datetime(df['data']).to_numpy(dtype='datetime64[ns]').view(np.int64)[candidatas]
+        n = min(deslocamento + k, len(candidatas))
+        if n <= deslocamento:
+            posicoes = np.arange(0)
+        else:
+            topo = np.argpartition(-datas, n - 1)[:n] if n < len(candidatas) else np.arange(len(candidatas))
+            topo = topo[np.argsort(-datas[topo], kind='stable')]
+            posicoes = candidatas[topo[deslocamento:]]
+
+    return formatar_tabela_reservas(df.iloc[posicoes])
+
+def formatar_tabela_reservas(linhas):
+    """
+    Colunas da tabela de reservas recentes, com datas e valores formatados.
+    """
+    return pd.DataFrame({
+        'nome_cliente': linhas['nome_cliente'].to_numpy(),
+        'data': pd.to_datetime(process_data.coluna(linhas, 'data')).dt.strftime('%d/%m/%Y').to_numpy(),
+        'tipo_de_quarto': linhas['tipo_de_quarto'].to_numpy(),
+        'valor_total_diarias': formatacao.formatar_brl_array(linhas['valor_total_diarias']),
+    })
+
+@instrumentacao.medido('prepare_donut_chart_data', linhas=lambda rosca, df: len(df))
 def prepare_donut_chart_data(df):
     """
     Prepara dados para um gráfico de rosca, contando 'tipo_de_quarto'.
     """
     data_rosca = df['tipo_de_quarto'].value_counts().reset_index()
     data_rosca.columns = ['Tipo', 'Quantidade']
-    return data_rosca
+    # Colunas categóricas listam também as categorias ausentes no filtro (contagem 0)
+    return data_rosca[data_rosca['Quantidade'] > 0]
+
+# Geração dos relatórios financeiros, fora das threads que atendem as requisições
+executor_relatorios = ThreadPoolExecutor(max_workers=RELATORIOS_SIMULTANEOS, thread_name_prefix='relatorio')
+
+# Registro dos dados em uso: hotéis descobertos, partições carregadas (DataFrame,
+# índice de reservas, cubo e posição de leitura do CSV de cada hotel) e resumos
+# (só o cubo) dos hotéis cujas reservas não estão em memória. A versão identifica
+# o conteúdo (ver calcular_versao).
+# É sempre substituído por inteiro (uma única atribuição), nunca alterado no lugar,
+# para que cada callback enxergue um estado consistente.
+dados = None
+trava_dados = threading.Lock()
+
+# Último acesso a cada partição, para descartar a usada há mais tempo
+ultimo_acesso = {}
+
+# Carga inicial (garantir_dados): concluída uma única vez por processo
+trava_carga = threading.Lock()
+carga_concluida = threading.Event()
+
+def publicar(versao=None, **partes):
+    """
+    Publica uma cópia do registro com `partes` substituídas. Com uma nova
+    `versao`, o conteúdo dos dados mudou e o cache de conteúdo é limpo.
+    """
+    global dados
+    novo = dict(dados, **partes)
+    mudou = versao is not None and versao != novo['versao']
+    if mudou:
+        novo['versao'] = versao
+    dados = novo
+    if mudou:
+        cache_conteudo.limpar()
+
+def calcular_versao(atual):
+    """
+    Versão dos dados: hash da posição de leitura (e da assinatura) do CSV de
+    cada hotel já incorporada. Com URL_BANCO, as do banco, comum a todos os
+    processos; em memória, as das partições e resumos, e o fim atual do arquivo
+    para os hotéis ainda não carregados (que seriam lidos até ali).
+
+    Não é um contador de cada processo: os workers do gunicorn, que incorporam
+    as linhas novas cada um por si, chegam à mesma versão quando leram os mesmos
+    bytes, e o navegador não redesenha a cada requisição atendida por outro worker.
+    """
+    if atual['motor'] is not None:
+        carregadas = armazenamento.posicoes_carregadas(atual['motor'])
+        posicoes = {hotel: carregadas.get(os.path.abspath(h['arquivo'])) for hotel, h in atual['hoteis'].items()}
+    else:
+        posicoes = {}
+        for hotel, h in atual['hoteis'].items():
+            particao = atual['particoes'].get(hotel) or atual['resumos'].get(hotel)
+            if particao is None:
+                offset = process_data.fim_ultima_linha(h['arquivo'])
+                posicoes[hotel] = (offset, process_data.assinatura_trecho(h['arquivo'], offset))
+            else:
+                posicoes[hotel] = (particao['offset'], particao['assinatura'])
+    return hashlib.sha1(repr(sorted(posicoes.items())).encode()).hexdigest()[:12]
+
+def montar_particao(hotel, df, cubo, offset, assinatura, motor=None):
+    """
+    Partição de um hotel. Com o backend SQL, `df` e `cubo` são None e as
+    consultas vão ao `motor`; em um resumo, só `df` é None.
+    """
+    return {'hotel': hotel, 'df': df, 'cubo': cubo, 'offset': offset, 'assinatura': assinatura,
+            'motor': motor, 'reservas': reservas.construir_indice(df) if df is not None else None}
+
+def ler_particao(hotel, completa=True):
+    """
+    Carrega o CSV do hotel, calcula as métricas e o cubo de agregados.
+    CSVs grandes passam antes pela ingestão em blocos, que monta o cache colunar
+    e o cubo sem ler o arquivo inteiro de uma vez; a partição completa, porém,
+    guarda todas as reservas, lidas de uma vez do cache colunar (só o backend
+    SQL, URL_BANCO, limita essa memória).
+    Com `completa=False` monta só o resumo (cubo), lendo do cache colunar
+    apenas as colunas de que o cubo precisa. Com DADOS_COMPACTOS, as reservas
+    ficam na forma compacta depois de montado o cubo.
+    """
+    arquivo = dados['hoteis'][hotel]['arquivo']
+    if dados['motor'] is not None:
+        armazenamento.sincronizar(dados['motor'], arquivo, calculate_metrics, TAMANHO_BLOCO_CSV, hotel)
+        return montar_particao(hotel, None, None, None, None, dados['motor'])
+
+    # Todas as leituras param no fim da última linha completa neste momento:
+    # linhas acrescentadas depois são incorporadas por atualizar_dados(), a
+    # partir deste offset, sem serem lidas duas vezes
+    offset = process_data.fim_ultima_linha(arquivo)
+    assinatura = process_data.assinatura_trecho(arquivo, offset)
+
+    diarias = []
+    if process_data.deve_ingerir_em_blocos(arquivo, LIMITE_LEITURA_UNICA_MB * 1024 * 1024, offset):
+        # Cada bloco é reduzido à sua tabela diária e descartado
+        process_data.ingerir_em_blocos(
+            arquivo, TAMANHO_BLOCO_CSV,
+            ao_bloco=lambda bloco: diarias.append(agregados.construir_tabela_diaria(calculate_metrics(bloco))),
+            ate=offset,
+        )
+        if completa:
+            print(f"Aviso: as reservas de '{arquivo}' ({offset / 1024 / 1024:.0f} MB de CSV) ficam inteiras "
+                  "em memória; para limitar a memória, use o backend SQL (HOTEL_DB_URL).")
+
+    df = calculate_metrics(load_data(arquivo, ate=offset)) if completa else None
+    if diarias:
+        cubo = agregados.cubo_de_diaria(agregados.combinar_diarias(diarias))
+    elif df is not None:
+        cubo = paralelo.construir_cubo(df, PROCESSOS_CARGA)
+    else:
+        cubo = agregados.construir_cubo(calculate_metrics(load_data(arquivo, agregados.COLUNAS_ORIGEM, offset)))
+    if df is not None and DADOS_COMPACTOS:
+        df = process_data.compactar(df)
+    process_data.devolver_memoria()
+    return montar_particao(hotel, df, cubo, offset, assinatura)
+
+def carregar_dados():
+    """
+    Descobre os hotéis (process_data.descobrir_hoteis) e recomeça o registro.
+    As partições são carregadas na primeira vez em que são pedidas
+    (obter_particao); com um único hotel, a dele é carregada já aqui, antes do
+    fork dos workers (ver create_app).
+
+    Com vários hotéis e PROCESSOS_CARGA > 1, os resumos (cubos) de todos são
+    montados aqui, um processo por hotel: o portfólio, visão inicial, precisa
+    de todos, e os workers os herdam em vez de cada um montá-los em série.
+
+    Com URL_BANCO, o CSV de cada hotel é sincronizado com o banco (carga completa
+    na primeira vez) e nada do histórico fica em memória.
+    """
+    global dados
+    motor = dados['motor'] if dados else None
+    if URL_BANCO and motor is None:
+        motor = armazenamento.criar_motor(URL_BANCO)
+    hoteis = process_data.descobrir_hoteis(PASTA_HOTEIS, DATA_FILE)
+    dados = {'versao': None, 'hoteis': hoteis, 'motor': motor, 'particoes': {}, 'resumos': {}}
+    cache_conteudo.limpar()
+    if len(hoteis) == 1:
+        obter_particao(next(iter(hoteis)))
+    elif PROCESSOS_CARGA > 1 and motor is None:
+        resumos = paralelo.mapear(functools.partial(ler_particao, completa=False), hoteis, PROCESSOS_CARGA)
+        publicar(resumos=dict(zip(hoteis, resumos)))
+    publicar(versao=calcular_versao(dados))
+
+def garantir_dados(aquecer=False):
+    """
+    Registro de dados, carregado agora (uma única vez, mesmo com várias threads
+    pedindo ao mesmo tempo) se a carga inicial ainda não terminou.
+    Com `aquecer`, monta também o conteúdo inicial (visão sem filtros do hotel
+    padrão), que fica no cache de conteúdo; quem espera pela carga recebe o
+    layout já pronto.
+    """
+    if not carga_concluida.is_set():
+        with trava_carga:
+            if not carga_concluida.is_set():
+                carregar_dados()
+                if aquecer:
+                    create_main_content(dados)
+                carga_concluida.set()
+    return dados
+
+def carregar_em_fundo():
+    """Carga em segundo plano (MODO_CARGA = 'fundo'), iniciada por create_app."""
+    try:
+        inicio = time.perf_counter()
+        garantir_dados(aquecer=True)
+        print(f"Dados carregados em segundo plano em {time.perf_counter() - inicio:.1f} s")
+    except Exception as e:
+        print(f"Erro ao carregar os dados em segundo plano: {e}")
+
+def obter_particao(hotel):
+    """
+    Partição completa do hotel, carregada na primeira vez em que é pedida.
+    Acima de MAX_HOTEIS_EM_MEMORIA partições em memória, a usada há mais tempo
+    é descartada; o cubo dela continua disponível como resumo (portfólio).
+    """
+    ultimo_acesso[hotel] = time.monotonic()
+    particao = dados['particoes'].get(hotel)
+    if particao is not None:
+        return particao
+
+    with trava_dados:
+        particao = dados['particoes'].get(hotel)
+        if particao is not None:
+            return particao
+        particao = ler_particao(hotel)
+        particoes = dict(dados['particoes'])
+        resumos = {h: r for h, r in dados['resumos'].items() if h != hotel}
+        if particao['motor'] is None:
+            while len(particoes) >= max(1, MAX_HOTEIS_EM_MEMORIA):
+                antiga = min(particoes, key=lambda h: ultimo_acesso.get(h, 0))
+                resumos[antiga] = dict(particoes.pop(antiga), df=None, reservas=None)
+        particoes[hotel] = particao
+        publicar(particoes=particoes, resumos=resumos)
+        return particao
+
+def obter_cubo(hotel):
+    """
+    Cubo de agregados do hotel: o da partição, se carregada; senão o do resumo,
+    montado na primeira vez sem carregar as reservas.
+    """
+    atual = dados
+    particao = atual['particoes'].get(hotel) or atual['resumos'].get(hotel)
+    if particao is not None:
+        return particao['cubo']
+
+    with trava_dados:
+        particao = dados['particoes'].get(hotel) or dados['resumos'].get(hotel)
+        if particao is None:
+            particao = ler_particao(hotel, completa=False)
+            publicar(resumos=dict(dados['resumos'], **{hotel: particao}))
+        return particao['cubo']
+
+def atualizar_particao(particao):
+    """
+    Incorpora à partição (ou ao resumo) as linhas acrescentadas ao CSV do hotel
+    desde a última leitura: só as novas linhas são lidas e têm as métricas
+    calculadas. Se o arquivo foi reescrito, recarrega tudo.
+    Retorna a nova partição, ou None se nada mudou.
+    """
+    hotel = particao['hotel']
+    completa = particao['df'] is not None
+    resultado = process_data.ler_linhas_novas(
+        dados['hoteis'][hotel]['arquivo'], particao['offset'], particao['assinatura'],
+        colunas=process_data.COLUNAS_DASHBOARD if completa else agregados.COLUNAS_ORIGEM,
+    )
+    if resultado is None:
+        return ler_particao(hotel, completa)
+
+    novas, offset, assinatura = resultado
+    if novas.empty:
+        return None
+
+    novas = calculate_metrics(novas)
+    df = process_data.anexar_linhas(particao['df'], novas) if completa else None
+    diaria = agregados.combinar_diarias([particao['cubo']['diario'], agregados.construir_tabela_diaria(novas)])
+    return montar_particao(hotel, df, agregados.cubo_de_diaria(diaria), offset, assinatura)
 
-df = load_data()
-df = calculate_metrics(df)
+def atualizar_dados():
+    """
+    Incorpora as linhas acrescentadas aos CSVs dos hotéis já carregados
+    (partições e resumos); os dados são então trocados de uma vez.
+    Retorna True se a versão dos dados mudou (calcular_versao): com o banco,
+    também quando as linhas foram gravadas nele por outro processo.
+    """
+    with trava_dados:
+        atual = dados
+        novas = {}
+        if atual['motor'] is not None:
+            for hotel in atual['particoes']:
+                armazenamento.sincronizar(
+                    atual['motor'], atual['hoteis'][hotel]['arquivo'], calculate_metrics, TAMANHO_BLOCO_CSV, hotel
+                )
+        else:
+            for grupo in ('particoes', 'resumos'):
+                trocadas = {}
+                for hotel, particao in atual[grupo].items():
+                    nova = atualizar_particao(particao)
+                    if nova is not None:
+                        trocadas[hotel] = nova
+                if trocadas:
+                    novas[grupo] = dict(atual[grupo], **trocadas)
+        versao = calcular_versao(dict(atual, **novas))
+        if versao == atual['versao']:
+            return False
+        publicar(versao=versao, **novas)
+        return True
 
 def format_date_br(date_str):
     """
@@ -121,66 +549,439 @@ def create_sidebar():
     })
     return sidebar
 
+def intervalos_filtrados(df, selected_year=None, selected_month=None, start_date=None, end_date=None):
+    """
+    Faixas [a, b) de posições do DataFrame que atendem aos filtros de ano, mês e
+    datas, em ordem crescente.
+
+    O DataFrame deve estar ordenado e indexado por data (process_data.indexar_por_data):
+    cada filtro vira uma busca binária no índice, sem percorrer o histórico completo.
+    """
+    datas = df.index
+    inicio, fim = 0, len(df)
+
+    if start_date and end_date:
+        inicio = datas.searchsorted(pd.to_datetime(start_date), side='left')
+        fim = datas.searchsorted(pd.to_datetime(end_date), side='right')
+    if selected_year:
+        ano = int(selected_year)
+        inicio = max(inicio, datas.searchsorted(pd.Timestamp(year=ano, month=1, day=1), side='left'))
+        fim = min(fim, datas.searchsorted(pd.Timestamp(year=ano + 1, month=1, day=1), side='left'))
+    if inicio >= fim:
+        return []
+    if not selected_month:
+        return [(inicio, fim)]
+
+    # O mesmo mês em vários anos: uma faixa por ano dentro de [inicio, fim)
+    mes = int(selected_month)
+    faixas = []
+    for ano in range(datas[inicio].year, datas[fim - 1].year + 1):
+        ini_mes = pd.Timestamp(year=ano, month=mes, day=1)
+        a = max(inicio, datas.searchsorted(ini_mes, side='left'))
+        b = min(fim, datas.searchsorted(ini_mes + pd.offsets.MonthBegin(1), side='left'))
+        if a < b:
+            faixas.append((a, b))
+    return faixas
+
+@instrumentacao.medido('prepare_and_filter_data', linhas=lambda filtrado, *a, **k: len(filtrado))
 def prepare_and_filter_data(df, selected_year=None, selected_month=None, start_date=None, end_date=None):
     """
     Filtra o DataFrame com base em:
     - Ano (selected_year)
     - Mês (selected_month)
     - Data Inicial e Data Final (start_date, end_date)
+
+    O resultado é uma fatia do DataFrame (ver intervalos_filtrados), sem cópia do
+    histórico completo quando há uma única faixa.
+    """
+    faixas = intervalos_filtrados(df, selected_year, selected_month, start_date, end_date)
+    if not faixas:
+        return df.iloc[0:0]
+    if len(faixas) == 1:
+        return df.iloc[faixas[0][0]:faixas[0][1]]
+    return df.iloc[np.concatenate([np.arange(a, b) for a, b in faixas])]
+
+def hotel_padrao(atual):
+    """
+    Seleção inicial do seletor de hotel: o portfólio, se houver mais de um hotel.
+    """
+    return PORTFOLIO if len(atual['hoteis']) > 1 else next(iter(atual['hoteis']))
+
+def opcoes_hoteis(atual, portfolio=True):
+    """
+    Opções do seletor de hotel (com a visão consolidada primeiro, se `portfolio`).
+    """
+    opcoes = [{'label': h['nome'], 'value': hotel} for hotel, h in atual['hoteis'].items()]
+    if portfolio and len(opcoes) > 1:
+        opcoes.insert(0, {'label': 'Portfólio (todos os hotéis)', 'value': PORTFOLIO})
+    return opcoes
+
+def totais_hotel(atual, hotel, *filtros):
+    """
+    Somas do período para um hotel (agregados.consultar_cubo), pelo cubo ou pelo banco.
+    """
+    if atual['motor'] is not None:
+        return armazenamento.totais_periodo(obter_particao(hotel)['motor'], hotel, *filtros)
+    return agregados.consultar_cubo(obter_cubo(hotel), *filtros)
+
+def kpis_periodo(atual, hotel, *filtros):
+    """
+    KPIs do período como números: os ponderados por quarto-noite
+    (agregados.metricas_ponderadas) e os valores dos cards
+    (agregados.metricas_de_totais). No portfólio, somam-se os totais de todos
+    os hotéis, e os valores dos cards, médias por reserva que não se comparam
+    entre hotéis, vêm como None: as chaves são as mesmas nos dois casos.
+    """
+    hoteis = list(atual['hoteis']) if hotel == PORTFOLIO else [hotel]
+    totais, total_quartos = agregados.somar_totais(totais_hotel(atual, h, *filtros) for h in hoteis)
+    kpis = agregados.metricas_de_totais(totais, total_quartos)
+    if hotel == PORTFOLIO:
+        kpis = dict.fromkeys(kpis)
+    kpis.update(agregados.metricas_ponderadas(totais, total_quartos))
+    return kpis
+
+def tipos_quarto_hotel(atual, hotel, *filtros):
+    """
+    Reservas por tipo de quarto no período (colunas 'Tipo' e 'Quantidade'),
+    pelas reservas em memória ou pelo banco.
+    """
+    particao = obter_particao(hotel)
+    if particao['motor'] is not None:
+        return armazenamento.contar_tipos_quarto(particao['motor'], hotel, *filtros)
+    return prepare_donut_chart_data(prepare_and_filter_data(particao['df'], *filtros))
+
+def consultar_reservas_hotel(hotel, pagina, tamanho, ordenacao=None, filtro=None):
+    """
+    Página de reservas do hotel com ordenação e filtro (sintaxe do DataTable),
+    pelo índice de reservas (data_processing/reservas.py) ou pelo banco.
+    Retorna (DataFrame com as linhas da página, total de linhas filtradas).
+    """
+    particao = obter_particao(hotel)
+    if particao['motor'] is not None:
+        return armazenamento.consultar_reservas(particao['motor'], hotel, pagina, tamanho, ordenacao, filtro)
+    return reservas.consultar_reservas(particao['reservas'], pagina, tamanho, ordenacao, filtro)
+
+def fonte_relatorio(hotel):
+    """
+    Fonte do relatório financeiro do hotel (ver relatorios.blocos_relatorio):
+    os anos do histórico e, para cada ano, os fatos diários e as reservas
+    somadas por tipo de quarto, pelo cubo e reservas em memória ou pelo banco.
+    """
+    particao = obter_particao(hotel)
+    if particao['motor'] is None:
+        return relatorios.fonte_em_memoria(particao['cubo'], particao['df'])
+    motor = particao['motor']
+    return {
+        'anos': armazenamento.listar_anos_meses(motor, hotel)[0],
+        'dias': functools.partial(armazenamento.fatos_do_ano, motor, hotel),
+        'tipos': functools.partial(armazenamento.tipos_quarto_do_ano, motor, hotel),
+    }
+
+def gerar_relatorio(hotel, granularidade, formato, caminho):
+    """Gera o relatório financeiro do hotel em `caminho` (no executor de relatórios)."""
+    atual = garantir_dados()
+    titulo = f"Relatório financeiro {granularidade} - {atual['hoteis'][hotel]['nome']}"
+    relatorios.GRAVADORES[formato](fonte_relatorio(hotel), granularidade, caminho, titulo)
+
+def serie_hotel(atual, hotel, metrica, *filtros):
+    """
+    Série diária de uma métrica do hotel, pelo cubo ou pelo banco.
     """
-    df_filtered = df.copy()
+    if atual['motor'] is not None:
+        return armazenamento.serie_diaria(obter_particao(hotel)['motor'], hotel, metrica, *filtros)
+    return agregados.serie_diaria(obter_cubo(hotel), metrica, *filtros)
 
+def serie_previsao(atual, hotel, serie):
+    """
+    Série diária contínua de uma das séries de previsão do hotel, pelo cubo ou pelo banco.
+    """
+    if atual['motor'] is not None:
+        diaria = armazenamento.valores_dia(obter_particao(hotel)['motor'], hotel, previsao.SERIES[serie])
+    else:
+        diaria = obter_cubo(hotel)['diario']
+    return previsao.serie_continua(diaria, serie)
+
+def periodo_anterior(selected_year=None, selected_month=None, start_date=None, end_date=None):
+    """
+    Filtros do mesmo período um ano antes, para a comparação dos cards, ou None
+    sem ano nem intervalo selecionado (histórico inteiro: não há com o que comparar).
+    """
+    intervalo = bool(start_date and end_date)
+    if not selected_year and not intervalo:
+        return None
     if selected_year:
-        df_filtered = df_filtered[df_filtered['ano'] == selected_year]
-    if selected_month:
-        df_filtered = df_filtered[df_filtered['mes'] == selected_month]
+        selected_year = int(selected_year) - 1
+    if intervalo:
+        um_ano = pd.DateOffset(years=1)
+        start_date = (pd.to_datetime(start_date) - um_ano).isoformat()
+        end_date = (pd.to_datetime(end_date) - um_ano).isoformat()
+    return selected_year, selected_month, start_date, end_date
+
+def texto_variacao(valor, anterior, pontos=False):
+    """
+    Variação de um card em relação ao ano anterior (ex.: '▲ 5,2% vs. ano anterior'),
+    em pontos percentuais para taxas (`pontos`). None sem base de comparação.
+    """
+    if anterior is None or not np.isfinite(anterior) or anterior == 0 or not np.isfinite(valor):
+        return None
+    variacao = valor - anterior if pontos else (valor - anterior) / abs(anterior) * 100
+    seta = '▲' if variacao > 0 else ('▼' if variacao < 0 else '=')
+    numero = f"{abs(variacao):.1f}".replace('.', ',')
+    return f"{seta} {numero}{' p.p.' if pontos else '%'} vs. ano anterior"
 
-    df_filtered['data'] = pd.to_datetime(df_filtered['data'])
+def variacoes_cards(metricas, anteriores, taxas):
+    """
+    Textos de variação de cada card (chaves de `metricas`, exceto 'total_quartos');
+    `taxas` são os cards comparados em pontos percentuais.
+    """
+    if anteriores is None:
+        return {}
+    return {chave: texto_variacao(valor, anteriores[chave], chave in taxas)
+            for chave, valor in metricas.items() if chave != 'total_quartos'}
 
-    if start_date and end_date:
-        start_parsed = pd.to_datetime(start_date)
-        end_parsed = pd.to_datetime(end_date)
-        df_filtered = df_filtered[(df_filtered['data'] >= start_parsed) & (df_filtered['data'] <= end_parsed)]
+@instrumentacao.medido('calcular_conteudo')
+def calcular_conteudo(atual, hotel, selected_year=None, selected_month=None, start_date=None, end_date=None):
+    """
+    Calcula as partes do conteúdo principal que dependem do hotel e dos filtros:
+    valores formatados dos cards e figuras dos gráficos.
+    O resultado é memoizado em `cache_conteudo` (limpo a cada recarga dos dados).
+    """
+    chave = (atual['versao'], hotel, selected_year, selected_month, start_date, end_date)
+    encontrado, partes = cache_conteudo.obter(chave)
+    if encontrado:
+        return partes
+
+    filtros = (selected_year, selected_month, start_date, end_date)
+    anterior = periodo_anterior(*filtros)
+    if hotel == PORTFOLIO:
+        partes = calcular_conteudo_portfolio(atual, *filtros)
+        cache_conteudo.guardar(chave, partes)
+        return partes
+
+    particao = obter_particao(hotel)
+    if particao['motor'] is not None:
+        # Backend SQL: agregações resolvidas pelo banco
+        metricas = armazenamento.metricas_periodo(particao['motor'], hotel, *filtros)
+        anteriores = armazenamento.metricas_periodo(particao['motor'], hotel, *anterior) if anterior else None
+        df_linha = armazenamento.serie_diaria(particao['motor'], hotel, 'receita_total_dia', *filtros)
+    else:
+        # Métricas dos cards, resolvidas pelo cubo de agregados
+        metricas = agregados.metricas_periodo(particao['cubo'], *filtros)
+        anteriores = agregados.metricas_periodo(particao['cubo'], *anterior) if anterior else None
+
+        # Gráfico de linhas: um ponto por dia (cubo), reduzido por LTTB ao orçamento de pontos
+        df_linha = agregados.serie_diaria(particao['cubo'], 'receita_total_dia', *filtros)
 
-    return df_filtered
+    # Gráfico de Rosca (a tabela de reservas é paginada à parte, em update_tabela_reservas)
+    df_rosca_local = tipos_quarto_hotel(atual, hotel, *filtros)
 
-def create_main_content(df, selected_year=None, selected_month=None, start_date=None, end_date=None):
+    partes = {
+        'portfolio': False,
+        'total_quartos': metricas['total_quartos'],
+        'receita_total': formatacao.formatar_brl(metricas['receita_total']),
+        'ocupacao_media': f"{metricas['ocupacao_media']:.2f}%",
+        'adr_medio': formatacao.formatar_brl(metricas['adr_medio']),
+        'gop_medio': formatacao.formatar_brl(metricas['gop_medio']),
+        'goppar_medio': formatacao.formatar_brl(metricas['goppar_medio']),
+        'variacoes': variacoes_cards(metricas, anteriores, taxas={'ocupacao_media'}),
+        'figura_linha': charts.create_line_chart(df_linha, x='data', y='receita_total_dia', title='Receita Total ao Longo do Tempo',
+                                                 max_pontos=PONTOS_GRAFICO_LINHA),
+        'figura_rosca': charts.create_pie_chart(df_rosca_local, names='Tipo', values='Quantidade', title='Tipos de Quartos'),
+        'tabela_hoteis': [],
+    }
+    cache_conteudo.guardar(chave, partes)
+    return partes
+
+def calcular_conteudo_portfolio(atual, selected_year=None, selected_month=None, start_date=None, end_date=None):
     """
-    Cria o conteúdo principal do dashboard.
-    Ajustamos tamanhos, margens e paddings para evitar sobreposição
-    e deixar o layout mais limpo.
+    Partes do conteúdo da visão consolidada, a partir dos cubos (ou do banco) de
+    cada hotel, sem carregar reservas. Os KPIs são ponderados por quarto-noite
+    (agregados.metricas_ponderadas): somam-se quartos, ocupação, receita e GOP
+    de todos os hotéis antes de dividir, e não as médias de cada um.
     """
-    df_filtered = prepare_and_filter_data(df, selected_year, selected_month, start_date, end_date)
+    filtros = (selected_year, selected_month, start_date, end_date)
+    por_hotel = {hotel: totais_hotel(atual, hotel, *filtros) for hotel in atual['hoteis']}
+    metricas = agregados.metricas_ponderadas(*agregados.somar_totais(por_hotel.values()))
+    anterior = periodo_anterior(*filtros)
+    anteriores = None
+    if anterior:
+        anteriores = agregados.metricas_ponderadas(*agregados.somar_totais(
+            totais_hotel(atual, hotel, *anterior) for hotel in atual['hoteis']))
 
-    # Exemplo de cálculo de métricas
-    total_quartos = df_filtered['total_quartos'].iloc[0] if not df_filtered.empty else 0
-    receita_total = df_filtered['receita_total_dia'].sum()
-    receita_total_fmt = format_currency(receita_total, 'BRL', locale='pt_BR')
+    linhas_hoteis = []
+    for hotel, (totais, total_quartos) in por_hotel.items():
+        do_hotel = agregados.metricas_ponderadas(totais, total_quartos)
+        linhas_hoteis.append({
+            'hotel': atual['hoteis'][hotel]['nome'],
+            'total_quartos': do_hotel['total_quartos'],
+            'receita_total': do_hotel['receita_total'],
+            'ocupacao': f"{do_hotel['ocupacao']:.2f}%",
+            'adr': do_hotel['adr'],
+            'revpar': do_hotel['revpar'],
+            'goppar': do_hotel['goppar'],
+        })
+    tabela_hoteis = pd.DataFrame(linhas_hoteis)
+    for coluna in ['receita_total', 'adr', 'revpar', 'goppar']:
+        tabela_hoteis[coluna] = formatacao.formatar_brl_array(tabela_hoteis[coluna].astype('float64'))
 
-    ocupacao_media_val = df_filtered['Ocupacao'].mean() if not df_filtered.empty else 0
-    ocupacao_media = f"{ocupacao_media_val:.2f}%"
+    # Receita diária do portfólio: soma das séries diárias dos hotéis
+    series = [serie_hotel(atual, hotel, 'receita_total_dia', *filtros) for hotel in atual['hoteis']]
+    df_linha = pd.concat(series).groupby('data', as_index=False, sort=True)['receita_total_dia'].sum()
+    df_rosca_local = pd.DataFrame({
+        'Hotel': [atual['hoteis'][hotel]['nome'] for hotel in por_hotel],
+        'Receita': [round(totais['soma_receita_total_dia'], 2) for totais, _ in por_hotel.values()],
+    })
 
-    adr_medio_val = df_filtered['ADR'].mean() if not df_filtered.empty else 0
-    adr_medio = format_currency(adr_medio_val, 'BRL', locale='pt_BR')
+    return {
+        'portfolio': True,
+        'total_quartos': metricas['total_quartos'],
+        'receita_total': formatacao.formatar_brl(metricas['receita_total']),
+        'ocupacao': f"{metricas['ocupacao']:.2f}%",
+        'adr': formatacao.formatar_brl(metricas['adr']),
+        'revpar': formatacao.formatar_brl(metricas['revpar']),
+        'goppar': formatacao.formatar_brl(metricas['goppar']),
+        'variacoes': variacoes_cards(metricas, anteriores, taxas={'ocupacao'}),
+        'figura_linha': charts.create_line_chart(df_linha, x='data', y='receita_total_dia',
+                                                 title='Receita Total do Portfólio ao Longo do Tempo',
+                                                 max_pontos=PONTOS_GRAFICO_LINHA),
+        'figura_rosca': charts.create_pie_chart(df_rosca_local, names='Hotel', values='Receita', title='Receita por Hotel'),
+        'tabela_hoteis': tabela_hoteis.to_dict('records'),
+    }
 
-    gop_medio_val = df_filtered['GOP'].mean() if not df_filtered.empty else 0
-    gop_medio = format_currency(gop_medio_val, 'BRL', locale='pt_BR')
+def opcoes_periodo(atual, hotel):
+    """
+    Opções dos filtros de ano e de mês (meses presentes em algum ano do
+    histórico), a partir das tabelas do cubo (ou do banco) do hotel, ou de
+    todos os hotéis no portfólio.
+    """
+    anos, meses = set(), set()
+    for h in (atual['hoteis'] if hotel == PORTFOLIO else [hotel]):
+        if atual['motor'] is not None:
+            anos_hotel, meses_hotel = armazenamento.listar_anos_meses(obter_particao(h)['motor'], h)
+        else:
+            cubo = obter_cubo(h)
+            anos_hotel = cubo['anual'].index
+            meses_hotel = {int(ordinal) % 12 + 1 for ordinal in cubo['mensal'].index}
+        anos.update(int(ano) for ano in anos_hotel)
+        meses.update(int(mes) for mes in meses_hotel)
+    return ([{'label': ano, 'value': ano} for ano in sorted(anos)],
+            [{'label': mes, 'value': mes} for mes in sorted(meses)])
 
-    goppar_medio_val = df_filtered['GOPPAR'].mean() if not df_filtered.empty else 0
-    goppar_medio = format_currency(goppar_medio_val, 'BRL', locale='pt_BR')
+def pagina_reservas_recentes(atual, hotel, k, pagina, selected_year=None, selected_month=None, start_date=None, end_date=None):
+    """
+    Registros de uma página da tabela de reservas recentes do hotel e o número de páginas.
+    """
+    if hotel == PORTFOLIO:
+        return [], 1
+    filtros = (selected_year, selected_month, start_date, end_date)
+    particao = obter_particao(hotel)
+    if particao['motor'] is not None:
+        linhas, total = armazenamento.consultar_reservas(particao['motor'], hotel, pagina, k, periodo=filtros)
+        return formatar_tabela_reservas(linhas).to_dict('records'), max(1, -(-total // k))
+    faixas = intervalos_filtrados(particao['df'], *filtros)
+    return prepare_table_data(particao['df'], k, pagina, faixas).to_dict('records'), contar_paginas(faixas, k)
 
-    # Tabela e Gráfico de Rosca
-    df_tabela_local = prepare_table_data(df_filtered)
-    df_rosca_local = prepare_donut_chart_data(df_filtered)
+@instrumentacao.medido('create_filter_text')
+def create_filter_text(selected_year=None, selected_month=None, start_date=None, end_date=None):
+    """
+    Colunas com o texto dos filtros selecionados.
+    """
+    return [
+        dbc.Col(html.P(f"Ano: {selected_year if selected_year else 'Todos'}", style={'fontSize': '14px'}), md=3),
+        dbc.Col(html.P(f"Mês: {selected_month if selected_month else 'Todos'}", style={'fontSize': '14px'}), md=3),
+        dbc.Col(html.P(f"Data Inicial: {format_date_br(start_date)}", style={'fontSize': '14px'}), md=3),
+        dbc.Col(html.P(f"Data Final: {format_date_br(end_date)}", style={'fontSize': '14px'}), md=3)
+    ]
+
+@instrumentacao.medido('create_cards')
+def create_cards(partes):
+    """
+    Cards de Resumo (2 Linhas para 6 Cards) a partir das partes calculadas,
+    com a variação em relação ao mesmo período do ano anterior quando há ano
+    ou intervalo selecionado.
+    """
+    variacoes = partes['variacoes']
+    if partes['portfolio']:
+        return [
+            dbc.Row([
+                dbc.Col(card.create_card("Total de Quartos", partes['total_quartos'], color="info", icon="fas fa-home"), md=4),
+                dbc.Col(card.create_card("Receita Total", partes['receita_total'], color="success", icon="fas fa-dollar-sign",
+                                         variacao=variacoes.get('receita_total')), md=4),
+                dbc.Col(card.create_card("Ocupação do Portfólio", partes['ocupacao'], color="warning", icon="fas fa-chart-bar",
+                                         variacao=variacoes.get('ocupacao')), md=4),
+            ], className="mb-2"),
+            dbc.Row([
+                dbc.Col(card.create_card("ADR do Portfólio", partes['adr'], color="danger", icon="fas fa-bed",
+                                         variacao=variacoes.get('adr')), md=4),
+                dbc.Col(card.create_card("RevPAR do Portfólio", partes['revpar'], color="primary", icon="fas fa-chart-line",
+                                         variacao=variacoes.get('revpar')), md=4),
+                dbc.Col(card.create_card("GOPPAR do Portfólio", partes['goppar'], color="secondary", icon="fas fa-chart-pie",
+                                         variacao=variacoes.get('goppar')), md=4),
+            ], className="mb-3"),
+        ]
+    return [
+        # Linha 1: "Total de Quartos", "Receita Total", "Ocupação Média"
+        dbc.Row([
+            dbc.Col(card.create_card("Total de Quartos", partes['total_quartos'], color="info", icon="fas fa-home"), md=4),
+            dbc.Col(card.create_card("Receita Total", partes['receita_total'], color="success", icon="fas fa-dollar-sign",
+                                     variacao=variacoes.get('receita_total')), md=4),
+            dbc.Col(card.create_card("Ocupação Média", partes['ocupacao_media'], color="warning", icon="fas fa-chart-bar",
+                                     variacao=variacoes.get('ocupacao_media')), md=4),
+        ], className="mb-2"),
+
+        # Linha 2: "ADR Médio", "GOP Médio", "GOPPAR Médio"
+        dbc.Row([
+            dbc.Col(card.create_card("ADR Médio", partes['adr_medio'], color="danger", icon="fas fa-bed",
+                                     variacao=variacoes.get('adr_medio')), md=4),
+            dbc.Col(card.create_card("GOP Médio", partes['gop_medio'], color="primary", icon="fas fa-chart-line",
+                                     variacao=variacoes.get('gop_medio')), md=4),
+            dbc.Col(card.create_card("GOPPAR Médio", partes['goppar_medio'], color="secondary", icon="fas fa-chart-pie",
+                                     variacao=variacoes.get('goppar_medio')), md=4),
+        ], className="mb-3"),
+    ]
+
+def estilo_bloco(visivel):
+    """Estilo que mostra ou esconde um bloco do conteúdo principal."""
+    return {} if visivel else {'display': 'none'}
+
+@instrumentacao.medido('create_main_content')
+def create_main_content(atual, hotel=None, selected_year=None, selected_month=None, start_date=None, end_date=None):
+    """
+    Cria o conteúdo principal do dashboard.
+    Ajustamos tamanhos, margens e paddings para evitar sobreposição
+    e deixar o layout mais limpo.
+    Os valores dos cards vêm do cubo de agregados (ver data_processing/agregados.py).
+
+    O layout é montado uma única vez: os filtros são estáticos e, a cada mudança,
+    update_main_content atualiza apenas o texto dos filtros, os cards, as figuras
+    e os dados da tabela.
+
+    Com vários hotéis, a linha de filtros ganha o seletor de hotel; no portfólio,
+    a tabela de desempenho por hotel toma o lugar das reservas recentes.
+    """
+    hotel = hotel or hotel_padrao(atual)
+    varios_hoteis = len(atual['hoteis']) > 1
+    largura_filtro = 2 if varios_hoteis else 3
+    partes = calcular_conteudo(atual, hotel, selected_year, selected_month, start_date, end_date)
+    opcoes_anos, opcoes_meses = opcoes_periodo(atual, hotel)
 
     rosca_graph = dcc.Graph(
         id='grafico-rosca',
-        figure=charts.create_pie_chart(df_rosca_local, names='Tipo', values='Quantidade', title='Tipos de Quartos'),
+        figure=partes['figura_rosca'],
         style={'height': '350px'}  # Aumentar a altura
     )
 
+    # Tabela paginada no servidor: só a página exibida é selecionada e formatada
+    registros, paginas = pagina_reservas_recentes(
+        atual, hotel, RESERVAS_POR_PAGINA, 0, selected_year, selected_month, start_date, end_date
+    )
     tabela_reservas = dash_table.DataTable(
-        data=df_tabela_local.to_dict('records'),
+        id='tabela-reservas',
+        data=registros,
+        page_action='custom',
+        page_current=0,
+        page_size=RESERVAS_POR_PAGINA,
+        page_count=paginas,
         columns=[
             {'name': 'Cliente', 'id': 'nome_cliente'},
             {'name': 'Data', 'id': 'data'},
@@ -191,6 +992,23 @@ def create_main_content(df, selected_year=None, selected_month=None, start_date=
         style_header={'backgroundColor': 'white', 'fontWeight': 'bold'}
     )
 
+    # KPIs de cada hotel no período (visão de portfólio)
+    tabela_hoteis = dash_table.DataTable(
+        id='tabela-hoteis',
+        data=partes['tabela_hoteis'],
+        columns=[
+            {'name': 'Hotel', 'id': 'hotel'},
+            {'name': 'Quartos', 'id': 'total_quartos'},
+            {'name': 'Receita', 'id': 'receita_total'},
+            {'name': 'Ocupação', 'id': 'ocupacao'},
+            {'name': 'ADR', 'id': 'adr'},
+            {'name': 'RevPAR', 'id': 'revpar'},
+            {'name': 'GOPPAR', 'id': 'goppar'},
+        ],
+        style_cell={'textAlign': 'left', 'fontSize': '14px'},
+        style_header={'backgroundColor': 'white', 'fontWeight': 'bold'}
+    )
+
     # Metas (Progress Bars) - Exemplo
     metas_progress = progress_list.create_progress_list([
         {
@@ -218,29 +1036,41 @@ def create_main_content(df, selected_year=None, selected_month=None, start_date=
 
         # Linha de Filtros
         dbc.Row([
+            # Filtro: Hotel (só aparece com mais de um hotel)
+            dbc.Col([
+                html.Label("Hotel:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(
+                    id='hotel-dropdown',
+                    options=opcoes_hoteis(atual),
+                    value=hotel,
+                    clearable=False,
+                    style={'fontSize': '14px'}
+                ),
+            ], md=4, style={} if varios_hoteis else {'display': 'none'}),
+
             # Filtro: Ano
             dbc.Col([
                 html.Label("Ano:", style={'fontWeight': 'bold'}),
                 dcc.Dropdown(
                     id='ano-dropdown',
-                    options=[{'label': ano, 'value': ano} for ano in sorted(df['ano'].unique())],
+                    options=opcoes_anos,
                     placeholder="Selecione o Ano",
                     style={'fontSize': '14px'}
                 ),
                 dbc.Button("Limpar", id='btn-limpar-ano', color='secondary', outline=True, size="sm", className="mt-1")
-            ], md=3),
+            ], md=largura_filtro),
 
             # Filtro: Mês
             dbc.Col([
                 html.Label("Mês:", style={'fontWeight': 'bold'}),
                 dcc.Dropdown(
                     id='mes-dropdown',
-                    options=[{'label': mes, 'value': mes} for mes in sorted(df['mes'].unique())],
+                    options=opcoes_meses,
                     placeholder="Selecione o Mês",
                     style={'fontSize': '14px'}
                 ),
                 dbc.Button("Limpar", id='btn-limpar-mes', color='secondary', outline=True, size="sm", className="mt-1")
-            ], md=3),
+            ], md=largura_filtro),
 
             # Filtro: Data Inicial
             dbc.Col([
@@ -254,7 +1084,7 @@ def create_main_content(df, selected_year=None, selected_month=None, start_date=
                     style={'fontSize': '14px'}
                 ),
                 dbc.Button("Limpar", id='btn-limpar-start', color='secondary', outline=True, size="sm", className="mt-1")
-            ], md=3),
+            ], md=largura_filtro),
 
             # Filtro: Data Final
             dbc.Col([
@@ -268,36 +1098,23 @@ def create_main_content(df, selected_year=None, selected_month=None, start_date=
                     style={'fontSize': '14px'}
                 ),
                 dbc.Button("Limpar", id='btn-limpar-end', color='secondary', outline=True, size="sm", className="mt-1")
-            ], md=3),
+            ], md=largura_filtro),
         ], className="mb-3"),
 
         # Texto de Filtros Selecionados
-        dbc.Row([
-            dbc.Col(html.P(f"Ano: {selected_year if selected_year else 'Todos'}", style={'fontSize': '14px'}), md=3),
-            dbc.Col(html.P(f"Mês: {selected_month if selected_month else 'Todos'}", style={'fontSize': '14px'}), md=3),
-            dbc.Col(html.P(f"Data Inicial: {format_date_br(start_date)}", style={'fontSize': '14px'}), md=3),
-            dbc.Col(html.P(f"Data Final: {format_date_br(end_date)}", style={'fontSize': '14px'}), md=3)
-        ], className="mb-3"),
+        dbc.Row(
+            create_filter_text(selected_year, selected_month, start_date, end_date),
+            id='filtros-selecionados',
+            className="mb-3"
+        ),
 
         # Cards de Resumo (2 Linhas para 6 Cards)
-        # Linha 1: "Total de Quartos", "Receita Total", "Ocupação Média"
-        dbc.Row([
-            dbc.Col(card.create_card("Total de Quartos", total_quartos, color="info", icon="fas fa-home"), md=4),
-            dbc.Col(card.create_card("Receita Total", receita_total_fmt, color="success", icon="fas fa-dollar-sign"), md=4),
-            dbc.Col(card.create_card("Ocupação Média", ocupacao_media, color="warning", icon="fas fa-chart-bar"), md=4),
-        ], className="mb-2"),
-
-        # Linha 2: "ADR Médio", "GOP Médio", "GOPPAR Médio"
-        dbc.Row([
-            dbc.Col(card.create_card("ADR Médio", adr_medio, color="danger", icon="fas fa-bed"), md=4),
-            dbc.Col(card.create_card("GOP Médio", gop_medio, color="primary", icon="fas fa-chart-line"), md=4),
-            dbc.Col(card.create_card("GOPPAR Médio", goppar_medio, color="secondary", icon="fas fa-chart-pie"), md=4),
-        ], className="mb-3"),
+        html.Div(create_cards(partes), id='cards-resumo'),
 
         # Gráfico de Linhas (Receita total)
         dcc.Graph(
             id='grafico-principal',
-            figure=charts.create_line_chart(df_filtered, x='data', y='receita_total_dia', title='Receita Total ao Longo do Tempo'),
+            figure=partes['figura_linha'],
             style={'height': '300px'}
         ),
 
@@ -309,8 +1126,24 @@ def create_main_content(df, selected_year=None, selected_month=None, start_date=
                 style={'padding': '5px'}
             ),
             dbc.Col([
-                html.H3("Reservas Recentes", className="mb-3", style={'fontSize': '18px'}),
-                tabela_reservas,
+                html.Div([
+                    html.H3("Reservas Recentes", className="mb-3", style={'fontSize': '18px'}),
+                    html.Div([
+                        html.Label("Reservas por página:", style={'fontWeight': 'bold', 'marginRight': '8px'}),
+                        dcc.Dropdown(
+                            id='reservas-por-pagina',
+                            options=[{'label': str(k), 'value': k} for k in OPCOES_RESERVAS_POR_PAGINA],
+                            value=RESERVAS_POR_PAGINA,
+                            clearable=False,
+                            style={'fontSize': '14px', 'width': '90px'}
+                        ),
+                    ], style={'display': 'flex', 'alignItems': 'center'}, className="mb-2"),
+                    tabela_reservas,
+                ], id='bloco-reservas', style=estilo_bloco(not partes['portfolio'])),
+                html.Div([
+                    html.H3("Desempenho por Hotel", className="mb-3", style={'fontSize': '18px'}),
+                    tabela_hoteis,
+                ], id='bloco-hoteis', style=estilo_bloco(partes['portfolio'])),
                 html.Br(),
                 html.H4("Metas", className="mb-2", style={'fontSize': '18px'}),
                 metas_progress
@@ -323,6 +1156,127 @@ def create_main_content(df, selected_year=None, selected_month=None, start_date=
 
     return main_content
 
+def prepare_explorer_data(pagina):
+    """
+    Registros de uma página do explorador de reservas, com datas e valores
+    formatados (apenas as linhas da página são formatadas).
+    """
+    registros = pd.DataFrame({c['id']: process_data.coluna(pagina, c['id']).to_numpy() for c in COLUNAS_EXPLORADOR})
+    registros['data'] = pd.to_datetime(process_data.coluna(pagina, 'data')).dt.strftime('%d/%m/%Y').to_numpy()
+    for coluna in COLUNAS_EXPLORADOR_BRL:
+        registros[coluna] = formatacao.formatar_brl_array(pagina[coluna])
+    return registros.to_dict('records')
+
+def create_reservas_content(atual):
+    """
+    Explorador de reservas: paginação, ordenação e filtro são resolvidos no
+    servidor (update_explorador), que envia ao navegador só a página visível.
+    Com vários hotéis, as reservas são as do hotel escolhido no seletor.
+    """
+    opcoes = opcoes_hoteis(atual, portfolio=False)
+    return html.Div([
+        html.H1('Desempenho de Reservas', className="text-center mb-4", style={'fontSize': '24px'}),
+        html.Div([
+            html.Label("Hotel:", style={'fontWeight': 'bold'}),
+            dcc.Dropdown(
+                id='hotel-explorador',
+                options=opcoes,
+                value=opcoes[0]['value'],
+                clearable=False,
+                style={'fontSize': '14px', 'width': '320px'}
+            ),
+        ], className="mb-2", style=estilo_bloco(len(opcoes) > 1)),
+        html.P(
+            "Filtre digitando na linha abaixo do cabeçalho (ex.: > 1000, = Suite, 2010-05, 03/2010) "
+            "e ordene clicando nas setas das colunas.",
+            style={'fontSize': '14px'}
+        ),
+        html.Div(id='explorador-total', className="mb-2", style={'fontWeight': 'bold'}),
+        dash_table.DataTable(
+            id='tabela-explorador',
+            columns=COLUNAS_EXPLORADOR,
+            page_action='custom',
+            page_current=0,
+            page_size=EXPLORADOR_POR_PAGINA,
+            sort_action='custom',
+            sort_mode='single',
+            sort_by=[],
+            filter_action='custom',
+            filter_query='',
+            style_cell={'textAlign': 'left', 'fontSize': '14px'},
+            style_header={'backgroundColor': 'white', 'fontWeight': 'bold'}
+        ),
+    ], style={'marginLeft': '20px', 'marginRight': '20px', 'marginTop': '10px'})
+
+def create_previsao_content(atual):
+    """
+    Previsão de Demanda: histórico recente e previsão diária de quartos ocupados
+    ou receita de quartos do hotel escolhido (update_previsao).
+    """
+    opcoes = opcoes_hoteis(atual, portfolio=False)
+    return html.Div([
+        html.H1('Previsão de Demanda', className="text-center mb-4", style={'fontSize': '24px'}),
+        dbc.Row([
+            dbc.Col([
+                html.Label("Hotel:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(id='hotel-previsao', options=opcoes, value=opcoes[0]['value'],
+                             clearable=False, style={'fontSize': '14px'}),
+            ], md=4, style=estilo_bloco(len(opcoes) > 1)),
+            dbc.Col([
+                html.Label("Série:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(id='serie-previsao', options=OPCOES_SERIE_PREVISAO,
+                             value=OPCOES_SERIE_PREVISAO[0]['value'], clearable=False, style={'fontSize': '14px'}),
+            ], md=4),
+            dbc.Col([
+                html.Label("Horizonte:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(id='horizonte-previsao',
+                             options=[{'label': f"{h} dias", 'value': h} for h in HORIZONTES_PREVISAO],
+                             value=HORIZONTES_PREVISAO[-1], clearable=False, style={'fontSize': '14px'}),
+            ], md=4),
+        ], className="mb-3"),
+        html.Div(id='previsao-resumo', className="mb-2", style={'fontSize': '14px'}),
+        dcc.Graph(id='grafico-previsao', style={'height': '450px'}),
+    ], style={'marginLeft': '20px', 'marginRight': '20px', 'marginTop': '10px'})
+
+def create_relatorios_content(atual):
+    """
+    Relatórios Financeiros: demonstrativo mensal ou anual e reservas por tipo
+    de quarto do hotel escolhido, exportados para Excel ou PDF (update_relatorio).
+    """
+    opcoes = opcoes_hoteis(atual, portfolio=False)
+    return html.Div([
+        html.H1('Relatórios Financeiros', className="text-center mb-4", style={'fontSize': '24px'}),
+        dbc.Row([
+            dbc.Col([
+                html.Label("Hotel:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(id='hotel-relatorio', options=opcoes, value=opcoes[0]['value'],
+                             clearable=False, style={'fontSize': '14px'}),
+            ], md=4, style=estilo_bloco(len(opcoes) > 1)),
+            dbc.Col([
+                html.Label("Período:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(id='granularidade-relatorio',
+                             options=[{'label': r, 'value': v} for v, r in relatorios.GRANULARIDADES.items()],
+                             value='mensal', clearable=False, style={'fontSize': '14px'}),
+            ], md=3),
+            dbc.Col([
+                html.Label("Formato:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(id='formato-relatorio',
+                             options=[{'label': r, 'value': v} for v, r in relatorios.FORMATOS.items()],
+                             value='xlsx', clearable=False, style={'fontSize': '14px'}),
+            ], md=3),
+            dbc.Col(
+                dbc.Button("Gerar relatório", id='botao-relatorio', color="primary", style={'marginTop': '24px'}),
+                md=2,
+            ),
+        ], className="mb-3"),
+        html.P("Receita, GOP, margem, ADR, RevPAR, TRevPAR e GOPPAR por período, e reservas, "
+               "quartos-noite e valores por tipo de quarto, com os totais de todo o histórico.",
+               style={'fontSize': '14px'}),
+        html.Div(id='relatorio-estado', style={'fontSize': '14px'}),
+        dcc.Store(id='relatorio-arquivo'),
+        dcc.Interval(id='intervalo-relatorio', interval=INTERVALO_RELATORIO_MS, disabled=True),
+    ], style={'marginLeft': '20px', 'marginRight': '20px', 'marginTop': '10px'})
+
 app = dash.Dash(
     __name__,
     external_stylesheets=[dbc.themes.BOOTSTRAP, 
@@ -357,36 +1311,303 @@ def create_sidebar():
     })
     return sidebar
 
-app.layout = dbc.Container([
-    dbc.Row([
-        # Menu lateral (2 colunas)
-        dbc.Col(
-            create_sidebar(),
-            width=2,
-            style={'padding': '0px', 'margin': '0px'}
-        ),
-        # Conteúdo principal (10 colunas)
-        dbc.Col(
-            id='main-content',
-            width=10,
-            children=create_main_content(df),
-            style={'padding': '0px', 'margin-left': '220px'}  # Ajuste p/ não sobrepor o menu fixo
-        )
-    ], style={'margin': '0px'}),
-], fluid=True, style={'margin': '0px', 'padding': '0px'})
+def create_layout():
+    """
+    Monta o layout completo. É registrado como função, então cada carregamento
+    de página reflete os dados mais recentes (inclusive após a carga incremental);
+    o conteúdo de cada página é montado por render_page, conforme o endereço.
+    """
+    return dbc.Container([
+        dcc.Location(id='url'),
+        dbc.Row([
+            # Menu lateral (2 colunas)
+            dbc.Col(
+                create_sidebar(),
+                width=2,
+                style={'padding': '0px', 'margin': '0px'}
+            ),
+            # Conteúdo principal (10 colunas)
+            dbc.Col(
+                id='main-content',
+                width=10,
+                style={'padding': '0px', 'margin-left': '220px'}  # Ajuste p/ não sobrepor o menu fixo
+            )
+        ], style={'margin': '0px'}),
+
+        # Verificação periódica de novas linhas no CSV
+        dcc.Interval(id='intervalo-atualizacao', interval=INTERVALO_ATUALIZACAO_SEGUNDOS * 1000),
+        # (sem valor enquanto a carga inicial não termina: o layout não espera por ela)
+        dcc.Store(id='versao-dados', data=dados['versao'] if carga_concluida.is_set() else None),
+    ], fluid=True, style={'margin': '0px', 'padding': '0px'})
+
+def create_app():
+    """
+    Fábrica da aplicação: carrega os dados (uma única vez) e registra o layout.
+
+    Em produção (ver wsgi.py e gunicorn.conf.py) é chamada no processo mestre,
+    antes do fork dos workers, que passam a compartilhar as páginas de memória
+    do DataFrame e do cubo (copy-on-write) em vez de manter cópias próprias.
+    Com vários hotéis, só a lista de hotéis é lida aqui; as partições são
+    carregadas por cada worker quando pedidas.
+
+    Com MODO_CARGA 'fundo' ou 'adiada', a carga não acontece aqui (ver garantir_dados).
+    """
+    if MODO_CARGA == 'fundo':
+        threading.Thread(target=carregar_em_fundo, name='carga-dados', daemon=True).start()
+    elif MODO_CARGA != 'adiada':
+        garantir_dados()
+    app.layout = create_layout
+    return app
+
+@app.server.route('/cache-stats')
+def cache_stats():
+    """Contadores do cache de conteúdo (acertos, falhas, despejos, memória)."""
+    return flask.jsonify(cache_conteudo.estatisticas())
+
+@app.server.route('/metrics')
+def metricas_prometheus():
+    """
+    Tempo, linhas, bytes e memória por etapa (HOTEL_INSTRUMENTACAO) e os
+    contadores do cache de conteúdo, no formato de texto do Prometheus.
+    """
+    if not instrumentacao.ATIVA:
+        return flask.Response("Instrumentação desligada (HOTEL_INSTRUMENTACAO).\n", status=404, mimetype='text/plain')
+    cache = cache_conteudo.estatisticas()
+    texto = instrumentacao.texto_prometheus([
+        ('hotel_cache_acertos_total', 'counter', 'Acertos do cache de conteúdo', cache['acertos']),
+        ('hotel_cache_falhas_total', 'counter', 'Falhas do cache de conteúdo', cache['falhas']),
+        ('hotel_cache_despejos_total', 'counter', 'Despejos do cache de conteúdo', cache['despejos']),
+        ('hotel_cache_bytes', 'gauge', 'Memória ocupada pelo cache de conteúdo', cache['bytes']),
+    ])
+    return flask.Response(texto, mimetype='text/plain; version=0.0.4')
+
+@app.server.route('/relatorios/<nome>')
+def baixar_relatorio(nome):
+    """Arquivo de um relatório financeiro já gerado, enviado em blocos a partir do disco."""
+    estado, caminho = relatorios.estado_exportacao(PASTA_RELATORIOS, nome)
+    if estado != 'pronto':
+        return flask.Response("Relatório não encontrado ou expirado.\n", status=404, mimetype='text/plain')
+    return flask.send_file(caminho, as_attachment=True, download_name=nome)
 
 # CALLBACKS
 
 @app.callback(
     Output('main-content', 'children'),
-    [Input('ano-dropdown', 'value'),
+    Input('url', 'pathname')
+)
+def render_page(pathname):
+    """
+    Conteúdo da página conforme o endereço (as demais páginas mostram a visão geral).
+    É o primeiro pedido que precisa dos dados: espera pela carga inicial, se
+    ela ainda não terminou.
+    """
+    atual = garantir_dados()
+    if pathname == '/desempenho-reservas':
+        return create_reservas_content(atual)
+    if pathname == '/previsao-demanda':
+        return create_previsao_content(atual)
+    if pathname == '/relatorios-financeiros':
+        return create_relatorios_content(atual)
+    return create_main_content(atual)
+
+@app.callback(
+    [Output('tabela-explorador', 'data'),
+     Output('tabela-explorador', 'page_count'),
+     Output('tabela-explorador', 'page_current'),
+     Output('explorador-total', 'children')],
+    [Input('tabela-explorador', 'page_current'),
+     Input('tabela-explorador', 'page_size'),
+     Input('tabela-explorador', 'sort_by'),
+     Input('tabela-explorador', 'filter_query'),
+     Input('hotel-explorador', 'value'),
+     Input('versao-dados', 'data')]
+)
+def update_explorador(pagina, tamanho, ordenacao, filtro, hotel, versao):
+    """
+    Página, ordenação e filtro do explorador de reservas, respondidos pelo
+    índice de reservas (data_processing/reservas.py) ou pelo banco. Mudanças de ordenação,
+    filtro, hotel ou dados voltam à primeira página.
+    """
+    tamanho = int(tamanho or EXPLORADOR_POR_PAGINA)
+    if 'tabela-explorador.page_current' not in dash.callback_context.triggered_prop_ids:
+        pagina = 0
+    pagina = int(pagina or 0)
+    atual = garantir_dados()
+    hotel = hotel or next(iter(atual['hoteis']))
+    linhas, total = consultar_reservas_hotel(hotel, pagina, tamanho, ordenacao, filtro)
+    paginas = max(1, -(-total // tamanho))
+    return prepare_explorer_data(linhas), paginas, pagina, f"{total:,} reservas".replace(',', '.')
+
+@app.callback(
+    [Output('relatorio-arquivo', 'data'),
+     Output('intervalo-relatorio', 'disabled'),
+     Output('relatorio-estado', 'children')],
+    [Input('botao-relatorio', 'n_clicks'),
+     Input('intervalo-relatorio', 'n_intervals')],
+    [State('hotel-relatorio', 'value'),
+     State('granularidade-relatorio', 'value'),
+     State('formato-relatorio', 'value'),
+     State('relatorio-arquivo', 'data')],
+    prevent_initial_call=True
+)
+def update_relatorio(n_clicks, n_intervals, hotel, granularidade, formato, arquivo):
+    """
+    O botão agenda a geração no executor de relatórios e responde na hora; o
+    intervalo acompanha o arquivo até ficar pronto e então mostra o link.
+    """
+    if 'botao-relatorio.n_clicks' in dash.callback_context.triggered_prop_ids:
+        prefixo = f"relatorio_{granularidade}_{hotel}"
+        arquivo = relatorios.iniciar_exportacao(
+            executor_relatorios, PASTA_RELATORIOS, prefixo, formato,
+            functools.partial(gerar_relatorio, hotel, granularidade, formato), RELATORIOS_VALIDADE_SEGUNDOS,
+        )
+        return arquivo, False, "Gerando o relatório..."
+
+    estado, detalhe = relatorios.estado_exportacao(PASTA_RELATORIOS, arquivo)
+    if estado == 'gerando':
+        return dash.no_update, False, "Gerando o relatório..."
+    if estado == 'pronto':
+        return dash.no_update, True, html.A("Baixar relatório", href=f"/relatorios/{arquivo}",
+                                            className="btn btn-success")
+    if estado == 'erro':
+        return dash.no_update, True, html.Span(f"Erro ao gerar o relatório: {detalhe}", className="text-danger")
+    return dash.no_update, True, html.Span("Relatório não encontrado; gere novamente.", className="text-danger")
+
+@app.callback(
+    [Output('grafico-previsao', 'figure'),
+     Output('previsao-resumo', 'children')],
+    [Input('hotel-previsao', 'value'),
+     Input('serie-previsao', 'value'),
+     Input('horizonte-previsao', 'value'),
+     Input('versao-dados', 'data')]
+)
+@instrumentacao.medido('update_previsao', resposta=True)
+def update_previsao(hotel, serie, horizonte, versao):
+    """
+    Previsão do hotel para os próximos `horizonte` dias. O modelo é ajustado uma
+    vez e guardado em disco (previsao.modelo_em_cache); dias novos no CSV só o
+    atualizam, e o gráfico recebe apenas o histórico recente.
+    """
+    atual = garantir_dados()
+    hotel = hotel or next(iter(atual['hoteis']))
+    serie = serie or OPCOES_SERIE_PREVISAO[0]['value']
+    horizonte = int(horizonte or HORIZONTES_PREVISAO[-1])
+    valores = serie_previsao(atual, hotel, serie)
+    modelo = previsao.modelo_em_cache(atual['hoteis'][hotel]['arquivo'], serie, valores)
+    if modelo is None:
+        return charts.create_line_chart(pd.DataFrame(), x='data', y=serie, title=''), \
+            f"Histórico insuficiente para a previsão (mínimo de {previsao.MINIMO_DIAS} dias)."
+
+    futuro = previsao.prever(modelo, horizonte)
+    recente = valores.iloc[-HISTORICO_PREVISAO_DIAS:]
+    historico = pd.DataFrame({'data': recente.index, serie: recente.to_numpy()})
+    rotulo = next(o['label'] for o in OPCOES_SERIE_PREVISAO if o['value'] == serie)
+    figura = charts.create_forecast_chart(historico, futuro, serie, f"{rotulo} - previsão de {horizonte} dias",
+                                          max_pontos=PONTOS_GRAFICO_LINHA)
+
+    total = futuro['previsao'].sum()
+    if serie == 'receita_quartos_dia':
+        texto_total = formatacao.formatar_brl(total)
+    else:
+        texto_total = f"{total:,.0f} quartos-noite".replace(',', '.')
+    dias_historico = f"{modelo['n']:,}".replace(',', '.')
+    resumo = (f"Total previsto de {format_date_br(futuro['data'].iloc[0])} a "
+              f"{format_date_br(futuro['data'].iloc[-1])}: {texto_total}. "
+              f"Histórico de {dias_historico} dias (até {format_date_br(modelo['fim'])}); "
+              f"alfa = {modelo['alfa']:.3f}.")
+    return figura, resumo
+
+@app.callback(
+    Output('versao-dados', 'data'),
+    Input('intervalo-atualizacao', 'n_intervals'),
+    State('versao-dados', 'data')
+)
+def verificar_novos_dados(n_intervals, versao_cliente):
+    """
+    Incorpora novas linhas do CSV e entrega a versão atual dos dados a toda
+    sessão que ainda não a tem, não só à que encontrou as novidades: o
+    navegador só redesenha quando a versão que guarda fica diferente.
+    """
+    if not n_intervals or not carga_concluida.is_set():
+        return dash.no_update
+    atualizar_dados()
+    versao = dados['versao']
+    return versao if versao != versao_cliente else dash.no_update
+
+@app.callback(
+    [Output('filtros-selecionados', 'children'),
+     Output('cards-resumo', 'children'),
+     Output('grafico-principal', 'figure'),
+     Output('grafico-rosca', 'figure'),
+     Output('tabela-hoteis', 'data'),
+     Output('bloco-reservas', 'style'),
+     Output('bloco-hoteis', 'style')],
+    [Input('hotel-dropdown', 'value'),
+     Input('ano-dropdown', 'value'),
      Input('mes-dropdown', 'value'),
      Input('start-date', 'date'),
-     Input('end-date', 'date')]
+     Input('end-date', 'date'),
+     Input('versao-dados', 'data')]
+)
+@instrumentacao.medido('update_main_content', resposta=True)
+def update_main_content(hotel, selected_year, selected_month, start_date, end_date, versao):
+    """
+    Atualiza apenas as partes do conteúdo que dependem do hotel, dos filtros ou
+    dos dados (o layout com os filtros não é recriado).
+    """
+    atual = garantir_dados()
+    hotel = hotel or hotel_padrao(atual)
+    partes = calcular_conteudo(atual, hotel, selected_year, selected_month, start_date, end_date)
+    return (
+        create_filter_text(selected_year, selected_month, start_date, end_date),
+        create_cards(partes),
+        partes['figura_linha'],
+        partes['figura_rosca'],
+        partes['tabela_hoteis'],
+        estilo_bloco(not partes['portfolio']),
+        estilo_bloco(partes['portfolio']),
+    )
+
+@app.callback(
+    [Output('tabela-reservas', 'data'),
+     Output('tabela-reservas', 'page_count'),
+     Output('tabela-reservas', 'page_size'),
+     Output('tabela-reservas', 'page_current')],
+    [Input('hotel-dropdown', 'value'),
+     Input('ano-dropdown', 'value'),
+     Input('mes-dropdown', 'value'),
+     Input('start-date', 'date'),
+     Input('end-date', 'date'),
+     Input('versao-dados', 'data'),
+     Input('reservas-por-pagina', 'value'),
+     Input('tabela-reservas', 'page_current')]
+)
+@instrumentacao.medido('update_tabela_reservas', resposta=True)
+def update_tabela_reservas(hotel, selected_year, selected_month, start_date, end_date, versao, k, pagina):
+    """
+    Página atual das reservas recentes do hotel (paginação no servidor). Mudanças
+    de hotel, filtro, dados ou linhas por página voltam à primeira página.
+    """
+    atual = garantir_dados()
+    hotel = hotel or hotel_padrao(atual)
+    k = int(k or RESERVAS_POR_PAGINA)
+    if dash.callback_context.triggered_id != 'tabela-reservas':
+        pagina = 0
+    pagina = int(pagina or 0)
+    registros, paginas = pagina_reservas_recentes(atual, hotel, k, pagina, selected_year, selected_month, start_date, end_date)
+    return registros, paginas, k, pagina
+
+@app.callback(
+    [Output('ano-dropdown', 'options'),
+     Output('mes-dropdown', 'options')],
+    [Input('hotel-dropdown', 'value'),
+     Input('versao-dados', 'data')],
+    prevent_initial_call=True
 )
-def update_main_content(selected_year, selected_month, start_date, end_date):
-    """Atualiza o conteúdo principal do dashboard ao mudar qualquer filtro."""
-    return create_main_content(df, selected_year, selected_month, start_date, end_date)
+def update_filter_options(hotel, versao):
+    """Atualiza as opções de ano/mês ao trocar de hotel ou ao incorporar novos dados."""
+    atual = garantir_dados()
+    return opcoes_periodo(atual, hotel or hotel_padrao(atual))
 
 @app.callback(
     Output('ano-dropdown', 'value'),
@@ -425,4 +1646,4 @@ def limpar_data_final(n_clicks):
     return dash.no_update
 
 if __name__ == "__main__":
-    app.run_server(debug=True)
+    create_app().run_server(debug=True)
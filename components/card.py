@@ -1,9 +1,10 @@
 import dash_bootstrap_components as dbc
 from dash import html
 
-def create_card(title, value, color="primary", icon=None):
+def create_card(title, value, color="primary", icon=None, variacao=None):
     """
-    Cria um card com título, valor e, opcionalmente, um ícone.
+    Cria um card com título, valor e, opcionalmente, um ícone e o texto da
+    variação em relação ao período de comparação (abaixo do valor).
     """
     card_body_children = []
 
@@ -12,9 +13,15 @@ def create_card(title, value, color="primary", icon=None):
         card_body_children.append(html.I(className=f'{icon} me-2 fa-lg', style={'color': 'white'}))
 
     # Adiciona o título e o valor
+    valor = html.H3(value, className="card-text text-white", style={'textAlign': 'right', 'marginLeft': '10px'})  # Valor menor e alinhado à direita
+    if variacao:
+        valor = html.Div([
+            valor,
+            html.Small(variacao, className="text-white", style={'display': 'block', 'textAlign': 'right'})
+        ])
     card_body_children.extend([
         html.H5(title, className="card-title text-white"),  # Título menor
-        html.H3(value, className="card-text text-white", style={'textAlign': 'right', 'marginLeft': '10px'})  # Valor menor e alinhado à direita
+        valor
     ])
 
     return dbc.Card(
@@ -0,0 +1,431 @@
+import numpy as np
+import pandas as pd
+
+from utils import instrumentacao
+
+# Métricas exibidas nos cards: para cada uma guardamos soma e contagem (não nulos),
+# o que permite reconstruir tanto o total quanto a média de qualquer período.
+METRICAS_CUBO = ['receita_total_dia', 'Ocupacao', 'ADR', 'GOP', 'GOPPAR']
+
+COLUNAS_SOMA = [f'soma_{m}' for m in METRICAS_CUBO]
+COLUNAS_CONTAGEM = [f'n_{m}' for m in METRICAS_CUBO]
+COLUNAS_ADITIVAS = COLUNAS_SOMA + COLUNAS_CONTAGEM + ['linhas']
+
+# Métricas que vêm do CSV em reais com centavos: as somas são arredondadas para
+# centavos inteiros antes dos totais e médias, o que descarta o erro de ponto
+# flutuante das somas (que depende da ordem: prefixos, partes, SUM do banco) e
+# decide do mesmo jeito as médias que caem exatamente em meio centavo.
+METRICAS_EM_CENTAVOS = ['receita_total_dia', 'GOP', 'GOPPAR']
+
+# Valores do dia (iguais em todas as reservas do dia): na tabela diária guardam o
+# primeiro valor do dia; nas tabelas mensal e anual, a soma sobre os dias. Servem
+# para os KPIs ponderados por quarto-noite do portfólio (ver metricas_ponderadas).
+ORIGEM_COLUNAS_DIA = {
+    'dia_total_quartos': 'total_quartos',
+    'dia_quartos_ocupados': 'quartos_ocupados_dia',
+    'dia_receita_quartos': 'receita_quartos_dia',
+    'dia_gop': 'lucro_operacional_bruto_dia',
+}
+COLUNAS_DIA = list(ORIGEM_COLUNAS_DIA)
+
+# Colunas somadas nas consultas ao cubo
+COLUNAS_CONSULTA = COLUNAS_ADITIVAS + COLUNAS_DIA
+
+# Colunas de reservas necessárias para montar o cubo (com calculate_metrics, em app.py)
+COLUNAS_ORIGEM = [
+    'data', 'total_quartos', 'quartos_ocupados_dia', 'receita_quartos_dia',
+    'receita_total_dia', 'lucro_operacional_bruto_dia', 'goppar_dia',
+]
+
+
+def construir_tabela_diaria(df):
+    """
+    Agrega o DataFrame de reservas por dia: somas e contagens das métricas do cubo,
+    número de linhas e o primeiro valor de 'total_quartos' do dia.
+    """
+    grupos = df.groupby('data', sort=True)
+    somas = grupos[METRICAS_CUBO].sum()
+    somas.columns = COLUNAS_SOMA
+    contagens = grupos[METRICAS_CUBO].count()
+    contagens.columns = COLUNAS_CONTAGEM
+
+    diaria = pd.concat([somas, contagens], axis=1).astype('float64')
+    diaria['linhas'] = grupos.size().astype('float64')
+    primeiros = grupos[list(ORIGEM_COLUNAS_DIA.values())].first().astype('float64')
+    for coluna, origem in ORIGEM_COLUNAS_DIA.items():
+        diaria[coluna] = primeiros[origem]
+    diaria['total_quartos'] = grupos['total_quartos'].first().astype('float64')
+    diaria.index = pd.DatetimeIndex(diaria.index, name='data')
+    return diaria
+
+
+def combinar_diarias(diarias):
+    """
+    Junta tabelas diárias parciais (ex.: uma por bloco do CSV) em uma só. Um mesmo
+    dia pode aparecer em mais de uma parcial: as colunas aditivas são somadas e
+    'total_quartos' e os valores do dia (COLUNAS_DIA) vêm da primeira parcial em
+    que o dia aparece.
+    """
+    juntas = pd.concat(diarias)
+    grupos = juntas.groupby(level=0, sort=True)
+    diaria = grupos[COLUNAS_ADITIVAS].sum()
+    diaria[COLUNAS_DIA] = grupos[COLUNAS_DIA].first()
+    diaria['total_quartos'] = grupos['total_quartos'].first()
+    diaria.index = pd.DatetimeIndex(diaria.index, name='data')
+    return diaria
+
+
+def _agrupar(tabela, chave):
+    """
+    Soma as colunas aditivas e os valores do dia de `tabela` por `chave`, mantendo
+    o primeiro 'total_quartos'.
+    """
+    grupos = tabela.groupby(chave, sort=True)
+    agregada = grupos[COLUNAS_CONSULTA].sum()
+    agregada['total_quartos'] = grupos['total_quartos'].first()
+    return agregada
+
+
+def construir_cubo(df):
+    """
+    Monta o cubo de agregados (diário, mensal e anual) a partir do DataFrame já
+    com as métricas calculadas (ver calculate_metrics em app.py).
+
+    - 'diario': indexado pela data (DatetimeIndex ordenado)
+    - 'mensal': indexado pelo ordinal do mês (ano * 12 + mes - 1)
+    - 'anual': indexado pelo ano
+    """
+    diaria = construir_tabela_diaria(df)
+    return cubo_de_diaria(diaria)
+
+
+def cubo_de_diaria(diaria):
+    """
+    Deriva as tabelas mensal e anual e as somas acumuladas (construir_prefixos)
+    a partir da tabela diária.
+    """
+    datas = diaria.index
+    mensal = _agrupar(diaria, (datas.year * 12 + datas.month - 1).to_numpy())
+    anual = _agrupar(diaria, datas.year.to_numpy())
+    cubo = {'diario': diaria, 'mensal': mensal, 'anual': anual}
+    cubo.update(construir_prefixos(diaria, mensal))
+    return cubo
+
+
+def _prefixos(tabela):
+    """
+    Somas acumuladas das COLUNAS_CONSULTA de `tabela`: a linha i é a soma das
+    linhas [0, i), então a soma de qualquer faixa [a, b) é prefixo[b] - prefixo[a].
+    """
+    prefixo = np.zeros((len(tabela) + 1, len(COLUNAS_CONSULTA)))
+    np.cumsum(tabela[COLUNAS_CONSULTA].to_numpy(dtype='float64'), axis=0, out=prefixo[1:])
+    return prefixo
+
+
+def construir_prefixos(diaria, mensal):
+    """
+    Índices de somas acumuladas do cubo, que respondem a soma de qualquer
+    período com duas buscas binárias e uma subtração, qualquer que seja o
+    tamanho do período ou do histórico:
+
+    - 'prefixo_diario': prefixos da tabela diária (intervalos de dias)
+    - 'prefixo_mes': para cada mês do calendário (1 a 12), os ordinais desse
+      mês na tabela mensal (um por ano), os prefixos das somas e o
+      'total_quartos' de cada um (filtro de mês, que junta o mesmo mês de vários anos)
+    """
+    prefixo_mes = {}
+    for mes in range(1, 13):
+        meses = mensal[mensal.index % 12 == mes - 1]
+        prefixo_mes[mes] = (meses.index.to_numpy(), _prefixos(meses), meses['total_quartos'].to_numpy())
+    return {'prefixo_diario': _prefixos(diaria), 'prefixo_mes': prefixo_mes}
+
+
+def _fatia_ordenada(indice, inicio, fim):
+    """
+    Posições [a, b) do índice ordenado cujos valores estão em [inicio, fim].
+    """
+    a = indice.searchsorted(inicio, side='left')
+    b = indice.searchsorted(fim, side='right')
+    return a, b
+
+
+def _fim_do_mes(ordinal):
+    ano, mes = divmod(ordinal, 12)
+    return pd.Timestamp(year=ano, month=mes + 1, day=1) + pd.offsets.MonthEnd(0)
+
+
+def _inicio_do_mes(ordinal):
+    ano, mes = divmod(ordinal, 12)
+    return pd.Timestamp(year=ano, month=mes + 1, day=1)
+
+
+def _somar_dias(cubo, inicio, fim):
+    """
+    Somas dos dias em [inicio, fim] e o 'total_quartos' do primeiro deles
+    (None se não houver nenhum dia).
+    """
+    diaria = cubo['diario']
+    a, b = _fatia_ordenada(diaria.index, inicio, fim)
+    if a >= b:
+        return None, None
+    prefixo = cubo['prefixo_diario']
+    return prefixo[b] - prefixo[a], diaria['total_quartos'].iat[a]
+
+
+def _somar_mes(cubo, mes, inicio, fim):
+    """
+    Somas de um mês do calendário (em todos os anos) restrito a [inicio, fim] e o
+    'total_quartos' do primeiro dia. Só os meses das bordas (primeiro e último
+    ano) podem estar incompletos e vêm dos prefixos diários; os meses inteiros
+    entre eles são uma única faixa dos prefixos do mês.
+    """
+    partes = []
+    ano_inicial, ano_final = inicio.year, fim.year
+    anos_inteiros = [ano_inicial, ano_final]
+    for ano in sorted({ano_inicial, ano_final}):
+        ordinal = ano * 12 + mes - 1
+        ini_mes, fim_mes = _inicio_do_mes(ordinal), _fim_do_mes(ordinal)
+        ini, fi = max(ini_mes, inicio), min(fim_mes, fim)
+        if ini == ini_mes and fi == fim_mes:
+            continue
+        # Mês da borda incompleto (ou fora do período): fora da faixa de meses inteiros
+        if ano == ano_inicial:
+            anos_inteiros[0] = ano + 1
+        if ano == ano_final:
+            anos_inteiros[1] = ano - 1
+        if ini <= fi:
+            partes.append((ano, _somar_dias(cubo, ini, fi)))
+
+    if anos_inteiros[0] <= anos_inteiros[1]:
+        ordinais, prefixo, quartos = cubo['prefixo_mes'][mes]
+        a, b = _fatia_ordenada(ordinais, anos_inteiros[0] * 12 + mes - 1, anos_inteiros[1] * 12 + mes - 1)
+        if a < b:
+            partes.append((anos_inteiros[0], (prefixo[b] - prefixo[a], quartos[a])))
+
+    partes = sorted((parte for parte in partes if parte[1][0] is not None), key=lambda parte: parte[0])
+    if not partes:
+        return None, None
+    return sum(somas for _, (somas, _) in partes), partes[0][1][1]
+
+
+def _limites_periodo(diaria, selected_year=None, start_date=None, end_date=None):
+    """
+    Primeiro e último dias (inclusive) do filtro de ano/intervalo dentro da tabela
+    diária, ou None se o período não tiver nenhum dia.
+    """
+    if diaria.empty:
+        return None
+    inicio, fim = diaria.index[0], diaria.index[-1]
+    if start_date and end_date:
+        # Apenas dias inteiros contidos no intervalo pedido
+        inicio = max(inicio, pd.to_datetime(start_date).ceil('D'))
+        fim = min(fim, pd.to_datetime(end_date).floor('D'))
+    if selected_year:
+        inicio = max(inicio, pd.Timestamp(year=int(selected_year), month=1, day=1))
+        fim = min(fim, pd.Timestamp(year=int(selected_year), month=12, day=31))
+    if inicio > fim:
+        return None
+    return inicio, fim
+
+
+def consultar_cubo(cubo, selected_year=None, selected_month=None, start_date=None, end_date=None):
+    """
+    Soma as colunas de COLUNAS_CONSULTA do cubo para o filtro informado (mesma
+    semântica de prepare_and_filter_data em app.py), pelas somas acumuladas
+    (construir_prefixos): o custo é o mesmo para um dia ou para décadas.
+    A diferença de prefixos carrega erro de ponto flutuante nas últimas casas;
+    os cards descartam esse erro arredondando as somas em reais para centavos
+    (METRICAS_EM_CENTAVOS).
+    Retorna (Series com as somas, 'total_quartos' do primeiro dia).
+    """
+    vazio = pd.Series(0.0, index=COLUNAS_CONSULTA)
+    limites = _limites_periodo(cubo['diario'], selected_year, start_date, end_date)
+    if limites is None:
+        return vazio, 0
+    inicio, fim = limites
+
+    if selected_month:
+        somas, total_quartos = _somar_mes(cubo, int(selected_month), inicio, fim)
+    else:
+        somas, total_quartos = _somar_dias(cubo, inicio, fim)
+    if somas is None:
+        return vazio, 0
+    return pd.Series(somas, index=COLUNAS_CONSULTA), int(total_quartos)
+
+
+def consultar_intervalos(cubo, inicios, fins):
+    """
+    Somas das COLUNAS_CONSULTA de vários intervalos [inicio, fim] de uma vez (dias
+    inteiros contidos em cada intervalo, como em consultar_cubo): uma busca
+    binária vetorizada (searchsorted) para todos os inícios, outra para todos
+    os fins, e a diferença dos prefixos diários. Intervalos sem nenhum dia somam zero.
+
+    :param inicios: Datas de início (array-like)
+    :param fins: Datas de fim (array-like, mesmo tamanho)
+    :return: (matriz intervalos x COLUNAS_CONSULTA com as somas, array com o
+              'total_quartos' do primeiro dia de cada intervalo (0 se vazio),
+              array com o número de dias com dados de cada intervalo)
+    """
+    diaria = cubo['diario']
+    inicios = pd.DatetimeIndex(inicios).ceil('D').to_numpy()
+    fins = pd.DatetimeIndex(fins).floor('D').to_numpy()
+    a = diaria.index.searchsorted(inicios, side='left')
+    b = np.maximum(diaria.index.searchsorted(fins, side='right'), a)
+    prefixo = cubo['prefixo_diario']
+    somas = prefixo[b] - prefixo[a]
+
+    total_quartos = np.zeros(len(a))
+    if len(diaria):
+        primeiros = diaria['total_quartos'].to_numpy()[np.minimum(a, len(diaria) - 1)]
+        total_quartos = np.where(b > a, np.nan_to_num(primeiros), 0.0)
+    return somas, total_quartos.astype(np.int64), b - a
+
+
+def _centavos(soma):
+    """
+    Soma (ou array de somas) de uma métrica de METRICAS_EM_CENTAVOS como número
+    inteiro de centavos.
+    """
+    return np.round(np.asarray(soma, dtype='float64') * 100)
+
+
+def _media(soma, n, metrica):
+    """
+    soma / n; para as METRICAS_EM_CENTAVOS, centavos inteiros / (100 * n), uma
+    única divisão de inteiros exatos (o float mais próximo da média exata).
+    """
+    if metrica in METRICAS_EM_CENTAVOS:
+        return _centavos(soma) / (n * 100)
+    return soma / n
+
+
+def metricas_de_totais(totais, total_quartos):
+    """
+    Valores dos cards a partir das somas das colunas aditivas de um período
+    (Series indexada por COLUNAS_ADITIVAS) e do 'total_quartos' do primeiro dia.
+    """
+    def media(metrica):
+        if totais['linhas'] == 0:
+            return 0
+        n = totais[f'n_{metrica}']
+        return _media(totais[f'soma_{metrica}'], n, metrica) if n else float('nan')
+
+    return {
+        'total_quartos': total_quartos,
+        'receita_total': _centavos(totais['soma_receita_total_dia']) / 100,
+        'ocupacao_media': media('Ocupacao'),
+        'adr_medio': media('ADR'),
+        'gop_medio': media('GOP'),
+        'goppar_medio': media('GOPPAR'),
+    }
+
+
+def metricas_ponderadas(totais, total_quartos):
+    """
+    KPIs ponderados por quarto-noite a partir das somas dos valores do dia
+    (COLUNAS_DIA): ocupação = quartos ocupados / quartos disponíveis, ADR =
+    receita de quartos / quartos ocupados, RevPAR e GOPPAR = receita de quartos
+    e GOP / quartos disponíveis. Somando os totais de vários hotéis (ver
+    somar_totais), cada um pesa pelo seu número de quartos.
+    """
+    def razao(numerador, denominador):
+        return numerador / denominador if denominador else 0.0
+
+    disponiveis = totais['dia_total_quartos']
+    ocupados = totais['dia_quartos_ocupados']
+    return {
+        'total_quartos': total_quartos,
+        'receita_total': _centavos(totais['soma_receita_total_dia']) / 100,
+        'ocupacao': razao(ocupados, disponiveis) * 100,
+        'adr': razao(totais['dia_receita_quartos'], ocupados),
+        'revpar': razao(totais['dia_receita_quartos'], disponiveis),
+        'goppar': razao(totais['dia_gop'], disponiveis),
+    }
+
+
+def somar_totais(resultados):
+    """
+    Soma os resultados de consultar_cubo de vários hotéis: (totais somados,
+    soma dos 'total_quartos').
+    """
+    totais = pd.Series(0.0, index=COLUNAS_CONSULTA)
+    total_quartos = 0
+    for totais_hotel, quartos_hotel in resultados:
+        totais = totais + totais_hotel
+        total_quartos += quartos_hotel
+    return totais, total_quartos
+
+
+@instrumentacao.medido('metricas_periodo')
+def metricas_periodo(cubo, selected_year=None, selected_month=None, start_date=None, end_date=None):
+    """
+    Calcula os valores dos cards (total de quartos, receita total e médias das
+    métricas) a partir do cubo, sem percorrer as linhas de reservas.
+    """
+    totais, total_quartos = consultar_cubo(cubo, selected_year, selected_month, start_date, end_date)
+    return metricas_de_totais(totais, total_quartos)
+
+
+@instrumentacao.medido('serie_diaria', linhas=lambda serie, *a, **k: len(serie))
+def serie_diaria(cubo, metrica, selected_year=None, selected_month=None, start_date=None, end_date=None):
+    """
+    Série diária (colunas 'data' e `metrica`) com a média do dia de uma métrica do cubo.
+    Para as colunas *_dia, que repetem o valor do dia em cada reserva, a média é o
+    próprio valor diário: um ponto por dia em vez de um por reserva.
+    """
+    diaria = cubo['diario']
+    limites = _limites_periodo(diaria, selected_year, start_date, end_date)
+    if limites is None:
+        return pd.DataFrame(columns=['data', metrica])
+
+    a, b = _fatia_ordenada(diaria.index, *limites)
+    dias = diaria.iloc[a:b]
+    if selected_month:
+        dias = dias[dias.index.month == int(selected_month)]
+    return pd.DataFrame({
+        'data': dias.index,
+        metrica: (dias[f'soma_{metrica}'] / dias[f'n_{metrica}']).to_numpy(),
+    })
+
+
+@instrumentacao.medido('metricas_intervalos', linhas=lambda resultado, *a, **k: len(resultado))
+def metricas_intervalos(cubo, inicios, fins):
+    """
+    Métricas de vários intervalos em uma passada (consultar_intervalos): os
+    valores dos cards (metricas_de_totais) e os KPIs ponderados por quarto-noite
+    (metricas_ponderadas) de cada intervalo, calculados coluna a coluna.
+
+    :return: DataFrame com uma linha por intervalo: 'inicio', 'fim', 'dias' (com
+             dados), 'linhas' (reservas) e as métricas
+    """
+    somas, total_quartos, dias = consultar_intervalos(cubo, inicios, fins)
+    totais = dict(zip(COLUNAS_CONSULTA, somas.T))
+    linhas = totais['linhas']
+
+    def media(metrica):
+        n = totais[f'n_{metrica}']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            valores = np.where(n > 0, _media(totais[f'soma_{metrica}'], n, metrica), np.nan)
+        return np.where(linhas == 0, 0.0, valores)
+
+    def razao(numerador, denominador):
+        return np.divide(numerador, denominador, out=np.zeros(len(denominador)), where=denominador != 0)
+
+    disponiveis = totais['dia_total_quartos']
+    ocupados = totais['dia_quartos_ocupados']
+    return pd.DataFrame({
+        'inicio': pd.DatetimeIndex(inicios),
+        'fim': pd.DatetimeIndex(fins),
+        'dias': dias,
+        'linhas': linhas.astype(np.int64),
+        'total_quartos': total_quartos,
+        'receita_total': _centavos(totais['soma_receita_total_dia']) / 100,
+        'ocupacao_media': media('Ocupacao'),
+        'adr_medio': media('ADR'),
+        'gop_medio': media('GOP'),
+        'goppar_medio': media('GOPPAR'),
+        'ocupacao': razao(ocupados, disponiveis) * 100,
+        'adr': razao(totais['dia_receita_quartos'], ocupados),
+        'revpar': razao(totais['dia_receita_quartos'], disponiveis),
+        'goppar': razao(totais['dia_gop'], disponiveis),
+    })
@@ -0,0 +1,496 @@
+import os
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import (
+    BigInteger, Column, Date, Double, Index, Integer, MetaData, String, Table,
+    create_engine, delete, event, func, insert, inspect, select, update,
+)
+
+from data_processing import agregados, process_data, reservas
+from utils import instrumentacao
+
+# Backend SQL opcional (ver URL_BANCO em app.py). SQLite funciona sem nenhuma
+# configuração; URLs compatíveis com MySQL (mysql+mysqlconnector://...) também
+# são aceitas.
+URL_PADRAO = 'sqlite:///data/hotel.sqlite3'
+
+# Linhas por lote de INSERT (executemany) na carga do CSV
+TAMANHO_LOTE = 50_000
+
+# Colunas de reservas guardadas no banco (as exibidas no dashboard)
+COLUNAS_RESERVAS = [
+    'id_registro', 'data', 'ano', 'mes', 'nome_cliente', 'tipo_de_quarto',
+    'forma_de_pagamento', 'quantidade_quartos', 'quantidade_diarias',
+    'valor_diaria', 'valor_total_diarias', 'total_pago',
+]
+
+# Colunas dos fatos diários: hotel, data, ano, mês e as colunas da tabela diária do cubo
+COLUNAS_FATOS = ['hotel', 'data', 'ano', 'mes', 'total_quartos'] + agregados.COLUNAS_CONSULTA
+
+metadados = MetaData()
+
+# Fatos diários: a tabela diária do cubo de agregados (data_processing/agregados.py),
+# uma por hotel. Todas as consultas filtram por hotel, que abre os índices.
+fatos_diarios = Table(
+    'fatos_diarios', metadados,
+    Column('hotel', String(100), primary_key=True),
+    Column('data', Date, primary_key=True),
+    Column('ano', Integer, nullable=False),
+    Column('mes', Integer, nullable=False),
+    Column('total_quartos', Double),
+    *[Column(coluna, Double, nullable=False) for coluna in agregados.COLUNAS_ADITIVAS],
+    *[Column(coluna, Double) for coluna in agregados.COLUNAS_DIA],
+    Index('ix_fatos_diarios_hotel_ano_mes', 'hotel', 'ano', 'mes'),
+    Index('ix_fatos_diarios_hotel_mes', 'hotel', 'mes'),
+)
+
+# Reservas (uma linha por reserva); 'id' preserva a ordem do CSV
+tabela_reservas = Table(
+    'reservas', metadados,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('hotel', String(100), nullable=False),
+    Column('id_registro', BigInteger),
+    Column('data', Date, nullable=False),
+    Column('ano', Integer, nullable=False),
+    Column('mes', Integer, nullable=False),
+    Column('nome_cliente', String(100)),
+    Column('tipo_de_quarto', String(50)),
+    Column('forma_de_pagamento', String(50)),
+    Column('quantidade_quartos', Integer),
+    Column('quantidade_diarias', Integer),
+    Column('valor_diaria', Double),
+    Column('valor_total_diarias', Double),
+    Column('total_pago', Double),
+    Index('ix_reservas_hotel_data_tipo', 'hotel', 'data', 'tipo_de_quarto'),
+    Index('ix_reservas_hotel_ano_mes', 'hotel', 'ano', 'mes'),
+    Index('ix_reservas_hotel_mes', 'hotel', 'mes'),
+    Index('ix_reservas_hotel_tipo', 'hotel', 'tipo_de_quarto'),
+)
+
+# Posição de leitura do CSV já carregada no banco (carga incremental)
+controle_carga = Table(
+    'controle_carga', metadados,
+    Column('origem', String(500), primary_key=True),
+    Column('posicao', BigInteger, nullable=False),
+    Column('assinatura', String(64), nullable=False),
+)
+
+
+def _configurar_sqlite(conexao, _):
+    # WAL: leitores (workers) não bloqueiam a carga incremental, e vice-versa
+    cursor = conexao.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
+def _tabelas_desatualizadas(motor):
+    """
+    Tabelas existentes no banco cujas colunas diferem das definidas aqui
+    (ex.: criadas antes da coluna 'hotel'). Compara só os nomes das colunas:
+    mudanças de índice ou de tipo de uma coluna não são detectadas.
+    """
+    inspetor = inspect(motor)
+    existentes = set(inspetor.get_table_names())
+    return [
+        tabela.name for tabela in metadados.sorted_tables
+        if tabela.name in existentes
+        and {c['name'] for c in inspetor.get_columns(tabela.name)} != set(tabela.columns.keys())
+    ]
+
+
+def criar_motor(url=URL_PADRAO):
+    """
+    Cria o engine SQLAlchemy e as tabelas/índices que ainda não existirem.
+
+    O banco só guarda dados derivados dos CSVs: se alguma tabela estiver com
+    um esquema antigo, todas são recriadas (vazias, inclusive o controle de
+    carga), e a próxima sincronização recarrega cada hotel do seu CSV.
+    """
+    motor = create_engine(url, pool_pre_ping=True)
+    if motor.dialect.name == 'sqlite':
+        caminho = motor.url.database
+        if caminho and caminho != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        event.listen(motor, 'connect', _configurar_sqlite)
+    desatualizadas = _tabelas_desatualizadas(motor)
+    if desatualizadas:
+        print(f"Aviso: esquema antigo no banco ({', '.join(desatualizadas)}); "
+              "as tabelas serão recriadas e recarregadas a partir dos CSVs.")
+        metadados.drop_all(motor)
+    metadados.create_all(motor)
+    return motor
+
+
+def _tuplas(df, colunas):
+    """
+    Linhas do DataFrame como tuplas de valores Python, na ordem de `colunas`
+    (datas como texto ISO, ausentes como None), prontas para o executemany.
+    """
+    valores = []
+    for coluna in colunas:
+        serie = df[coluna]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            lista = np.datetime_as_string(serie.to_numpy(dtype='datetime64[D]'), unit='D').tolist()
+        elif serie.isna().any():
+            lista = serie.astype(object).where(serie.notna(), None).tolist()
+        else:
+            lista = serie.astype(object).tolist() if isinstance(serie.dtype, pd.CategoricalDtype) else serie.tolist()
+        valores.append(lista)
+    return list(zip(*valores))
+
+
+def _fatos(diaria, hotel):
+    """
+    Tabela diária com as colunas de fatos_diarios (hotel, data, ano e mês como colunas).
+    """
+    fatos = diaria.reset_index()
+    fatos['hotel'] = hotel
+    fatos['ano'] = fatos['data'].dt.year
+    fatos['mes'] = fatos['data'].dt.month
+    return fatos
+
+
+def _inserir_em_lotes(conexao, tabela, df, colunas):
+    """
+    INSERT em lotes de TAMANHO_LOTE linhas direto no driver (executemany, que o
+    mysql-connector transforma em INSERTs de várias linhas), sem montar um
+    dicionário de parâmetros por linha.
+    """
+    preparador = conexao.dialect.identifier_preparer
+    marcador = '?' if conexao.dialect.paramstyle == 'qmark' else '%s'
+    instrucao = (
+        f"INSERT INTO {preparador.format_table(tabela)} "
+        f"({', '.join(preparador.quote(c) for c in colunas)}) "
+        f"VALUES ({', '.join([marcador] * len(colunas))})"
+    )
+    for inicio in range(0, len(df), TAMANHO_LOTE):
+        conexao.exec_driver_sql(instrucao, _tuplas(df.iloc[inicio:inicio + TAMANHO_LOTE], colunas))
+
+
+def _somar_fatos(conexao, diaria, hotel):
+    """
+    Acrescenta uma tabela diária parcial aos fatos do hotel: dias já existentes
+    têm as colunas aditivas somadas (e mantêm 'total_quartos' e os valores do
+    dia); os novos são inseridos.
+    """
+    fatos = _fatos(diaria, hotel)
+    novos = []
+    for i, registro in enumerate(fatos.to_dict('records')):
+        somas = {coluna: fatos_diarios.c[coluna] + registro[coluna] for coluna in agregados.COLUNAS_ADITIVAS}
+        resultado = conexao.execute(
+            update(fatos_diarios)
+            .where(fatos_diarios.c.hotel == hotel, fatos_diarios.c.data == registro['data'].date())
+            .values(**somas)
+        )
+        if resultado.rowcount == 0:
+            novos.append(i)
+    if novos:
+        _inserir_em_lotes(conexao, fatos_diarios, fatos.iloc[novos], COLUNAS_FATOS)
+
+
+def carregar_csv(motor, file_path, preparar, tamanho_bloco=process_data.TAMANHO_BLOCO_PADRAO, hotel=None):
+    """
+    Recarrega os dados do hotel a partir do seu CSV, em blocos de `tamanho_bloco`
+    linhas e em uma única transação: reservas em lotes (executemany) e fatos
+    diários agregados ao final. A memória de pico é limitada pelo bloco; os
+    demais hotéis não são tocados.
+
+    :param preparar: Função aplicada a cada bloco tipado (ex.: calculate_metrics)
+    :param hotel: Identificador do hotel (padrão: nome do arquivo, sem extensão)
+    :return: Número de reservas carregadas
+    """
+    hotel = hotel or process_data.identificar_hotel(file_path)
+    # Só até a última linha completa agora: o que vier depois fica para sincronizar()
+    offset = process_data.fim_ultima_linha(file_path)
+    assinatura = process_data.assinatura_trecho(file_path, offset)
+    tipos_leitura = {c: t for c, t in process_data.TIPOS_COLUNAS.items() if t == 'category'}
+
+    diarias = []
+    linhas = 0
+    with motor.begin() as conexao:
+        conexao.execute(delete(tabela_reservas).where(tabela_reservas.c.hotel == hotel))
+        conexao.execute(delete(fatos_diarios).where(fatos_diarios.c.hotel == hotel))
+        conexao.execute(delete(controle_carga).where(controle_carga.c.origem == os.path.abspath(file_path)))
+        with process_data.abrir_trecho(file_path, offset) as trecho:
+            for bloco in pd.read_csv(trecho, dtype=tipos_leitura, chunksize=tamanho_bloco):
+                bloco, _ = process_data._tipar_bloco(bloco)
+                bloco = preparar(bloco)
+                bloco['hotel'] = hotel
+                _inserir_em_lotes(conexao, tabela_reservas, bloco, ['hotel'] + COLUNAS_RESERVAS)
+                diarias.append(agregados.construir_tabela_diaria(bloco))
+                linhas += len(bloco)
+        if diarias:
+            _inserir_em_lotes(conexao, fatos_diarios, _fatos(agregados.combinar_diarias(diarias), hotel), COLUNAS_FATOS)
+        conexao.execute(insert(controle_carga).values(
+            origem=os.path.abspath(file_path), posicao=offset, assinatura=assinatura
+        ))
+    return linhas
+
+
+def posicoes_carregadas(motor):
+    """
+    Posição de leitura e assinatura de cada CSV já carregado no banco:
+    {caminho absoluto: (posicao, assinatura)}.
+    """
+    with motor.connect() as conexao:
+        linhas = conexao.execute(select(controle_carga.c.origem, controle_carga.c.posicao, controle_carga.c.assinatura))
+        return {origem: (posicao, assinatura) for origem, posicao, assinatura in linhas}
+
+
+def sincronizar(motor, file_path, preparar, tamanho_bloco=process_data.TAMANHO_BLOCO_PADRAO, hotel=None):
+    """
+    Deixa os dados do hotel no banco em dia com o seu CSV: na primeira vez (ou se o arquivo foi
+    reescrito) carrega tudo; depois, só as linhas acrescentadas desde a última
+    carga (ver process_data.ler_linhas_novas).
+
+    Vários processos podem chamar esta função ao mesmo tempo: a posição de
+    leitura só avança se ainda for a que foi lida; senão nada é gravado.
+
+    :return: True se o conteúdo do banco mudou
+    """
+    hotel = hotel or process_data.identificar_hotel(file_path)
+    origem = os.path.abspath(file_path)
+    with motor.connect() as conexao:
+        controle = conexao.execute(select(controle_carga).where(controle_carga.c.origem == origem)).first()
+    if controle is None:
+        carregar_csv(motor, file_path, preparar, tamanho_bloco, hotel)
+        return True
+
+    resultado = process_data.ler_linhas_novas(file_path, controle.posicao, controle.assinatura)
+    if resultado is None:
+        carregar_csv(motor, file_path, preparar, tamanho_bloco, hotel)
+        return True
+    novas, offset, assinatura = resultado
+    if novas.empty:
+        return False
+
+    novas = preparar(novas)
+    novas['hotel'] = hotel
+    with motor.begin() as conexao:
+        avancou = conexao.execute(
+            update(controle_carga)
+            .where(controle_carga.c.origem == origem, controle_carga.c.posicao == controle.posicao)
+            .values(posicao=offset, assinatura=assinatura)
+        )
+        if avancou.rowcount == 0:
+            # Outro processo já incorporou estas linhas
+            return True
+        _inserir_em_lotes(conexao, tabela_reservas, novas, ['hotel'] + COLUNAS_RESERVAS)
+        _somar_fatos(conexao, agregados.construir_tabela_diaria(novas), hotel)
+    return True
+
+
+def _condicoes_periodo(tabela, hotel, selected_year=None, selected_month=None, start_date=None, end_date=None):
+    """
+    Condições SQL equivalentes aos filtros de hotel, ano, mês e intervalo do
+    dashboard (dias inteiros contidos no intervalo, como no cubo de agregados).
+    """
+    condicoes = [tabela.c.hotel == hotel]
+    if start_date and end_date:
+        condicoes.append(tabela.c.data >= pd.to_datetime(start_date).ceil('D').date())
+        condicoes.append(tabela.c.data <= pd.to_datetime(end_date).floor('D').date())
+    if selected_year:
+        condicoes.append(tabela.c.ano == int(selected_year))
+    if selected_month:
+        condicoes.append(tabela.c.mes == int(selected_month))
+    return condicoes
+
+
+def totais_periodo(motor, hotel, selected_year=None, selected_month=None, start_date=None, end_date=None):
+    """
+    Somas dos fatos diários do hotel no período (mesmo resultado de
+    agregados.consultar_cubo): (Series com as somas, 'total_quartos' do primeiro dia).
+    """
+    condicoes = _condicoes_periodo(fatos_diarios, hotel, selected_year, selected_month, start_date, end_date)
+    somas = [func.coalesce(func.sum(fatos_diarios.c[coluna]), 0) for coluna in agregados.COLUNAS_CONSULTA]
+    with motor.connect() as conexao:
+        linha = conexao.execute(select(*somas).where(*condicoes)).one()
+        total_quartos = conexao.execute(
+            select(fatos_diarios.c.total_quartos).where(*condicoes).order_by(fatos_diarios.c.data).limit(1)
+        ).scalar()
+    totais = pd.Series([float(v) for v in linha], index=agregados.COLUNAS_CONSULTA)
+    return totais, (int(total_quartos) if total_quartos is not None else 0)
+
+
+@instrumentacao.medido('metricas_periodo')
+def metricas_periodo(motor, hotel, selected_year=None, selected_month=None, start_date=None, end_date=None):
+    """
+    Valores dos cards (mesmo resultado de agregados.metricas_periodo), somados
+    pelo banco sobre os fatos diários do hotel.
+    """
+    return agregados.metricas_de_totais(*totais_periodo(motor, hotel, selected_year, selected_month, start_date, end_date))
+
+
+@instrumentacao.medido('serie_diaria', linhas=lambda serie, *a, **k: len(serie))
+def serie_diaria(motor, hotel, metrica, selected_year=None, selected_month=None, start_date=None, end_date=None):
+    """
+    Série diária do hotel (colunas 'data' e `metrica`), como agregados.serie_diaria.
+    """
+    condicoes = _condicoes_periodo(fatos_diarios, hotel, selected_year, selected_month, start_date, end_date)
+    consulta = (
+        select(fatos_diarios.c.data, fatos_diarios.c[f'soma_{metrica}'], fatos_diarios.c[f'n_{metrica}'])
+        .where(*condicoes).order_by(fatos_diarios.c.data)
+    )
+    with motor.connect() as conexao:
+        dias = pd.DataFrame(conexao.execute(consulta).all(), columns=['data', 'soma', 'n'])
+    return pd.DataFrame({
+        'data': pd.to_datetime(dias['data']),
+        metrica: (dias['soma'].astype(float) / dias['n'].astype(float)).to_numpy(),
+    })
+
+
+def valores_dia(motor, hotel, coluna):
+    """
+    Coluna da tabela diária (ex.: 'dia_quartos_ocupados') do hotel, como DataFrame
+    indexado por data, como a tabela diária do cubo (ver previsao.serie_continua).
+    """
+    consulta = (
+        select(fatos_diarios.c.data, fatos_diarios.c[coluna])
+        .where(fatos_diarios.c.hotel == hotel).order_by(fatos_diarios.c.data)
+    )
+    with motor.connect() as conexao:
+        dias = pd.DataFrame(conexao.execute(consulta).all(), columns=['data', coluna])
+    return pd.DataFrame({coluna: dias[coluna].astype(float).to_numpy()},
+                        index=pd.DatetimeIndex(pd.to_datetime(dias['data']), name='data'))
+
+
+@instrumentacao.medido('contar_tipos_quarto')
+def contar_tipos_quarto(motor, hotel, selected_year=None, selected_month=None, start_date=None, end_date=None):
+    """
+    Reservas do hotel por tipo de quarto no período (colunas 'Tipo' e
+    'Quantidade'), como prepare_donut_chart_data em app.py.
+    """
+    condicoes = _condicoes_periodo(tabela_reservas, hotel, selected_year, selected_month, start_date, end_date)
+    quantidade = func.count().label('quantidade')
+    consulta = (
+        select(tabela_reservas.c.tipo_de_quarto, quantidade)
+        .where(*condicoes)
+        .group_by(tabela_reservas.c.tipo_de_quarto)
+        .order_by(quantidade.desc(), tabela_reservas.c.tipo_de_quarto)
+    )
+    with motor.connect() as conexao:
+        return pd.DataFrame(conexao.execute(consulta).all(), columns=['Tipo', 'Quantidade'])
+
+
+def listar_anos_meses(motor, hotel):
+    """
+    Anos e meses (do calendário) presentes nos fatos diários do hotel, em ordem crescente.
+    """
+    do_hotel = fatos_diarios.c.hotel == hotel
+    with motor.connect() as conexao:
+        anos = conexao.execute(
+            select(fatos_diarios.c.ano).where(do_hotel).distinct().order_by(fatos_diarios.c.ano)
+        ).scalars().all()
+        meses = conexao.execute(
+            select(fatos_diarios.c.mes).where(do_hotel).distinct().order_by(fatos_diarios.c.mes)
+        ).scalars().all()
+    return anos, meses
+
+
+def fatos_do_ano(motor, hotel, ano):
+    """
+    Fatos diários do hotel em um ano, no formato da tabela diária do cubo
+    (indexados por data, com 'total_quartos' e as COLUNAS_CONSULTA).
+    """
+    colunas = ['total_quartos'] + agregados.COLUNAS_CONSULTA
+    consulta = (
+        select(fatos_diarios.c.data, *[fatos_diarios.c[coluna] for coluna in colunas])
+        .where(fatos_diarios.c.hotel == hotel, fatos_diarios.c.ano == int(ano))
+        .order_by(fatos_diarios.c.data)
+    )
+    with motor.connect() as conexao:
+        dias = pd.DataFrame(conexao.execute(consulta).all(), columns=['data'] + colunas)
+    return pd.DataFrame(dias[colunas].astype('float64').to_numpy(), columns=colunas,
+                        index=pd.DatetimeIndex(pd.to_datetime(dias['data']), name='data'))
+
+
+def tipos_quarto_do_ano(motor, hotel, ano):
+    """
+    Reservas do hotel em um ano somadas por mês e tipo de quarto, no formato de
+    relatorios.somar_tipos_quarto.
+    """
+    consulta = (
+        select(
+            tabela_reservas.c.mes,
+            tabela_reservas.c.tipo_de_quarto,
+            func.count(),
+            func.sum(tabela_reservas.c.quantidade_quartos * tabela_reservas.c.quantidade_diarias),
+            func.sum(tabela_reservas.c.valor_total_diarias),
+            func.sum(tabela_reservas.c.total_pago),
+        )
+        .where(tabela_reservas.c.hotel == hotel, tabela_reservas.c.ano == int(ano))
+        .group_by(tabela_reservas.c.mes, tabela_reservas.c.tipo_de_quarto)
+        .order_by(tabela_reservas.c.mes, tabela_reservas.c.tipo_de_quarto)
+    )
+    colunas = ['mes', 'tipo_de_quarto', 'reservas', 'quartos_noite', 'valor_diarias', 'total_pago']
+    with motor.connect() as conexao:
+        tipos = pd.DataFrame(conexao.execute(consulta).all(), columns=colunas)
+    return tipos.astype({'mes': 'int64', 'reservas': 'int64', 'quartos_noite': 'float64',
+                         'valor_diarias': 'float64', 'total_pago': 'float64'})
+
+
+def _condicoes_filtro(filtro):
+    """
+    Condições SQL para a filter_query do DataTable (ver reservas.interpretar_filtro).
+    Colunas de texto e de data comparam com o texto digitado; as numéricas, com o valor.
+    """
+    condicoes = []
+    for nome, operador, valor, texto in reservas.interpretar_filtro(filtro):
+        if nome not in COLUNAS_RESERVAS:
+            continue
+        coluna = tabela_reservas.c[nome]
+        try:
+            if nome == 'data':
+                inicio, fim = reservas.limites_data(texto)
+                if operador in ('datestartswith', 'contains'):
+                    condicoes.extend([coluna >= inicio.date(), coluna < fim.date()])
+                    continue
+                valor = inicio.date()
+            elif isinstance(coluna.type, String):
+                if operador == 'contains':
+                    condicoes.append(func.lower(coluna).contains(texto.lower(), autoescape=True))
+                elif operador in ('eq', 'ne'):
+                    condicoes.append(coluna == texto if operador == 'eq' else coluna != texto)
+                continue
+            elif operador in ('contains', 'datestartswith'):
+                continue
+            else:
+                valor = float(valor)
+        except (ValueError, TypeError):
+            continue
+        comparacoes = {
+            'eq': coluna == valor, 'ne': coluna != valor,
+            'lt': coluna < valor, 'le': coluna <= valor,
+            'gt': coluna > valor, 'ge': coluna >= valor,
+        }
+        condicoes.append(comparacoes[operador])
+    return condicoes
+
+
+def consultar_reservas(motor, hotel, pagina=0, tamanho=25, ordenacao=None, filtro=None, periodo=None):
+    """
+    Uma página de reservas do hotel, com ordenação e filtro resolvidos pelo banco
+    (mesmo contrato de reservas.consultar_reservas).
+
+    :param periodo: (ano, mês, data inicial, data final) dos filtros do dashboard
+    :return: (DataFrame com as linhas da página, total de linhas filtradas)
+    """
+    condicoes = _condicoes_filtro(filtro) + _condicoes_periodo(tabela_reservas, hotel, *(periodo or ()))
+
+    coluna, decrescente = 'data', True
+    if ordenacao and ordenacao[0].get('column_id') in COLUNAS_RESERVAS:
+        coluna, decrescente = ordenacao[0]['column_id'], ordenacao[0].get('direction') == 'desc'
+    # Empates seguem a ordem por data e a ordem do CSV, como no índice em memória
+    chaves = [tabela_reservas.c[coluna], tabela_reservas.c.data, tabela_reservas.c.id]
+    if decrescente:
+        chaves = [chave.desc() for chave in chaves]
+
+    colunas = [tabela_reservas.c[c] for c in COLUNAS_RESERVAS]
+    consulta = select(*colunas).where(*condicoes).order_by(*chaves).limit(tamanho).offset(pagina * tamanho)
+    with motor.connect() as conexao:
+        total = conexao.execute(select(func.count()).select_from(tabela_reservas).where(*condicoes)).scalar()
+        linhas = pd.DataFrame(conexao.execute(consulta).all(), columns=COLUNAS_RESERVAS)
+    linhas['data'] = pd.to_datetime(linhas['data'])
+    return linhas, total
@@ -0,0 +1,108 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_processing import agregados
+
+# DataFrame lido pelos processos de construir_cubo. Os processos são criados
+# por fork e herdam a memória do processo principal: cada um recebe apenas a
+# faixa de posições do seu ano, e não uma cópia serializada das linhas.
+_fonte = None
+
+
+def _contexto():
+    """
+    Contexto 'fork' do multiprocessing, ou None onde ele não existe (Windows)
+    ou não é seguro: fora da thread principal (ex.: callbacks do servidor),
+    um fork pode herdar travas presas por outras threads.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return None
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context('fork')
+
+
+def mapear(funcao, tarefas, processos):
+    """
+    Aplica `funcao` a cada tarefa em um pool de até `processos` processos.
+    Os resultados voltam na ordem das tarefas, qualquer que seja a ordem em que
+    terminam, então o resultado não depende do número de processos. Com um
+    processo (ou sem fork disponível), roda em série no próprio processo.
+
+    :return: Lista com os resultados, na ordem de `tarefas`
+    """
+    tarefas = list(tarefas)
+    processos = min(int(processos or 1), len(tarefas))
+    contexto = _contexto()
+    if processos <= 1 or contexto is None:
+        return [funcao(tarefa) for tarefa in tarefas]
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+        return list(executor.map(funcao, tarefas))
+
+
+def faixas_por_ano(df):
+    """
+    Faixas [a, b) de posições de cada ano em um DataFrame ordenado e indexado
+    por data (process_data.indexar_por_data), em ordem cronológica.
+    """
+    datas = df.index
+    if len(datas) == 0:
+        return []
+    anos = np.arange(datas[0].year, datas[-1].year + 2)
+    limites = datas.searchsorted(pd.to_datetime([f'{ano}-01-01' for ano in anos]), side='left')
+    return [(int(a), int(b)) for a, b in zip(limites[:-1], limites[1:]) if a < b]
+
+
+def juntar_faixas(faixas, partes):
+    """
+    Junta faixas contíguas (ex.: de faixas_por_ano) em até `partes` faixas com
+    números de linhas parecidos, sem dividir nenhuma delas: cada processo recebe
+    uma faixa maior em vez de pagar o custo fixo de uma agregação por ano.
+    """
+    if len(faixas) <= partes:
+        return list(faixas)
+    primeira, ultima = faixas[0][0], faixas[-1][1]
+    total = ultima - primeira
+    # Cada corte é a fronteira entre faixas mais próxima da sua fração do total,
+    # depois do corte anterior e deixando fronteiras para os cortes seguintes:
+    # são sempre `partes` faixas juntas, nenhuma vazia
+    fronteiras = [b for _, b in faixas[:-1]]
+    cortes = [primeira]
+    anterior = -1
+    for k in range(1, partes):
+        alvo = primeira + total * k / partes
+        candidatas = range(anterior + 1, len(fronteiras) - (partes - 1 - k))
+        anterior = min(candidatas, key=lambda i: abs(fronteiras[i] - alvo))
+        cortes.append(fronteiras[anterior])
+    cortes.append(ultima)
+    return list(zip(cortes[:-1], cortes[1:]))
+
+
+def _diaria_da_faixa(faixa):
+    a, b = faixa
+    return agregados.construir_tabela_diaria(_fonte.iloc[a:b])
+
+
+def construir_cubo(df, processos):
+    """
+    Mesmo resultado de agregados.construir_cubo, com as tabelas diárias de
+    grupos de anos calculadas em processos separados. Os anos não compartilham
+    dias, então juntar as parciais (agregados.combinar_diarias: somas e
+    contagens somadas) dá exatamente as mesmas somas, na mesma ordem, que o
+    cálculo em série.
+    """
+    global _fonte
+    faixas = juntar_faixas(faixas_por_ano(df), int(processos or 1))
+    if min(int(processos or 1), len(faixas)) <= 1 or _contexto() is None:
+        return agregados.construir_cubo(df)
+
+    _fonte = df
+    try:
+        diarias = mapear(_diaria_da_faixa, faixas, processos)
+    finally:
+        _fonte = None
+    return agregados.cubo_de_diaria(agregados.combinar_diarias(diarias))
@@ -0,0 +1,291 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_processing import process_data
+from utils import instrumentacao
+
+# Previsão de demanda a partir da série diária do hotel: linha de base sazonal
+# (efeito do mês + efeito do dia da semana) mais o nível da série
+# dessazonalizada, suavizado exponencialmente:
+#   nivel_t = alfa * x_t + (1 - alfa) * nivel_{t-1},   x_t = y_t - sazonal_t
+#   previsao_{T+h} = nivel_T + sazonal_{T+h}
+# A suavização é um filtro recursivo de primeira ordem (scipy.signal.lfilter),
+# sem laço em Python, e a previsão de todos os horizontes é uma soma de vetores.
+
+# Séries previstas: nome exibido -> coluna da tabela diária do cubo
+SERIES = {
+    'quartos_ocupados_dia': 'dia_quartos_ocupados',
+    'receita_quartos_dia': 'dia_receita_quartos',
+}
+
+# Muda quando o formato do modelo muda (modelos gravados com outra versão são refeitos)
+VERSAO_MODELO = 1
+
+# Dias novos desde o último ajuste completo a partir dos quais alfa é reajustado;
+# até lá, os dias novos só atualizam as somas sazonais, o nível e o erro
+REAJUSTE_DIAS = 90
+
+# Primeiros dias fora do cálculo do erro (o nível ainda está se formando)
+AQUECIMENTO_DIAS = 30
+
+# Mínimo de dias de histórico para ajustar um modelo
+MINIMO_DIAS = 2 * 7
+
+# Quantil normal do intervalo de previsão (95%)
+Z_INTERVALO = 1.96
+
+
+def serie_continua(diaria, serie):
+    """
+    Série diária contínua (um valor por dia, do primeiro ao último dia com
+    reservas) de uma das SERIES, lida da tabela diária do cubo (ou das linhas
+    equivalentes do banco, armazenamento.valores_dia). Dias sem reservas valem zero.
+
+    :return: Series float64 indexada por data
+    """
+    valores = diaria[SERIES[serie]].astype('float64')
+    if valores.empty:
+        return valores
+    dias = pd.date_range(valores.index[0], valores.index[-1], freq='D', name='data')
+    return valores.reindex(dias, fill_value=0.0)
+
+
+def _somas_sazonais(dias, y):
+    """
+    Somas e contagens de y por mês, por dia da semana e a contagem cruzada
+    (dia da semana x mês), com np.bincount.
+    """
+    mes = dias.month.to_numpy() - 1
+    semana = dias.dayofweek.to_numpy()
+    return {
+        'soma': float(y.sum()),
+        'n': int(len(y)),
+        'soma_mes': np.bincount(mes, weights=y, minlength=12),
+        'n_mes': np.bincount(mes, minlength=12),
+        'soma_semana': np.bincount(semana, weights=y, minlength=7),
+        'n_semana': np.bincount(semana, minlength=7),
+        'cruzado': np.bincount(semana * 12 + mes, minlength=84).reshape(7, 12),
+    }
+
+
+def _fatores(modelo):
+    """
+    Efeitos de mês (12) e de dia da semana (7) sobre a média geral. O efeito
+    do dia da semana é medido depois de descontado o do mês: a média dos efeitos
+    de mês de cada dia da semana vem da contagem cruzada.
+    """
+    media = modelo['soma'] / modelo['n']
+    n_mes = np.asarray(modelo['n_mes'], dtype=float)
+    n_semana = np.asarray(modelo['n_semana'], dtype=float)
+    efeito_mes = np.divide(np.asarray(modelo['soma_mes']) - n_mes * media, n_mes,
+                           out=np.zeros(12), where=n_mes > 0)
+    descontado = (np.asarray(modelo['soma_semana']) - n_semana * media
+                  - np.asarray(modelo['cruzado'], dtype=float) @ efeito_mes)
+    efeito_semana = np.divide(descontado, n_semana, out=np.zeros(7), where=n_semana > 0)
+    return efeito_mes, efeito_semana
+
+
+def _sazonal(modelo, dias):
+    """Linha de base sazonal (sem o nível) para cada dia de `dias`."""
+    efeito_mes, efeito_semana = _fatores(modelo)
+    return efeito_mes[dias.month.to_numpy() - 1] + efeito_semana[dias.dayofweek.to_numpy()]
+
+
+def _suavizar(x, alfa, nivel_anterior):
+    """
+    Níveis suavizados de x a partir de `nivel_anterior` e os erros de previsão
+    um passo à frente (x_t - nivel_{t-1}).
+    """
+    # Importado na primeira chamada: o scipy.signal leva ~0,5 s para carregar
+    from scipy.signal import lfilter
+    niveis, _ = lfilter([alfa], [1.0, alfa - 1.0], x, zi=[(1.0 - alfa) * nivel_anterior])
+    anteriores = np.concatenate([[nivel_anterior], niveis[:-1]])
+    return niveis, x - anteriores
+
+
+def _como_json(modelo):
+    """Cópia do modelo com os arrays como listas (para gravar em JSON)."""
+    return {chave: valor.tolist() if isinstance(valor, np.ndarray) else valor for chave, valor in modelo.items()}
+
+
+def ajustar(serie):
+    """
+    Ajusta o modelo à série inteira: somas sazonais, alfa (mínimo da soma dos
+    quadrados dos erros um passo à frente, por busca limitada em [0,001; 1]),
+    nível final e variância dos erros.
+
+    :param serie: Series diária contínua (serie_continua)
+    :return: dict do modelo, ou None se a série tem menos de MINIMO_DIAS dias
+    """
+    if len(serie) < MINIMO_DIAS:
+        return None
+    from scipy.optimize import minimize_scalar
+    dias = serie.index
+    y = serie.to_numpy(dtype='float64')
+    modelo = _somas_sazonais(dias, y)
+    x = y - _sazonal(modelo, dias)
+    inicial = float(x[:7].mean())
+    descarte = AQUECIMENTO_DIAS if len(x) > 2 * AQUECIMENTO_DIAS else 0
+
+    def erro_quadratico(alfa):
+        return float(np.square(_suavizar(x, alfa, inicial)[1][descarte:]).sum())
+
+    alfa = float(minimize_scalar(erro_quadratico, bounds=(0.001, 1.0), method='bounded',
+                                 options={'xatol': 1e-3}).x)
+    niveis, erros = _suavizar(x, alfa, inicial)
+    modelo.update({
+        'versao': VERSAO_MODELO,
+        'alfa': alfa,
+        'nivel': float(niveis[-1]),
+        'soma_erros2': float(np.square(erros[descarte:]).sum()),
+        'n_erros': int(len(erros) - descarte),
+        'inicio': dias[0].strftime('%Y-%m-%d'),
+        'fim': dias[-1].strftime('%Y-%m-%d'),
+        'ajustado_ate': dias[-1].strftime('%Y-%m-%d'),
+    })
+    return modelo
+
+
+def atualizar(modelo, serie):
+    """
+    Incorpora ao modelo os dias de `serie` posteriores ao fim do modelo, sem
+    reprocessar o histórico: soma os dias novos às somas sazonais e continua a
+    suavização a partir do último nível, com o mesmo alfa. Depois de
+    REAJUSTE_DIAS dias novos desde o último ajuste completo, reajusta tudo.
+
+    :return: Novo dict do modelo (o recebido não é alterado)
+    """
+    fim = pd.Timestamp(modelo['fim'])
+    novos = serie[serie.index > fim]
+    if novos.empty:
+        return modelo
+    if (novos.index[-1] - pd.Timestamp(modelo['ajustado_ate'])).days >= REAJUSTE_DIAS:
+        return ajustar(serie)
+
+    dias = novos.index
+    y = novos.to_numpy(dtype='float64')
+    acrescimo = _somas_sazonais(dias, y)
+    novo = dict(modelo)
+    for chave in ('soma', 'n', 'soma_mes', 'n_mes', 'soma_semana', 'n_semana', 'cruzado'):
+        novo[chave] = np.asarray(modelo[chave]) + acrescimo[chave]
+    novo['soma'] = float(novo['soma'])
+    novo['n'] = int(novo['n'])
+
+    niveis, erros = _suavizar(y - _sazonal(novo, dias), novo['alfa'], novo['nivel'])
+    novo['nivel'] = float(niveis[-1])
+    novo['soma_erros2'] = float(modelo['soma_erros2'] + np.square(erros).sum())
+    novo['n_erros'] = int(modelo['n_erros'] + len(erros))
+    novo['fim'] = dias[-1].strftime('%Y-%m-%d')
+    return novo
+
+
+@instrumentacao.medido('prever_demanda')
+def prever(modelo, horizonte):
+    """
+    Previsão dos `horizonte` dias seguintes ao fim do modelo, todos de uma vez,
+    com o intervalo de 95% da suavização exponencial simples (valores negativos viram zero)
+    (variância do erro a h passos: sigma² * (1 + (h - 1) * alfa²)).
+
+    :return: DataFrame com 'data', 'previsao', 'inferior' e 'superior'
+    """
+    dias = pd.date_range(pd.Timestamp(modelo['fim']) + pd.Timedelta(days=1), periods=int(horizonte), freq='D')
+    previsao = modelo['nivel'] + _sazonal(modelo, dias)
+    sigma = np.sqrt(modelo['soma_erros2'] / max(modelo['n_erros'], 1))
+    largura = Z_INTERVALO * sigma * np.sqrt(1.0 + np.arange(len(dias)) * modelo['alfa'] ** 2)
+    return pd.DataFrame({
+        'data': dias,
+        'previsao': np.maximum(previsao, 0.0),
+        'inferior': np.maximum(previsao - largura, 0.0),
+        'superior': np.maximum(previsao + largura, 0.0),
+    })
+
+
+def caminho_cache(file_path, serie):
+    """
+    Arquivo JSON com o modelo de uma série do hotel, na pasta do cache colunar
+    do CSV. Um arquivo por série: processos que gravam séries diferentes ao
+    mesmo tempo não apagam o modelo um do outro.
+    """
+    pasta = os.path.join(os.path.dirname(os.path.abspath(file_path)), process_data.PASTA_CACHE)
+    base = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(pasta, f"{base}.previsao.{serie}.json")
+
+
+def _compativel(modelo, serie):
+    """
+    O modelo foi ajustado a um prefixo de `serie`? Confere a versão, o primeiro
+    dia, o tamanho e a soma dos valores do prefixo (linhas reescritas mudam a soma).
+    """
+    if not modelo or modelo.get('versao') != VERSAO_MODELO or serie.empty:
+        return False
+    n = modelo['n']
+    if modelo['inicio'] != serie.index[0].strftime('%Y-%m-%d') or n > len(serie):
+        return False
+    if serie.index[n - 1].strftime('%Y-%m-%d') != modelo['fim']:
+        return False
+    return bool(np.isclose(serie.to_numpy()[:n].sum(), modelo['soma'], rtol=1e-9, atol=1e-6))
+
+
+def _ler_modelo(caminho):
+    if not os.path.exists(caminho):
+        return None
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Aviso: modelo de previsão '{caminho}' ilegível, ajustando de novo ({e}).")
+        return None
+
+
+def _gravar_modelo(caminho, modelo):
+    """
+    Grava o modelo no JSON da série (arquivo temporário + os.replace: outro
+    processo nunca lê um arquivo pela metade, e a última gravação vale inteira).
+    Falhas não impedem a previsão.
+    """
+    try:
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(_como_json(modelo), f)
+        os.replace(temporario, caminho)
+    except OSError as e:
+        print(f"Aviso: não foi possível gravar o modelo de previsão em '{caminho}' ({e}).")
+
+
+# Modelos já usados neste processo: caminho do JSON da série -> modelo
+_modelos = {}
+
+
+@instrumentacao.medido('modelo_previsao', linhas=lambda modelo, arquivo, nome, serie: len(serie))
+def modelo_em_cache(arquivo, nome, serie):
+    """
+    Modelo da série `nome` do hotel do CSV `arquivo`, ajustado a `serie`.
+    Procura o modelo na memória do processo e depois no disco (caminho_cache):
+    se cobre a série inteira, é usado como está; se cobre um prefixo dela
+    (dias acrescentados ao CSV), é atualizado só com os dias novos; se não
+    corresponde à série (arquivo reescrito), é ajustado de novo. Modelos novos
+    ou atualizados são gravados no disco.
+
+    :return: dict do modelo, ou None se a série é curta demais
+    """
+    caminho = caminho_cache(arquivo, nome)
+    modelo = _modelos.get(caminho)
+    if not _compativel(modelo, serie):
+        modelo = _ler_modelo(caminho)
+        if not _compativel(modelo, serie):
+            modelo = None
+
+    if modelo is not None and modelo['n'] == len(serie):
+        _modelos[caminho] = modelo
+        return modelo
+
+    modelo = atualizar(modelo, serie) if modelo is not None else ajustar(serie)
+    if modelo is not None:
+        _modelos[caminho] = modelo
+        _gravar_modelo(caminho, modelo)
+    return modelo
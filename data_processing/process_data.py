@@ -1,11 +1,85 @@
+import ctypes
+import glob
+import hashlib
+import io
+import itertools
+import json
+import mmap
+import os
+
+import numpy as np
 import pandas as pd
 
-def load_and_process_data(file_path):
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # o cache colunar fica desativado sem pyarrow
+    pa = pq = None
+
+# Tipos declarados para as colunas do CSV (as demais seguem a inferência do pandas)
+TIPOS_COLUNAS = {
+    'nome_hotel': 'category',
+    'tipo_de_quarto': 'category',
+    'nome_cliente': 'category',
+    'forma_de_pagamento': 'category',
+    'ano': 'int16',
+    'mes': 'int16',
+}
+COLUNAS_DATA = ['data']
+
+# Colunas efetivamente usadas pelo dashboard (app.py)
+COLUNAS_DASHBOARD = [
+    'data', 'ano', 'mes',
+    'nome_cliente', 'tipo_de_quarto', 'valor_total_diarias',
+    'total_quartos', 'quartos_ocupados_dia', 'receita_quartos_dia',
+    'receita_total_dia', 'lucro_operacional_bruto_dia', 'goppar_dia',
+    # Explorador de reservas (/desempenho-reservas)
+    'id_registro', 'forma_de_pagamento', 'quantidade_quartos', 'quantidade_diarias',
+    'valor_diaria', 'total_pago',
+]
+
+# Dados compactos (ver compactar): colunas próprias de cada reserva. Os valores
+# do dia (quartos, receitas, lucro e KPIs) ficam só na tabela diária do cubo.
+COLUNAS_RESERVA = [
+    'id_registro', 'nome_cliente', 'tipo_de_quarto', 'forma_de_pagamento',
+    'quantidade_quartos', 'quantidade_diarias', 'valor_diaria', 'valor_total_diarias', 'total_pago',
+]
+COLUNAS_MONETARIAS = ['valor_diaria', 'valor_total_diarias', 'total_pago']
+
+# Valores monetários abaixo deste limite têm os centavos exatos em float32
+# (24 bits de mantissa), depois de arredondados a duas casas
+LIMITE_FLOAT32 = 2 ** 24 / 100
+
+# Pasta (relativa ao CSV) onde fica o cache colunar
+PASTA_CACHE = '.cache'
+
+# Linhas por bloco na ingestão em blocos (ingerir_em_blocos)
+TAMANHO_BLOCO_PADRAO = 250_000
+
+
+def load_and_process_data(file_path, colunas=None, usar_cache=True, ate=None):
     """
     Carrega os dados do arquivo CSV e retorna um DataFrame.
+
+    Na primeira carga o CSV é convertido para um cache colunar (Parquet) com os
+    tipos de TIPOS_COLUNAS; nas seguintes, o cache é lido diretamente, apenas com
+    as colunas pedidas em `colunas` (None = todas). O cache é invalidado quando o
+    tamanho ou o conteúdo (hash) do CSV mudam.
+
+    Com `ate`, só os primeiros `ate` bytes do CSV são considerados (ver
+    fim_ultima_linha), mesmo que o arquivo cresça durante a leitura.
     """
     try:
-        df = pd.read_csv(file_path)
+        if usar_cache:
+            df = _ler_cache(file_path, colunas, ate)
+            if df is not None:
+                return df
+
+        df = _ler_csv(file_path, ate)
+        if usar_cache:
+            _gravar_cache(file_path, df, ate)
+        if colunas is not None:
+            df = df[colunas]
         return df
     except FileNotFoundError:
         print(f"Erro: Arquivo '{file_path}' não encontrado.")
@@ -13,3 +87,429 @@ def load_and_process_data(file_path):
     except Exception as e:
         print(f"Erro ao carregar o arquivo: {e}")
         return None
+
+
+def indexar_por_data(df):
+    """
+    Ordena o DataFrame por 'data' (ordenação estável, preserva a ordem do arquivo
+    dentro de cada dia) e usa as datas como índice, permitindo filtrar períodos por
+    busca binária. A coluna 'data' é mantida.
+    Um DataFrame compacto (sem a coluna, ver compactar) só é ordenado pelo índice.
+    """
+    if 'data' not in df.columns:
+        if not df.index.is_monotonic_increasing:
+            df = df.iloc[np.argsort(df.index.to_numpy(), kind='stable')]
+        return df
+    if not pd.api.types.is_datetime64_any_dtype(df['data']):
+        df = df.assign(data=pd.to_datetime(df['data']))
+    if not df['data'].is_monotonic_increasing:
+        df = df.sort_values('data', kind='mergesort')
+    df.index = pd.DatetimeIndex(df['data'].to_numpy())
+    return df
+
+
+def compactar(df):
+    """
+    Representação compacta do DataFrame de reservas (ordenado e indexado por
+    data), para manter décadas de histórico em memória em cada worker:
+    - só as colunas de COLUNAS_RESERVA: os valores do dia, repetidos em cada
+      reserva, ficam uma única vez na tabela diária do cubo (agregados.construir_tabela_diaria);
+    - as datas ficam só no índice (a coluna 'data' repetia o índice);
+    - nomes, tipos de quarto e formas de pagamento como categorias (dicionário + códigos);
+    - valores monetários em float32 quando os centavos cabem (LIMITE_FLOAT32);
+    - inteiros no menor tipo que comporta os valores.
+    """
+    compacto = df[[c for c in COLUNAS_RESERVA if c in df.columns]].copy()
+    for coluna in compacto.columns:
+        serie = compacto[coluna]
+        if coluna in COLUNAS_MONETARIAS:
+            if serie.dtype != np.float32 and (serie.abs().max() < LIMITE_FLOAT32 or serie.empty):
+                compacto[coluna] = serie.round(2).astype(np.float32)
+        elif pd.api.types.is_integer_dtype(serie):
+            compacto[coluna] = pd.to_numeric(serie, downcast='integer')
+        elif not isinstance(serie.dtype, pd.CategoricalDtype):
+            compacto[coluna] = serie.astype('category')
+    return compacto
+
+
+def devolver_memoria():
+    """
+    Devolve ao sistema as páginas livres depois de uma carga: o pool de memória
+    do pyarrow e o malloc da glibc as guardam para reuso, e o RSS do processo
+    (e de cada worker criado depois) ficaria no pico da carga.
+    """
+    if pa is not None:
+        pa.default_memory_pool().release_unused()
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass  # fora do Linux (glibc), a memória fica com o alocador
+
+
+def tem_coluna(df, nome):
+    """Indica se o DataFrame tem a coluna (em um DataFrame compacto, 'data' é o índice)."""
+    return nome in df.columns or (nome == 'data' and isinstance(df.index, pd.DatetimeIndex))
+
+
+def coluna(df, nome):
+    """Coluna `nome` do DataFrame; 'data' vem do índice quando a coluna foi descartada (compactar)."""
+    if nome not in df.columns and nome == 'data':
+        return pd.Series(df.index, index=df.index, name='data')
+    return df[nome]
+
+
+def cache_valido(file_path, ate=None):
+    """
+    Indica se já existe um cache colunar válido para o CSV (ou para os seus
+    primeiros `ate` bytes).
+    """
+    caminho_parquet, caminho_meta = _caminhos_cache(file_path)
+    return os.path.exists(caminho_parquet) and _cache_valido(file_path, caminho_meta, ate)
+
+
+def deve_ingerir_em_blocos(file_path, limite_bytes, ate=None):
+    """
+    Indica se o CSV deve passar pela ingestão em blocos: arquivo maior que
+    `limite_bytes`, sem cache válido e com pyarrow disponível.
+    """
+    return (pq is not None
+            and (os.path.getsize(file_path) if ate is None else ate) > limite_bytes
+            and not cache_valido(file_path, ate))
+
+
+def fim_ultima_linha(file_path, tamanho_bloco=1 << 16):
+    """
+    Posição logo após a última quebra de linha do arquivo: até ali só há linhas
+    completas. Uma última linha sem quebra de linha é tratada como ainda sendo
+    gravada (como em ler_linhas_novas).
+    """
+    with open(file_path, 'rb') as f:
+        fim = f.seek(0, os.SEEK_END)
+        while fim > 0:
+            inicio = max(0, fim - tamanho_bloco)
+            f.seek(inicio)
+            posicao = f.read(fim - inicio).rfind(b'\n')
+            if posicao >= 0:
+                return inicio + posicao + 1
+            fim = inicio
+    return 0
+
+
+def abrir_trecho(file_path, ate):
+    """
+    Os primeiros `ate` bytes do arquivo, mapeados em memória (sem cópia), para o
+    pandas ler só até ali. Usar com `with`.
+    """
+    if ate == 0:
+        return io.BytesIO()
+    with open(file_path, 'rb') as f:
+        return mmap.mmap(f.fileno(), ate, access=mmap.ACCESS_READ)
+
+
+def _tipar_bloco(bloco):
+    """
+    Valida e converte os tipos de um bloco do CSV.
+    Colunas do dashboard ausentes geram erro; linhas com data, ano ou mês
+    inválidos são descartadas (e contadas).
+    """
+    faltando = [c for c in COLUNAS_DASHBOARD if c not in bloco.columns]
+    if faltando:
+        raise ValueError(f"colunas ausentes no CSV: {', '.join(faltando)}")
+
+    bloco['data'] = pd.to_datetime(bloco['data'], errors='coerce')
+    for coluna in ('ano', 'mes'):
+        bloco[coluna] = pd.to_numeric(bloco[coluna], errors='coerce')
+    invalidas = bloco['data'].isna() | bloco['ano'].isna() | bloco['mes'].isna()
+    if invalidas.any():
+        bloco = bloco[~invalidas]
+    return bloco.astype({'ano': TIPOS_COLUNAS['ano'], 'mes': TIPOS_COLUNAS['mes']}), int(invalidas.sum())
+
+
+def _esquema_parquet(bloco):
+    """
+    Esquema Arrow fixo para todos os blocos: categorias viram dicionários com
+    índice int32 (o tamanho do índice não pode variar de um bloco para outro).
+    """
+    esquema = pa.Schema.from_pandas(bloco, preserve_index=False)
+    campos = [
+        pa.field(campo.name, pa.dictionary(pa.int32(), pa.string()))
+        if pa.types.is_dictionary(campo.type) else campo
+        for campo in esquema
+    ]
+    return pa.schema(campos, metadata=esquema.metadata)
+
+
+def _mostrar_progresso(bytes_lidos, bytes_totais, linhas):
+    pct = 100 * bytes_lidos / bytes_totais if bytes_totais else 100
+    print(f"Ingestão do CSV: {pct:5.1f}% ({linhas} linhas)")
+
+
+def ingerir_em_blocos(file_path, tamanho_bloco=TAMANHO_BLOCO_PADRAO, ao_bloco=None, ao_progresso=_mostrar_progresso,
+                      ate=None):
+    """
+    Lê o CSV em blocos de `tamanho_bloco` linhas, valida e converte os tipos de
+    cada bloco e o grava incrementalmente no cache colunar. A memória de pico é
+    limitada pelo tamanho do bloco, não do arquivo. Com `ate`, só os primeiros
+    `ate` bytes do CSV são lidos.
+
+    Os blocos são separados aqui, linha a linha (sem o buffer de leitura do
+    pandas), para que o progresso conte exatamente os bytes já interpretados.
+
+    :param ao_bloco: Função chamada com cada bloco já tipado (ex.: para acumular
+                     agregados); os blocos não são guardados depois disso
+    :param ao_progresso: Função (bytes_interpretados, bytes_totais, linhas) chamada a cada bloco
+    :return: Número de linhas gravadas
+    """
+    if pq is None:
+        raise ImportError("a ingestão em blocos requer o pyarrow")
+    caminho_parquet, caminho_meta = _caminhos_cache(file_path)
+    os.makedirs(os.path.dirname(caminho_parquet), exist_ok=True)
+    temporario = caminho_parquet + '.tmp'
+    bytes_totais = os.path.getsize(file_path) if ate is None else ate
+    tipos_leitura = {c: t for c, t in TIPOS_COLUNAS.items() if t == 'category'}
+
+    escritor = None
+    linhas = descartadas = 0
+    try:
+        with open(file_path, 'rb') as arquivo:
+            cabecalho = arquivo.readline()
+            lidos = len(cabecalho)
+            while lidos < bytes_totais:
+                bruto = b''.join(itertools.islice(arquivo, tamanho_bloco))[:bytes_totais - lidos]
+                if not bruto:
+                    break
+                lidos += len(bruto)
+                bloco = pd.read_csv(io.BytesIO(cabecalho + bruto), dtype=tipos_leitura)
+                del bruto
+                bloco, invalidas = _tipar_bloco(bloco)
+                descartadas += invalidas
+                if escritor is None:
+                    esquema = _esquema_parquet(bloco)
+                    escritor = pq.ParquetWriter(temporario, esquema)
+                # O tipo inferido de uma coluna pode mudar de um bloco para outro (inteiros
+                # que ganham vazios viram float): cada bloco é convertido para o esquema do
+                # primeiro. As colunas de texto têm tipo declarado (TIPOS_COLUNAS) para que
+                # um primeiro bloco sem nenhum valor nelas não as fixe como numéricas.
+                escritor.write_table(pa.Table.from_pandas(bloco, preserve_index=False).cast(esquema))
+                linhas += len(bloco)
+                if ao_bloco is not None:
+                    ao_bloco(bloco)
+                if ao_progresso is not None:
+                    ao_progresso(lidos, bytes_totais, linhas)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+    if escritor is None:
+        raise ValueError(f"'{file_path}' não contém linhas de dados")
+    os.replace(temporario, caminho_parquet)
+    with open(caminho_meta, 'w', encoding='utf-8') as f:
+        json.dump(_metadados_cache(file_path, bytes_totais), f)
+    if descartadas:
+        print(f"Aviso: {descartadas} linhas com data/ano/mês inválidos foram descartadas.")
+    return linhas
+
+
+def assinatura_trecho(file_path, offset, tamanho=4096):
+    """
+    Hash dos últimos `tamanho` bytes antes de `offset`. Se mudar entre duas
+    leituras, o arquivo foi reescrito (e não apenas acrescido de linhas).
+    """
+    inicio = max(0, offset - tamanho)
+    with open(file_path, 'rb') as f:
+        f.seek(inicio)
+        return hashlib.sha256(f.read(offset - inicio)).hexdigest()
+
+
+def ler_linhas_novas(file_path, offset, assinatura, colunas=None):
+    """
+    Lê apenas as linhas acrescentadas ao CSV depois de `offset` bytes.
+    Linhas incompletas no fim do arquivo (ainda sendo gravadas) ficam para a
+    próxima leitura.
+
+    :return: (DataFrame tipado com as novas linhas, novo offset, nova assinatura),
+             ou None se o arquivo foi reescrito (encolheu ou o trecho já lido mudou),
+             caso em que é preciso recarregar tudo.
+    """
+    tamanho = os.path.getsize(file_path)
+    if tamanho < offset or assinatura_trecho(file_path, offset) != assinatura:
+        return None
+
+    with open(file_path, 'rb') as f:
+        cabecalho = f.readline()
+        f.seek(offset)
+        bruto = f.read(tamanho - offset)
+    fim = bruto.rfind(b'\n') + 1
+    if fim == 0:
+        return pd.DataFrame(), offset, assinatura
+
+    tipos_leitura = {c: t for c, t in TIPOS_COLUNAS.items() if t == 'category'}
+    novas = pd.read_csv(io.BytesIO(cabecalho + bruto[:fim]), dtype=tipos_leitura)
+    novas, _ = _tipar_bloco(novas)
+    if colunas is not None:
+        novas = novas[colunas]
+    novo_offset = offset + fim
+    return novas, novo_offset, assinatura_trecho(file_path, novo_offset)
+
+
+def identificar_hotel(file_path):
+    """
+    Identificador do hotel de um CSV: o nome do arquivo, sem a extensão.
+    """
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def descobrir_hoteis(pasta, arquivo_padrao):
+    """
+    Hotéis disponíveis: um CSV por hotel em `pasta`, identificado pelo nome do
+    arquivo (identificar_hotel) e rotulado pelo 'nome_hotel' da primeira linha.
+    Sem a pasta, ou sem CSVs nela, apenas `arquivo_padrao`.
+    Só a primeira linha de cada arquivo é lida.
+
+    :return: {id do hotel: {'arquivo': caminho, 'nome': rótulo}}, em ordem de rótulo
+    """
+    arquivos = sorted(glob.glob(os.path.join(pasta, '*.csv'))) if os.path.isdir(pasta) else []
+    hoteis = {}
+    for arquivo in arquivos or [arquivo_padrao]:
+        hotel = identificar_hotel(arquivo)
+        try:
+            nome = str(pd.read_csv(arquivo, usecols=['nome_hotel'], nrows=1)['nome_hotel'].iloc[0])
+        except Exception:
+            nome = hotel
+        hoteis[hotel] = {'arquivo': arquivo, 'nome': nome}
+    return dict(sorted(hoteis.items(), key=lambda item: (item[1]['nome'], item[0])))
+
+
+def anexar_linhas(df, novas):
+    """
+    Retorna um novo DataFrame com `novas` acrescentadas a `df`, unindo as
+    categorias das colunas categóricas e mantendo a ordenação/índice por data.
+    O DataFrame original não é alterado.
+    """
+    compacto = 'data' not in df.columns
+    if compacto:
+        novas = indexar_por_data(novas)
+    novas = novas[df.columns]
+    tipos = {}
+    for coluna in df.columns:
+        if isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            categorias = df[coluna].cat.categories.union(pd.Index(novas[coluna].dropna().unique()), sort=False)
+            tipos[coluna] = pd.CategoricalDtype(categorias)
+    juntas = pd.concat([df.astype(tipos), novas.astype(tipos)], ignore_index=not compacto)
+    juntas = indexar_por_data(juntas)
+    return compactar(juntas) if compacto else juntas
+
+
+def _ler_csv(file_path, ate=None):
+    """
+    Lê o CSV completo (ou os seus primeiros `ate` bytes) já com os tipos declarados.
+    """
+    if ate is None:
+        return pd.read_csv(file_path, dtype=TIPOS_COLUNAS, parse_dates=COLUNAS_DATA)
+    with abrir_trecho(file_path, ate) as trecho:
+        return pd.read_csv(trecho, dtype=TIPOS_COLUNAS, parse_dates=COLUNAS_DATA)
+
+
+def _caminhos_cache(file_path):
+    """
+    Retorna os caminhos do arquivo Parquet e do arquivo de metadados do cache.
+    """
+    pasta = os.path.join(os.path.dirname(os.path.abspath(file_path)), PASTA_CACHE)
+    base = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(pasta, f"{base}.parquet"), os.path.join(pasta, f"{base}.json")
+
+
+def _hash_arquivo(file_path, tamanho_bloco=1 << 20, ate=None):
+    """
+    Calcula o SHA-256 do arquivo (ou dos seus primeiros `ate` bytes), lendo em
+    blocos para não carregar tudo na memória.
+    """
+    h = hashlib.sha256()
+    restante = float('inf') if ate is None else ate
+    with open(file_path, 'rb') as f:
+        while restante > 0:
+            bloco = f.read(int(min(tamanho_bloco, restante)))
+            if not bloco:
+                break
+            h.update(bloco)
+            restante -= len(bloco)
+    return h.hexdigest()
+
+
+def _metadados_cache(file_path, tamanho):
+    """
+    Metadados de invalidação do cache de um CSV lido até `tamanho` bytes. O
+    mtime só identifica o conteúdo se o arquivo não cresceu depois da leitura.
+    """
+    stat = os.stat(file_path)
+    return {
+        'origem': os.path.abspath(file_path),
+        'tamanho': tamanho,
+        'mtime_ns': stat.st_mtime_ns if stat.st_size == tamanho else None,
+        'sha256': _hash_arquivo(file_path, ate=tamanho),
+        'tipos': TIPOS_COLUNAS,
+    }
+
+
+def _cache_valido(file_path, caminho_meta, ate=None):
+    """
+    Confere se o cache corresponde ao CSV atual (ou aos seus primeiros `ate`
+    bytes) e aos tipos de TIPOS_COLUNAS.
+    Tamanho e mtime iguais bastam; se só o mtime mudou, o hash decide.
+    """
+    if not os.path.exists(caminho_meta):
+        return False
+    with open(caminho_meta, encoding='utf-8') as f:
+        meta = json.load(f)
+
+    stat = os.stat(file_path)
+    tamanho = stat.st_size if ate is None else ate
+    if meta.get('tamanho') != tamanho or meta.get('tipos') != TIPOS_COLUNAS:
+        return False
+    if stat.st_size == tamanho and meta.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+
+    # mtime alterado (cópia, touch, linhas acrescentadas depois de `ate`...):
+    # o conteúdo lido ainda pode ser o mesmo
+    if meta.get('sha256') != _hash_arquivo(file_path, ate=tamanho):
+        return False
+    if stat.st_size == tamanho:
+        meta['mtime_ns'] = stat.st_mtime_ns
+        with open(caminho_meta, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+    return True
+
+
+def _ler_cache(file_path, colunas=None, ate=None):
+    """
+    Lê o cache colunar se ele existir e estiver válido; caso contrário retorna None.
+    """
+    caminho_parquet, caminho_meta = _caminhos_cache(file_path)
+    if not os.path.exists(caminho_parquet) or not _cache_valido(file_path, caminho_meta, ate):
+        return None
+    try:
+        return pd.read_parquet(caminho_parquet, columns=colunas)
+    except ImportError:
+        return None
+    except Exception as e:
+        print(f"Aviso: cache '{caminho_parquet}' ilegível, relendo o CSV ({e}).")
+        return None
+
+
+def _gravar_cache(file_path, df, ate=None):
+    """
+    Grava o DataFrame (lido dos primeiros `ate` bytes do CSV, ou do arquivo
+    inteiro) no cache colunar junto com os metadados de invalidação.
+    Falhas na gravação não impedem o carregamento dos dados.
+    """
+    caminho_parquet, caminho_meta = _caminhos_cache(file_path)
+    try:
+        os.makedirs(os.path.dirname(caminho_parquet), exist_ok=True)
+        df.to_parquet(caminho_parquet, index=False)
+        meta = _metadados_cache(file_path, os.path.getsize(file_path) if ate is None else ate)
+        with open(caminho_meta, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+    except ImportError:
+        print("Aviso: pyarrow não instalado; cache colunar desativado.")
+    except Exception as e:
+        print(f"Aviso: não foi possível gravar o cache colunar: {e}")
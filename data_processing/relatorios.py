@@ -0,0 +1,384 @@
+import os
+import re
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from data_processing import process_data
+from utils import formatacao, instrumentacao
+
+# Relatórios financeiros (página Relatórios Financeiros): demonstrativo mensal ou
+# anual (receita, GOP, GOPPAR, TRevPAR...) e reservas por tipo de quarto,
+# exportados para Excel (openpyxl em modo write-only) ou PDF (fpdf).
+#
+# Os dados saem ano a ano da fonte (cubo em memória ou banco, ver fonte_em_memoria
+# e fonte_relatorio em app.py) e cada bloco é gravado assim que fica pronto: a
+# memória usada não cresce com o número de anos do histórico.
+
+GRANULARIDADES = {'mensal': 'Mensal', 'anual': 'Anual'}
+FORMATOS = {'xlsx': 'Excel (.xlsx)', 'pdf': 'PDF'}
+
+# Colunas de cada seção: (id, título, tipo); o tipo define a formatação
+COLUNAS_DEMONSTRATIVO = [
+    ('periodo', 'Período', 'texto'),
+    ('dias', 'Dias', 'inteiro'),
+    ('quartos_disponiveis', 'Quartos disponíveis', 'inteiro'),
+    ('quartos_ocupados', 'Quartos ocupados', 'inteiro'),
+    ('ocupacao', 'Ocupação', 'percentual'),
+    ('receita_quartos', 'Receita de quartos', 'brl'),
+    ('receita_total', 'Receita total', 'brl'),
+    ('gop', 'GOP', 'brl'),
+    ('margem_gop', 'Margem GOP', 'percentual'),
+    ('adr', 'ADR', 'brl'),
+    ('revpar', 'RevPAR', 'brl'),
+    ('trevpar', 'TRevPAR', 'brl'),
+    ('goppar', 'GOPPAR', 'brl'),
+]
+COLUNAS_TIPOS = [
+    ('periodo', 'Período', 'texto'),
+    ('tipo_de_quarto', 'Tipo de quarto', 'texto'),
+    ('reservas', 'Reservas', 'inteiro'),
+    ('quartos_noite', 'Quartos-noite', 'inteiro'),
+    ('valor_diarias', 'Valor das diárias', 'brl'),
+    ('total_pago', 'Total pago', 'brl'),
+    ('ticket_medio', 'Ticket médio', 'brl'),
+    ('participacao', 'Participação', 'percentual'),
+]
+
+# Colunas somadas entre períodos (as demais são razões recalculadas das somas)
+SOMAS_DEMONSTRATIVO = ['dias', 'quartos_disponiveis', 'quartos_ocupados', 'receita_quartos', 'receita_total', 'gop']
+SOMAS_TIPOS = ['reservas', 'quartos_noite', 'valor_diarias', 'total_pago']
+
+# Seções do relatório: (título da planilha/seção, id, colunas)
+SECOES = [
+    ('Demonstrativo', 'demonstrativo', COLUNAS_DEMONSTRATIVO),
+    ('Tipos de quarto', 'tipos', COLUNAS_TIPOS),
+]
+
+# Formatos das células no Excel e larguras das colunas (Excel em caracteres, PDF em mm)
+FORMATOS_EXCEL = {'inteiro': '#,##0', 'brl': '"R$" #,##0.00', 'percentual': '0.00%', 'texto': '@'}
+LARGURAS_EXCEL = {'inteiro': 14, 'brl': 18, 'percentual': 12, 'texto': 16}
+LARGURAS_PDF = {'inteiro': 18, 'brl': 25, 'percentual': 17, 'texto': 20}
+
+# Página do PDF (A4 paisagem, mm); o cabeçalho da tabela tem até duas linhas de texto
+ALTURA_LINHA_PDF = 5
+ALTURA_CABECALHO_PDF = 7
+LIMITE_Y_PDF = 190
+
+# Nome dos arquivos gerados (também valida o nome pedido em /relatorios/<nome>)
+PADRAO_ARQUIVO = re.compile(r'^[\w-]+\.(xlsx|pdf)$')
+
+
+def _razao(numerador, denominador):
+    numerador = np.asarray(numerador, dtype='float64')
+    denominador = np.asarray(denominador, dtype='float64')
+    return np.divide(numerador, denominador, out=np.zeros(numerador.shape), where=denominador != 0)
+
+
+def _derivar_demonstrativo(tabela):
+    """Acrescenta as razões (ocupação, margem, ADR, RevPAR, TRevPAR, GOPPAR) às somas."""
+    disponiveis = tabela['quartos_disponiveis']
+    return tabela.assign(
+        ocupacao=_razao(tabela['quartos_ocupados'], disponiveis),
+        margem_gop=_razao(tabela['gop'], tabela['receita_total']),
+        adr=_razao(tabela['receita_quartos'], tabela['quartos_ocupados']),
+        revpar=_razao(tabela['receita_quartos'], disponiveis),
+        trevpar=_razao(tabela['receita_total'], disponiveis),
+        goppar=_razao(tabela['gop'], disponiveis),
+    )
+
+
+def _derivar_tipos(tabela):
+    """Acrescenta o ticket médio e a participação de cada tipo no total pago do período."""
+    total_periodo = tabela.groupby('periodo')['total_pago'].transform('sum')
+    return tabela.assign(
+        ticket_medio=_razao(tabela['total_pago'], tabela['reservas']),
+        participacao=_razao(tabela['total_pago'], total_periodo),
+    )
+
+
+def rotulos_periodo(datas, granularidade):
+    """Rótulo do período de cada data: 'AAAA-MM' (mensal) ou 'AAAA' (anual)."""
+    return datas.strftime('%Y-%m' if granularidade == 'mensal' else '%Y')
+
+
+def demonstrativo(dias, granularidade):
+    """
+    Demonstrativo por período a partir dos fatos diários (tabela diária do cubo).
+    A receita total do dia, repetida em cada reserva, é a soma do dia dividida
+    pelo número de reservas com valor.
+    """
+    reservas_com_receita = dias['n_receita_total_dia'].to_numpy()
+    somas = pd.DataFrame({
+        'dias': np.ones(len(dias), dtype='int64'),
+        'quartos_disponiveis': dias['dia_total_quartos'].fillna(0).to_numpy(),
+        'quartos_ocupados': dias['dia_quartos_ocupados'].fillna(0).to_numpy(),
+        'receita_quartos': dias['dia_receita_quartos'].fillna(0).to_numpy(),
+        'receita_total': _razao(dias['soma_receita_total_dia'].to_numpy(), reservas_com_receita),
+        'gop': dias['dia_gop'].fillna(0).to_numpy(),
+    })
+    somas = somas.groupby(np.asarray(rotulos_periodo(dias.index, granularidade)), sort=True).sum()
+    return _derivar_demonstrativo(somas.rename_axis('periodo').reset_index())
+
+
+def somar_tipos_quarto(reservas):
+    """
+    Reservas somadas por mês e tipo de quarto: 'mes', 'tipo_de_quarto',
+    'reservas', 'quartos_noite', 'valor_diarias' e 'total_pago'.
+    """
+    datas = pd.DatetimeIndex(process_data.coluna(reservas, 'data'))
+    quartos = reservas['quantidade_quartos'].to_numpy(dtype='float64')
+    diarias = reservas['quantidade_diarias'].to_numpy(dtype='float64')
+    tabela = pd.DataFrame({
+        'mes': datas.month.to_numpy(),
+        'tipo_de_quarto': reservas['tipo_de_quarto'].astype(str).to_numpy(),
+        'reservas': np.ones(len(reservas), dtype='int64'),
+        'quartos_noite': quartos * diarias,
+        'valor_diarias': reservas['valor_total_diarias'].to_numpy(dtype='float64'),
+        'total_pago': reservas['total_pago'].to_numpy(dtype='float64'),
+    })
+    return tabela.groupby(['mes', 'tipo_de_quarto'], sort=True, as_index=False).sum()
+
+
+def tipos_por_periodo(tipos, ano, granularidade):
+    """Somas por mês e tipo de quarto de um ano, no período do relatório."""
+    if granularidade == 'mensal':
+        periodos = [f'{ano}-{mes:02d}' for mes in tipos['mes']]
+    else:
+        periodos = [str(ano)] * len(tipos)
+    tabela = tipos[['tipo_de_quarto'] + SOMAS_TIPOS].fillna(0).assign(periodo=periodos)
+    tabela = tabela.groupby(['periodo', 'tipo_de_quarto'], sort=True, as_index=False).sum()
+    return _derivar_tipos(tabela)
+
+
+def fonte_em_memoria(cubo, reservas):
+    """
+    Fonte do relatório a partir do cubo e do DataFrame de reservas (ordenado e
+    indexado por data): os anos do histórico e, para cada ano, os fatos
+    diários e as somas por tipo de quarto.
+    """
+    return {
+        'anos': [int(ano) for ano in cubo['anual'].index],
+        'dias': lambda ano: cubo['diario'].loc[str(ano)],
+        'tipos': lambda ano: somar_tipos_quarto(reservas.loc[str(ano)]),
+    }
+
+
+def blocos_relatorio(fonte, granularidade, secao):
+    """
+    Blocos (DataFrames) de uma seção do relatório, um por ano, seguidos da
+    linha (demonstrativo) ou das linhas por tipo (tipos) do período inteiro.
+    Só um ano de dados fica em memória por vez.
+    """
+    totais = None
+    for ano in fonte['anos']:
+        if secao == 'demonstrativo':
+            dias = fonte['dias'](ano)
+            if dias.empty:
+                continue
+            bloco = demonstrativo(dias, granularidade)
+            parcial = bloco[SOMAS_DEMONSTRATIVO].sum().to_frame().T
+        else:
+            tipos = fonte['tipos'](ano)
+            if tipos.empty:
+                continue
+            bloco = tipos_por_periodo(tipos, ano, granularidade)
+            parcial = bloco.groupby('tipo_de_quarto')[SOMAS_TIPOS].sum()
+        totais = parcial if totais is None else totais.add(parcial, fill_value=0)
+        yield bloco
+
+    if totais is None:
+        return
+    if secao == 'demonstrativo':
+        yield _derivar_demonstrativo(totais.assign(periodo='Total'))
+    else:
+        yield _derivar_tipos(totais.rename_axis('tipo_de_quarto').reset_index().assign(periodo='Total'))
+
+
+def _texto_pdf(valor, tipo):
+    """Valor formatado para o PDF (fontes padrão do fpdf: apenas latin-1)."""
+    if tipo == 'inteiro':
+        texto = f"{valor:,.0f}".replace(',', '.')
+    elif tipo == 'brl':
+        texto = formatacao.formatar_brl(valor)
+    elif tipo == 'percentual':
+        texto = f"{valor * 100:.2f}%".replace('.', ',')
+    else:
+        texto = str(valor)
+    return texto.encode('latin-1', 'replace').decode('latin-1')
+
+
+@instrumentacao.medido('gravar_excel')
+def gravar_excel(fonte, granularidade, caminho, titulo):
+    """
+    Grava o relatório em um livro do Excel em modo write-only: cada linha vai
+    direto para o arquivo temporário da planilha, sem montar o livro em memória.
+    Retorna o número de linhas gravadas.
+    """
+    # Importados na primeira chamada: o openpyxl leva ~0,2 s para carregar
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
+    livro = Workbook(write_only=True)
+    negrito = Font(bold=True)
+    linhas = 0
+    for nome, secao, colunas in SECOES:
+        planilha = livro.create_sheet(nome)
+        for i, (_, _, tipo) in enumerate(colunas, start=1):
+            planilha.column_dimensions[get_column_letter(i)].width = LARGURAS_EXCEL[tipo]
+        planilha.freeze_panes = 'A3'
+
+        celula = WriteOnlyCell(planilha, value=f"{titulo} - {nome}")
+        celula.font = Font(bold=True, size=13)
+        planilha.append([celula])
+        cabecalho = []
+        for _, rotulo, _ in colunas:
+            celula = WriteOnlyCell(planilha, value=rotulo)
+            celula.font = negrito
+            cabecalho.append(celula)
+        planilha.append(cabecalho)
+
+        ids = [c[0] for c in colunas]
+        formatos = [FORMATOS_EXCEL[c[2]] for c in colunas]
+        for bloco in blocos_relatorio(fonte, granularidade, secao):
+            total = bloco['periodo'].iloc[0] == 'Total'
+            for registro in bloco[ids].itertuples(index=False, name=None):
+                linha = []
+                for valor, formato in zip(registro, formatos):
+                    celula = WriteOnlyCell(planilha, value=valor)
+                    celula.number_format = formato
+                    if total:
+                        celula.font = negrito
+                    linha.append(celula)
+                planilha.append(linha)
+                linhas += 1
+    livro.save(caminho)
+    return linhas
+
+
+def _nova_pagina_pdf(pdf, titulo, nome, colunas, larguras):
+    """Abre uma página com título, cabeçalho da tabela e número da página."""
+    pdf.add_page()
+    pdf.set_font('Arial', 'I', 8)
+    pdf.set_xy(10, 200)
+    pdf.cell(0, 5, _texto_pdf(f"Página {pdf.page_no()}/{{nb}}", 'texto'), align='R')
+    pdf.set_xy(10, 10)
+    pdf.set_font('Arial', 'B', 12)
+    pdf.cell(0, 8, _texto_pdf(f"{titulo} - {nome}", 'texto'), ln=1)
+    pdf.set_font('Arial', 'B', 7)
+    pdf.set_fill_color(230, 230, 230)
+    x, y = pdf.get_x(), pdf.get_y()
+    for (_, rotulo, tipo), largura in zip(colunas, larguras):
+        pdf.rect(x, y, largura, ALTURA_CABECALHO_PDF, 'DF')
+        pdf.set_xy(x, y + 0.5)
+        pdf.multi_cell(largura, 3, _texto_pdf(rotulo, 'texto'), align='L' if tipo == 'texto' else 'R')
+        x += largura
+    pdf.set_xy(10, y + ALTURA_CABECALHO_PDF)
+
+
+@instrumentacao.medido('gravar_pdf')
+def gravar_pdf(fonte, granularidade, caminho, titulo):
+    """
+    Grava o relatório em PDF (A4 paisagem), com o cabeçalho da tabela repetido
+    em cada página. As linhas são desenhadas à medida que os blocos saem da
+    fonte; o fpdf guarda apenas o conteúdo das páginas (texto). Retorna o
+    número de linhas gravadas.
+    """
+    # Importado na primeira chamada, como o openpyxl em gravar_excel
+    from fpdf import FPDF
+
+    pdf = FPDF(orientation='L', unit='mm', format='A4')
+    pdf.set_auto_page_break(False)
+    pdf.alias_nb_pages()
+    pdf.set_title(_texto_pdf(titulo, 'texto'))
+    linhas = 0
+    for nome, secao, colunas in SECOES:
+        larguras = [LARGURAS_PDF[c[2]] for c in colunas]
+        escala = min(1.0, 277 / sum(larguras))
+        larguras = [largura * escala for largura in larguras]
+        ids = [c[0] for c in colunas]
+        tipos = [c[2] for c in colunas]
+        _nova_pagina_pdf(pdf, titulo, nome, colunas, larguras)
+        for bloco in blocos_relatorio(fonte, granularidade, secao):
+            total = bloco['periodo'].iloc[0] == 'Total'
+            pdf.set_font('Arial', 'B' if total else '', 7)
+            for registro in bloco[ids].itertuples(index=False, name=None):
+                if pdf.get_y() + ALTURA_LINHA_PDF > LIMITE_Y_PDF:
+                    _nova_pagina_pdf(pdf, titulo, nome, colunas, larguras)
+                    pdf.set_font('Arial', 'B' if total else '', 7)
+                for valor, tipo, largura in zip(registro, tipos, larguras):
+                    pdf.cell(largura, ALTURA_LINHA_PDF, _texto_pdf(valor, tipo), border='B',
+                             align='L' if tipo == 'texto' else 'R')
+                pdf.ln()
+                linhas += 1
+    pdf.output(caminho, 'F')
+    return linhas
+
+
+GRAVADORES = {'xlsx': gravar_excel, 'pdf': gravar_pdf}
+
+
+def _exportar(gerar, caminho):
+    """Executa `gerar(caminho parcial)` e publica o arquivo pronto (ou o erro)."""
+    parcial = caminho + '.parcial'
+    inicio = time.perf_counter()
+    try:
+        gerar(parcial)
+        os.replace(parcial, caminho)
+        print(f"Relatório {os.path.basename(caminho)} gerado em {time.perf_counter() - inicio:.1f} s")
+    except Exception as e:
+        print(f"Erro ao gerar o relatório {os.path.basename(caminho)}: {e}")
+        with open(caminho + '.erro', 'w') as f:
+            f.write(str(e))
+        if os.path.exists(parcial):
+            os.remove(parcial)
+
+
+def limpar_antigos(pasta, validade):
+    """Apaga os arquivos da pasta de relatórios modificados há mais de `validade` segundos."""
+    limite = time.time() - validade
+    for nome in os.listdir(pasta):
+        caminho = os.path.join(pasta, nome)
+        try:
+            if os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+        except OSError:
+            pass
+
+
+def iniciar_exportacao(executor, pasta, prefixo, formato, gerar, validade):
+    """
+    Agenda `gerar(caminho)` no executor e retorna o nome do arquivo que será
+    gerado na pasta. O estado fica só em arquivos ('.parcial' enquanto gera,
+    '.erro' se falhar), então qualquer worker responde por ele (estado_exportacao).
+    """
+    os.makedirs(pasta, exist_ok=True)
+    limpar_antigos(pasta, validade)
+    prefixo = re.sub(r'[^\w-]', '_', prefixo)
+    nome = f"{prefixo}_{uuid.uuid4().hex[:12]}.{formato}"
+    caminho = os.path.join(pasta, nome)
+    open(caminho + '.parcial', 'wb').close()
+    executor.submit(_exportar, gerar, caminho)
+    return nome
+
+
+def estado_exportacao(pasta, nome):
+    """
+    Estado de um relatório: ('pronto', caminho), ('erro', mensagem),
+    ('gerando', None) ou (None, None) se o nome é desconhecido ou já expirou.
+    """
+    if not nome or not PADRAO_ARQUIVO.match(nome):
+        return None, None
+    caminho = os.path.join(pasta, nome)
+    if os.path.exists(caminho):
+        return 'pronto', caminho
+    if os.path.exists(caminho + '.erro'):
+        with open(caminho + '.erro') as f:
+            return 'erro', f.read()
+    if os.path.exists(caminho + '.parcial'):
+        return 'gerando', None
+    return None, None
@@ -0,0 +1,286 @@
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_processing import process_data
+from utils.cache import CacheLRU
+
+# Operadores da linha de filtro do DataTable (filter_action='custom'): símbolo -> nome
+OPERADORES = {'>=': 'ge', '<=': 'le', '<': 'lt', '>': 'gt', '!=': 'ne', '=': 'eq'}
+
+# Uma condição: '{coluna}', o operador logo depois da chave (os de dois
+# caracteres antes dos de um) e o valor; palavras como 'le' dentro do valor
+# não são tomadas por operadores
+CONDICAO = re.compile(
+    r'^\s*\{([^}]+)\}\s*(ge|le|lt|gt|ne|eq|contains|datestartswith|>=|<=|<|>|!=|=)\s*(.*)$'
+)
+
+# Consultas filtradas já resolvidas (posições na ordem pedida), por índice
+CONSULTAS_MAX_ITENS = 32
+CONSULTAS_MAX_MB = 128
+
+
+def construir_indice(df):
+    """
+    Índice de consulta das reservas sobre um DataFrame ordenado por data
+    (process_data.indexar_por_data). As chaves e permutações de ordenação de
+    cada coluna são calculadas na primeira consulta que as usa e reaproveitadas
+    nas seguintes.
+    """
+    return {
+        'df': df,
+        'colunas': {},
+        'consultas': CacheLRU(max_itens=CONSULTAS_MAX_ITENS, max_bytes=CONSULTAS_MAX_MB * 1024 * 1024),
+        'trava': threading.Lock(),
+    }
+
+
+def _separar_condicao(parte):
+    """
+    Separa uma condição do filtro ('{coluna} operador valor') em
+    (coluna, operador, valor, texto): valores sem aspas viram float quando
+    possível, e `texto` guarda o valor como foi digitado (sem as aspas), para
+    colunas de texto e de data ('1643' não é '1643.0').
+    """
+    encontrada = CONDICAO.match(parte)
+    if encontrada is None:
+        return None
+    nome, operador, parte_valor = encontrada.groups()
+    parte_valor = parte_valor.strip()
+    if not parte_valor:
+        return None
+    inicio = parte_valor[0]
+    if inicio == parte_valor[-1] and inicio in ("'", '"', '`') and len(parte_valor) > 1:
+        valor = texto = parte_valor[1:-1].replace('\\' + inicio, inicio)
+    else:
+        texto = parte_valor
+        try:
+            valor = float(parte_valor)
+        except ValueError:
+            valor = parte_valor
+    return nome, OPERADORES.get(operador, operador), valor, texto
+
+
+def interpretar_filtro(filtro):
+    """
+    Converte a filter_query do DataTable em uma lista de (coluna, operador, valor, texto).
+    Condições que não puderem ser interpretadas são ignoradas.
+    """
+    if not filtro:
+        return []
+    condicoes = []
+    for parte in filtro.split(' && '):
+        condicao = _separar_condicao(parte)
+        if condicao is not None:
+            condicoes.append(condicao)
+    return condicoes
+
+
+def condicoes_invalidas(filtro, tipos):
+    """
+    Condições do filtro que a consulta ignoraria: não interpretáveis, em colunas
+    fora de `tipos` ({coluna: 'numeric', 'datetime' ou 'text'}, como nas colunas
+    do DataTable) ou com operador ou valor que não se aplica ao tipo da coluna.
+    """
+    if not filtro:
+        return []
+    invalidas = []
+    for parte in filtro.split(' && '):
+        condicao = _separar_condicao(parte)
+        if condicao is None or not _condicao_aplicavel(tipos.get(condicao[0]), *condicao[1:]):
+            invalidas.append(parte.strip())
+    return invalidas
+
+
+def _condicao_aplicavel(tipo, operador, valor, texto):
+    try:
+        if tipo == 'text':
+            return operador in ('eq', 'ne', 'contains')
+        if tipo == 'datetime':
+            limites_data(texto)
+            return True
+        if tipo == 'numeric':
+            float(valor)
+            return operador not in ('contains', 'datestartswith')
+    except ValueError:
+        pass
+    return False
+
+
+def _coluna(indice, nome):
+    """
+    Chave de ordenação da coluna (int64/float64, na ordem de exibição), a
+    permutação que a ordena de forma estável e as chaves já ordenadas.
+    Colunas de texto são codificadas pela ordem alfabética dos valores, com
+    os ausentes no fim.
+    """
+    with indice['trava']:
+        coluna = indice['colunas'].get(nome)
+        if coluna is not None:
+            return coluna
+
+        serie = process_data.coluna(indice['df'], nome)
+        categorias = None
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            chave = serie.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        elif pd.api.types.is_numeric_dtype(serie) and not isinstance(serie.dtype, pd.CategoricalDtype):
+            chave = serie.to_numpy(dtype=np.float64)
+            if serie.dtype == np.float32:
+                # Valores monetários compactos (process_data.compactar): volta aos
+                # centavos, para que '= 350.23' encontre o valor guardado em float32
+                chave = chave.round(2)
+        else:
+            codigos, categorias = pd.factorize(serie.astype(object).to_numpy(), sort=True)
+            chave = np.where(codigos < 0, len(categorias), codigos).astype(np.int64)
+            categorias = np.asarray(categorias, dtype=object)
+
+        if nome == 'data':
+            ordem = np.arange(len(chave))  # o DataFrame já está ordenado por data
+        else:
+            ordem = np.argsort(chave, kind='stable')
+        ordenadas = chave[ordem]
+        # NaN fica no fim da ordenação e não atende a nenhuma comparação
+        validos = len(ordenadas) - int(np.isnan(ordenadas).sum()) if ordenadas.dtype.kind == 'f' else len(ordenadas)
+        coluna = {'chave': chave, 'ordem': ordem, 'ordenadas': ordenadas, 'validos': validos, 'categorias': categorias}
+        indice['colunas'][nome] = coluna
+        return coluna
+
+
+def limites_data(valor):
+    """
+    Intervalo [inicio, fim) de datas (Timestamps) que começam com o valor
+    digitado: 'aaaa', 'aaaa-mm', 'aaaa-mm-dd' ou 'dd/mm/aaaa', 'mm/aaaa'.
+    """
+    texto = str(valor).strip()
+    if '/' in texto:
+        texto = '-'.join(reversed(texto.split('/')))
+    partes = texto.split('-')
+    inicio = pd.Timestamp(texto)
+    if len(partes) == 1:
+        fim = inicio + pd.offsets.YearBegin(1)
+    elif len(partes) == 2:
+        fim = inicio + pd.offsets.MonthBegin(1)
+    else:
+        fim = inicio + pd.Timedelta(days=1)
+    return inicio, fim
+
+
+def _resolver_condicao(indice, nome, operador, valor, texto):
+    """
+    Resolve uma condição como uma faixa [a, b) da permutação ordenada da coluna
+    (busca binária) ou, quando isso não é possível, como uma máscara booleana.
+    Colunas de texto e de data comparam com o `texto` digitado; as numéricas, com `valor`.
+
+    :return: ('faixa', coluna, a, b), ('mascara', array) ou None se a condição
+             não se aplica à coluna
+    """
+    df = indice['df']
+    if not process_data.tem_coluna(df, nome):
+        return None
+    coluna = _coluna(indice, nome)
+    ordenadas = coluna['ordenadas']
+    categorias = coluna['categorias']
+    e_data = pd.api.types.is_datetime64_any_dtype(process_data.coluna(df, nome))
+
+    try:
+        if e_data and operador in ('datestartswith', 'contains'):
+            inicio, fim = limites_data(texto)
+            return ('faixa', nome, ordenadas.searchsorted(inicio.value, 'left'), ordenadas.searchsorted(fim.value, 'left'))
+
+        if categorias is not None:
+            if operador == 'contains':
+                encontradas = np.flatnonzero(pd.Series(categorias).str.contains(texto, case=False, regex=False))
+                return ('mascara', np.isin(coluna['chave'], encontradas))
+            if operador not in ('eq', 'ne'):
+                return None
+            posicao = categorias.searchsorted(texto)
+            existe = posicao < len(categorias) and categorias[posicao] == texto
+            if operador == 'ne':
+                return ('mascara', coluna['chave'] != posicao) if existe else None
+            if not existe:
+                return ('faixa', nome, 0, 0)
+            return ('faixa', nome, ordenadas.searchsorted(posicao, 'left'), ordenadas.searchsorted(posicao, 'right'))
+
+        if operador in ('contains', 'datestartswith'):
+            return None
+        chave = limites_data(texto)[0].value if e_data else float(valor)
+    except (ValueError, TypeError):
+        return None
+
+    n = coluna['validos']
+    if operador == 'ne':
+        return ('mascara', coluna['chave'] != chave)
+    if operador == 'eq':
+        a, b = ordenadas.searchsorted(chave, 'left'), ordenadas.searchsorted(chave, 'right')
+    elif operador == 'lt':
+        a, b = 0, ordenadas.searchsorted(chave, 'left')
+    elif operador == 'le':
+        a, b = 0, ordenadas.searchsorted(chave, 'right')
+    elif operador == 'gt':
+        a, b = ordenadas.searchsorted(chave, 'right'), n
+    else:  # 'ge'
+        a, b = ordenadas.searchsorted(chave, 'left'), n
+    return ('faixa', nome, a, min(b, n))
+
+
+def _posicoes(indice, condicoes, coluna_ordem, decrescente):
+    """
+    Posições (no DataFrame) das linhas que atendem às condições, na ordem pedida.
+    Sem filtro, ou com uma única faixa na própria coluna da ordenação, é apenas
+    uma visão da permutação ordenada; nos demais casos as máscaras são
+    combinadas (O(n)) e o resultado fica em cache para as páginas seguintes.
+    """
+    ordem = _coluna(indice, coluna_ordem)['ordem']
+    if not condicoes:
+        return ordem[::-1] if decrescente else ordem
+
+    chave = (tuple(condicoes), coluna_ordem)
+    encontrado, posicoes = indice['consultas'].obter(chave)
+    if encontrado:
+        return posicoes[::-1] if decrescente else posicoes
+
+    resolvidas = [_resolver_condicao(indice, *c) for c in condicoes]
+    resolvidas = [r for r in resolvidas if r is not None]
+    if not resolvidas:
+        posicoes = ordem
+    elif len(resolvidas) == 1 and resolvidas[0][0] == 'faixa' and resolvidas[0][1] == coluna_ordem:
+        _, _, a, b = resolvidas[0]
+        posicoes = ordem[a:b]
+    else:
+        mascara = np.ones(len(ordem), dtype=bool)
+        for resolvida in resolvidas:
+            if resolvida[0] == 'faixa':
+                _, nome, a, b = resolvida
+                faixa = np.zeros(len(ordem), dtype=bool)
+                faixa[_coluna(indice, nome)['ordem'][a:b]] = True
+                mascara &= faixa
+            else:
+                mascara &= resolvida[1]
+        posicoes = ordem[mascara[ordem]]
+        indice['consultas'].guardar(chave, posicoes)
+    return posicoes[::-1] if decrescente else posicoes
+
+
+def consultar_reservas(indice, pagina=0, tamanho=25, ordenacao=None, filtro=None):
+    """
+    Responde a uma consulta paginada do explorador de reservas.
+
+    :param pagina: Página atual (começa em 0)
+    :param tamanho: Linhas por página
+    :param ordenacao: sort_by do DataTable ([{'column_id': ..., 'direction': 'asc'|'desc'}]);
+                      padrão: data, mais recentes primeiro
+    :param filtro: filter_query do DataTable
+    :return: (DataFrame só com as linhas da página, total de linhas filtradas)
+    """
+    df = indice['df']
+    coluna_ordem, decrescente = 'data', True
+    if ordenacao:
+        pedido = ordenacao[0]
+        if process_data.tem_coluna(df, pedido.get('column_id')):
+            coluna_ordem, decrescente = pedido['column_id'], pedido.get('direction') == 'desc'
+
+    posicoes = _posicoes(indice, interpretar_filtro(filtro), coluna_ordem, decrescente)
+    inicio = pagina * tamanho
+    return df.iloc[posicoes[inicio:inicio + tamanho]], len(posicoes)
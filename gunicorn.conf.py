@@ -0,0 +1,50 @@
+"""
+gunicorn.conf.py
+
+Configuração do gunicorn para servir o dashboard em produção:
+  gunicorn -c gunicorn.conf.py wsgi:server
+
+Variáveis de ambiente:
+  HOTEL_BIND     endereço de escuta (padrão 0.0.0.0:8050)
+  HOTEL_WORKERS  número de processos (padrão: número de núcleos)
+  HOTEL_THREADS  threads por processo (padrão 4)
+  HOTEL_DB_URL   banco de dados opcional (ver app.py / data_processing/armazenamento.py)
+  HOTEL_CARGA    momento da carga dos dados: imediata (padrão), fundo ou adiada (ver app.py)
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('HOTEL_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('HOTEL_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('HOTEL_THREADS', 4))
+worker_class = 'gthread'
+timeout = 120
+
+# Carrega a aplicação (e o CSV) no mestre, antes do fork: os workers herdam o
+# DataFrame e o cubo por copy-on-write em vez de carregar cópias próprias.
+# Com carga em segundo plano ou adiada, cada worker carrega os seus dados
+# depois de iniciar (uma thread de carga não sobrevive ao fork).
+#
+# As linhas novas dos CSVs são incorporadas por cada worker (app.atualizar_dados),
+# com a mesma versão em todos os que leram os mesmos bytes (app.calcular_versao).
+# Sem HOTEL_DB_URL, a primeira incorporação copia o DataFrame do hotel para o
+# worker (fim do copy-on-write): com um CSV que cresce sempre, a memória tende a
+# `workers` cópias. Com o banco, as linhas são gravadas uma única vez, por um
+# dos workers, e nenhum deles guarda o histórico.
+preload_app = os.environ.get('HOTEL_CARGA', 'imediata') == 'imediata'
+
+
+def post_fork(server, worker):
+    # Com o backend SQL (HOTEL_DB_URL), as conexões abertas pelo mestre não
+    # podem ser usadas pelos workers: cada um abre as suas.
+    import app
+    if app.dados is not None and app.dados['motor'] is not None:
+        app.dados['motor'].dispose(close=False)
+
+
+def when_ready(server):
+    # Move os objetos já carregados para a geração permanente do coletor de lixo,
+    # que assim não toca (e não copia) essas páginas nos workers.
+    gc.freeze()
@@ -0,0 +1,264 @@
+"""
+tests/benchmark.py
+
+Benchmark reprodutível dos caminhos quentes do dashboard: carga do CSV e do
+cache colunar, cálculo das métricas, filtro, tabela de reservas, rosca,
+previsão de demanda, exportação dos relatórios financeiros (histórico inteiro),
+gráficos e montagem do conteúdo principal, com dados
+sintéticos de tests/gerar_dados.py em várias escalas (anos) e, opcionalmente,
+portfólio de vários hotéis. Os resultados (tempos e pico de memória de cada etapa) saem em
+JSON, para comparar commits:
+  python tests/benchmark.py --anos 1 25 100 --hoteis 3 --saida antes.json
+  python tests/benchmark.py --anos 1 25 100 --hoteis 3 --saida depois.json
+  python tests/benchmark.py --comparar antes.json depois.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+
+import app
+from data_processing import process_data, agregados, previsao, relatorios
+from visualizations import charts
+from tests import gerar_dados
+
+# Pasta onde os CSVs sintéticos ficam guardados entre execuções
+PASTA_PADRAO = os.path.join(tempfile.gettempdir(), 'hotel_benchmark')
+
+# Razão depois/antes a partir da qual --comparar aponta uma regressão
+LIMITE_REGRESSAO = 1.2
+
+
+def medir(funcao, repeticoes, tempo_max, preparar=None):
+    """
+    Executa `funcao` até `repeticoes` vezes (ou até somar `tempo_max` segundos,
+    com no mínimo uma execução) e mede o pico de memória alocada em uma
+    execução à parte, para não distorcer os tempos. O tracemalloc conta objetos
+    Python e arrays do NumPy/pandas; buffers do pyarrow ficam de fora.
+    `preparar` monta, fora da medição, os argumentos de cada execução.
+
+    :return: dict com repeticoes, tempo_min_ms, tempo_mediano_ms e pico_memoria_mb
+    """
+    tempos = []
+    while len(tempos) < repeticoes and (not tempos or sum(tempos) < tempo_max):
+        argumentos = preparar() if preparar else ()
+        inicio = time.perf_counter()
+        funcao(*argumentos)
+        tempos.append(time.perf_counter() - inicio)
+
+    argumentos = preparar() if preparar else ()
+    tracemalloc.start()
+    funcao(*argumentos)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'repeticoes': len(tempos),
+        'tempo_min_ms': round(min(tempos) * 1000, 3),
+        'tempo_mediano_ms': round(statistics.median(tempos) * 1000, 3),
+        'pico_memoria_mb': round(pico / 1024 / 1024, 2),
+    }
+
+
+def arquivo_sintetico(pasta, anos, semente):
+    """CSV sintético de um hotel (gerado só na primeira vez)."""
+    caminho = os.path.join(pasta, f'hotel_{anos}anos_s{semente}.csv')
+    if not os.path.exists(caminho):
+        os.makedirs(pasta, exist_ok=True)
+        gerar_dados.gerar_hotel(anos, semente=semente).to_csv(caminho, index=False)
+    return caminho
+
+
+def portfolio_sintetico(pasta, anos, hoteis, semente):
+    """Pasta com um CSV sintético por hotel (gerada só na primeira vez)."""
+    destino = os.path.join(pasta, f'portfolio_{hoteis}hoteis_{anos}anos_s{semente}')
+    if not os.path.isdir(destino):
+        gerar_dados.gerar_portfolio(destino + '.tmp', anos, hoteis, semente=semente)
+        os.rename(destino + '.tmp', destino)
+    return destino
+
+
+def usar_dados(arquivo, pasta_hoteis=None):
+    """Aponta o app para os dados sintéticos e recarrega o registro de dados."""
+    app.DATA_FILE = arquivo
+    app.PASTA_HOTEIS = pasta_hoteis or os.path.join(os.path.dirname(arquivo), 'sem_hoteis')
+    app.dados = None
+    app.cache_conteudo.limpar()
+    app.carregar_dados()
+
+
+def medir_hotel(arquivo, repeticoes, tempo_max):
+    """Etapas de um hotel. Retorna {etapa: medição} e o número de reservas."""
+    etapas = {}
+    colunas = process_data.COLUNAS_DASHBOARD
+    etapas['load_and_process_data[csv]'] = medir(
+        lambda: process_data.load_and_process_data(arquivo, colunas=colunas, usar_cache=False), repeticoes, tempo_max)
+    process_data.load_and_process_data(arquivo, colunas=colunas)  # grava o cache colunar
+    etapas['load_and_process_data[cache]'] = medir(
+        lambda: process_data.load_and_process_data(arquivo, colunas=colunas), repeticoes, tempo_max)
+
+    bruto = app.load_data(arquivo)
+    etapas['calculate_metrics'] = medir(app.calculate_metrics, repeticoes, tempo_max, preparar=lambda: (bruto.copy(),))
+    df = app.calculate_metrics(bruto.copy())
+
+    ano = int(df.index[len(df) // 2].year)
+    etapas['prepare_and_filter_data[ano]'] = medir(lambda: app.prepare_and_filter_data(df, ano), repeticoes, tempo_max)
+    etapas['prepare_and_filter_data[mes]'] = medir(lambda: app.prepare_and_filter_data(df, None, 6), repeticoes, tempo_max)
+    etapas['prepare_table_data'] = medir(
+        lambda: app.prepare_table_data(df, app.RESERVAS_POR_PAGINA, 0, app.intervalos_filtrados(df, ano)), repeticoes, tempo_max)
+    filtrado = app.prepare_and_filter_data(df, ano)
+    etapas['prepare_donut_chart_data'] = medir(lambda: app.prepare_donut_chart_data(filtrado), repeticoes, tempo_max)
+
+    cubo = agregados.construir_cubo(df)
+    etapas['construir_cubo'] = medir(lambda: agregados.construir_cubo(df), repeticoes, tempo_max)
+    inicio, fim = df.index[0], df.index[-1]
+    etapas['consultar_cubo[intervalo]'] = medir(
+        lambda: agregados.consultar_cubo(cubo, None, None, inicio + pd.Timedelta(days=17), fim - pd.Timedelta(days=17)),
+        repeticoes, tempo_max)
+    etapas['consultar_cubo[mes]'] = medir(lambda: agregados.consultar_cubo(cubo, None, 6), repeticoes, tempo_max)
+    serie = agregados.serie_diaria(cubo, 'receita_total_dia')
+    etapas['create_line_chart'] = medir(
+        lambda: charts.create_line_chart(serie, x='data', y='receita_total_dia', title='Receita',
+                                         max_pontos=app.PONTOS_GRAFICO_LINHA), repeticoes, tempo_max)
+    diaria = previsao.serie_continua(cubo['diario'], 'quartos_ocupados_dia')
+    etapas['previsao.ajustar'] = medir(lambda: previsao.ajustar(diaria), repeticoes, tempo_max)
+    modelo = previsao.ajustar(diaria)
+    etapas['previsao.prever[365]'] = medir(lambda: previsao.prever(modelo, 365), repeticoes, tempo_max)
+    fonte = relatorios.fonte_em_memoria(cubo, df)
+    with tempfile.TemporaryDirectory() as pasta:
+        for formato, gravar in relatorios.GRAVADORES.items():
+            for granularidade in relatorios.GRANULARIDADES:
+                caminho = os.path.join(pasta, f'relatorio.{formato}')
+                etapas[f'relatorio.{formato}[{granularidade}]'] = medir(
+                    lambda: gravar(fonte, granularidade, caminho, 'Relatório'), repeticoes, tempo_max)
+    rosca = app.prepare_donut_chart_data(filtrado)
+    etapas['create_pie_chart'] = medir(
+        lambda: charts.create_pie_chart(rosca, names='Tipo', values='Quantidade', title='Tipos'), repeticoes, tempo_max)
+
+    usar_dados(arquivo)
+    etapas['create_main_content'] = medir(
+        lambda: app.create_main_content(app.dados), repeticoes, tempo_max, preparar=lambda: app.cache_conteudo.limpar() or ())
+    etapas['create_main_content[cache]'] = medir(lambda: app.create_main_content(app.dados), repeticoes, tempo_max)
+    return etapas, len(df)
+
+
+def medir_portfolio(pasta_hoteis, repeticoes, tempo_max):
+    """Etapas da visão de portfólio (resumos de todos os hotéis)."""
+    etapas = {}
+    arquivo = sorted(os.path.join(pasta_hoteis, f) for f in os.listdir(pasta_hoteis) if f.endswith('.csv'))[0]
+    linhas = 0
+    for caminho in os.listdir(pasta_hoteis):
+        if caminho.endswith('.csv'):
+            # grava os caches colunares
+            linhas += len(process_data.load_and_process_data(os.path.join(pasta_hoteis, caminho)))
+
+    def carregar_portfolio():
+        usar_dados(arquivo, pasta_hoteis)
+        app.create_main_content(app.dados)
+
+    etapas['create_main_content[portfolio_frio]'] = medir(carregar_portfolio, repeticoes, tempo_max)
+    etapas['create_main_content[portfolio]'] = medir(
+        lambda: app.create_main_content(app.dados), repeticoes, tempo_max, preparar=lambda: app.cache_conteudo.limpar() or ())
+    return etapas, linhas
+
+
+def commit_atual():
+    """Hash do commit em uso (ou None fora de um repositório git)."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def comparar(caminho_antes, caminho_depois, limite=LIMITE_REGRESSAO):
+    """
+    Imprime a razão depois/antes do tempo mínimo (menos sujeito a ruído que a
+    mediana com poucas repetições) e o pico de memória de cada etapa.
+    """
+    with open(caminho_antes) as f:
+        antes = json.load(f)
+    with open(caminho_depois) as f:
+        depois = json.load(f)
+    chave = lambda r: (r['cenario'], r['etapa'])
+    anteriores = {chave(r): r for r in antes['resultados']}
+
+    print(f"{'cenário':<22} {'etapa':<38} {'antes ms':>10} {'depois ms':>10} {'razão':>7} {'mem MB':>14}")
+    regressoes = 0
+    for r in depois['resultados']:
+        a = anteriores.get(chave(r))
+        if a is None:
+            continue
+        razao = r['tempo_min_ms'] / a['tempo_min_ms'] if a['tempo_min_ms'] else float('nan')
+        marca = ' <-' if razao > limite else ''
+        regressoes += razao > limite
+        memoria = f"{a['pico_memoria_mb']:.1f}->{r['pico_memoria_mb']:.1f}"
+        print(f"{r['cenario']:<22} {r['etapa']:<38} {a['tempo_min_ms']:>10.1f} {r['tempo_min_ms']:>10.1f} "
+              f"{razao:>6.2f}x {memoria:>14}{marca}")
+    print(f"\n{antes.get('commit')} -> {depois.get('commit')}: {regressoes} etapa(s) mais de {limite:.1f}x mais lenta(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--anos', type=int, nargs='+', default=[1, 25], help='escalas (anos de dados) medidas')
+    parser.add_argument('--hoteis', type=int, default=0, help='hotéis do cenário de portfólio (0 = sem portfólio)')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--tempo-max', type=float, default=10.0, help='segundos por etapa (mínimo de uma execução)')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--pasta', default=PASTA_PADRAO, help='onde guardar os CSVs sintéticos')
+    parser.add_argument('--saida', default=None, help='arquivo JSON (padrão: imprime na tela)')
+    parser.add_argument('--comparar', nargs=2, metavar=('ANTES', 'DEPOIS'), help='compara dois JSONs e sai')
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    resultados = []
+    for anos in args.anos:
+        cenarios = [(f'{anos} anos', 1, lambda: medir_hotel(arquivo_sintetico(args.pasta, anos, args.semente),
+                                                            args.repeticoes, args.tempo_max))]
+        if args.hoteis > 1:
+            cenarios.append((f'{anos} anos, {args.hoteis} hotéis', args.hoteis,
+                             lambda: medir_portfolio(portfolio_sintetico(args.pasta, anos, args.hoteis, args.semente),
+                                                     args.repeticoes, args.tempo_max)))
+        for cenario, hoteis, executar in cenarios:
+            print(f"Medindo: {cenario}", file=sys.stderr)
+            etapas, linhas = executar()
+            for etapa, medicao in etapas.items():
+                resultados.append({'cenario': cenario, 'anos': anos, 'hoteis': hoteis, 'linhas': linhas,
+                                   'etapa': etapa, **medicao})
+
+    relatorio = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit_atual(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cpus': os.cpu_count(),
+        'resultados': resultados,
+        'pico_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            f.write(texto)
+        print(f"Resultados gravados em {args.saida}", file=sys.stderr)
+    else:
+        print(texto)
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,6 @@ a partir da pasta `hotel_dashboard`.
 
 import sys, os
 import pandas as pd
-from babel.numbers import format_currency
 
 # 1) Insira o diretório 'hotel_dashboard' no sys.path, para que 'utils' e 'data_processing'
 #    fiquem acessíveis como módulos irmãos de 'tests'.
@@ -20,6 +19,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 # 2) Agora podemos importar 'utils' e 'data_processing' normalmente
 from utils import helpers
+from utils.formatacao import formatar_brl
 from data_processing import process_data
 
 # Caminho do arquivo CSV
@@ -62,10 +62,10 @@ gop_medio = df['GOP'].mean()
 goppar_medio = df['GOPPAR'].mean()
 
 # 4) Formatar os resultados
-receita_total_formatada = format_currency(receita_total, 'BRL', locale='pt_BR')
-adr_medio_formatado = format_currency(adr_medio, 'BRL', locale='pt_BR')
-gop_medio_formatado = format_currency(gop_medio, 'BRL', locale='pt_BR')
-goppar_medio_formatado = format_currency(goppar_medio, 'BRL', locale='pt_BR')
+receita_total_formatada = formatar_brl(receita_total)
+adr_medio_formatado = formatar_brl(adr_medio)
+gop_medio_formatado = formatar_brl(gop_medio)
+goppar_medio_formatado = formatar_brl(goppar_medio)
 ocupacao_media_formatada = f"{ocupacao_media:.2f}%"
 
 # 5) Imprimir os resultados
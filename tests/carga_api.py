@@ -0,0 +1,101 @@
+"""
+tests/carga_api.py
+
+Teste de carga da API JSON (api.py): dispara requisições concorrentes aos
+endpoints de KPIs, tipos de quarto e reservas com filtros aleatórios e mede a
+vazão e as latências (p50/p99), por endpoint e no total. Com a API no ar
+(ex.: uvicorn api:api --port 8060):
+  python tests/carga_api.py --url http://127.0.0.1:8060 --requisicoes 2000 --concorrencia 16
+  python tests/carga_api.py --etag   # revalida com If-None-Match (respostas 304)
+
+Sem --etag, cada requisição baixa o corpo inteiro (o cache de respostas da API
+ainda vale); com --etag, o cliente guarda o ETag de cada URL e envia
+If-None-Match, como um navegador ou uma ferramenta de BI faria.
+"""
+
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+def sortear_requisicao(hotel, anos):
+    """(endpoint, parâmetros) aleatórios, na proporção de uso esperada."""
+    parametros = {'hotel': hotel} if hotel else {}
+    endpoint = random.choices(['/api/kpis', '/api/tipos-quarto', '/api/reservas'], weights=[6, 2, 2])[0]
+    if endpoint == '/api/reservas':
+        parametros.update(page=random.randint(1, 20), size=random.choice([10, 25, 50]),
+                          ordenar=random.choice(['data', 'valor_diaria', 'total_pago']),
+                          direcao=random.choice(['asc', 'desc']))
+        return endpoint, parametros
+    if random.random() < 0.3:
+        ano = random.choice(anos)
+        mes_inicio = random.randint(1, 12)
+        parametros.update(inicio=f'{ano}-{mes_inicio:02d}-01', fim=f'{ano}-12-31')
+    else:
+        parametros.update({k: v for k, v in (('ano', random.choice([None] + anos)),
+                                             ('mes', random.choice([None] + list(range(1, 13)))))
+                           if v is not None})
+    return endpoint, parametros
+
+def percentil(latencias, p):
+    return latencias[max(0, int(len(latencias) * p) - 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8060')
+    parser.add_argument('--requisicoes', type=int, default=1000)
+    parser.add_argument('--concorrencia', type=int, default=8)
+    parser.add_argument('--anos', default='2000-2024', help='faixa de anos sorteados (ex.: 2000-2024)')
+    parser.add_argument('--hotel', default=None, help="hotel consultado (padrão: o da API; 'portfolio' só vale para KPIs)")
+    parser.add_argument('--etag', action='store_true', help='revalida com If-None-Match')
+    args = parser.parse_args()
+
+    primeiro, ultimo = (int(a) for a in args.anos.split('-'))
+    anos = list(range(primeiro, ultimo + 1))
+    random.seed(0)
+    pedidos = [sortear_requisicao(args.hotel, anos) for _ in range(args.requisicoes)]
+    # Uma sessão por thread: requests.Session não é segura entre threads
+    sessoes = threading.local()
+    etags = {}
+    trava = threading.Lock()
+
+    def enviar(pedido):
+        endpoint, parametros = pedido
+        chave = (endpoint, tuple(sorted(parametros.items())))
+        cabecalhos = {}
+        if args.etag and chave in etags:
+            cabecalhos['If-None-Match'] = etags[chave]
+        if not hasattr(sessoes, 'sessao'):
+            sessoes.sessao = requests.Session()
+        inicio = time.perf_counter()
+        resposta = sessoes.sessao.get(args.url.rstrip('/') + endpoint, params=parametros, headers=cabecalhos)
+        duracao = time.perf_counter() - inicio
+        if resposta.status_code not in (200, 304):
+            resposta.raise_for_status()
+        if args.etag and 'ETag' in resposta.headers:
+            with trava:
+                etags[chave] = resposta.headers['ETag']
+        return endpoint, resposta.status_code, len(resposta.content), duracao
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+        resultados = list(executor.map(enviar, pedidos))
+    duracao = time.perf_counter() - inicio
+
+    latencias = sorted(r[3] for r in resultados)
+    nao_modificadas = sum(1 for r in resultados if r[1] == 304)
+    print(f"Requisições: {len(latencias)} em {duracao:.2f}s ({len(latencias) / duracao:.1f} req/s)")
+    print(f"Latência p50: {statistics.median(latencias) * 1000:.1f} ms")
+    print(f"Latência p99: {percentil(latencias, 0.99) * 1000:.1f} ms")
+    print(f"Respostas 304: {nao_modificadas}; bytes recebidos: {sum(r[2] for r in resultados):,}".replace(',', '.'))
+    for endpoint in sorted({r[0] for r in resultados}):
+        parcial = sorted(r[3] for r in resultados if r[0] == endpoint)
+        print(f"  {endpoint:<18} {len(parcial):>6} req  p50 {statistics.median(parcial) * 1000:7.1f} ms"
+              f"  p99 {percentil(parcial, 0.99) * 1000:7.1f} ms")
+
+if __name__ == "__main__":
+    main()
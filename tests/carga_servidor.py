@@ -0,0 +1,80 @@
+"""
+tests/carga_servidor.py
+
+Teste de carga do dashboard: dispara requisições concorrentes ao callback
+principal (update_main_content) com filtros aleatórios e mede a vazão e as
+latências. Com o servidor no ar (ex.: gunicorn -c gunicorn.conf.py wsgi:server):
+  python tests/carga_servidor.py --url http://127.0.0.1:8050 --requisicoes 2000 --concorrencia 16
+"""
+
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+SAIDAS = [
+    ('filtros-selecionados', 'children'),
+    ('cards-resumo', 'children'),
+    ('grafico-principal', 'figure'),
+    ('grafico-rosca', 'figure'),
+    ('tabela-hoteis', 'data'),
+    ('bloco-reservas', 'style'),
+    ('bloco-hoteis', 'style'),
+]
+
+def montar_corpo(ano, mes, hotel=None):
+    """Corpo da requisição que o navegador envia ao mudar um filtro (hotel None = seleção inicial)."""
+    return {
+        'output': '..' + '...'.join(f'{i}.{p}' for i, p in SAIDAS) + '..',
+        'outputs': [{'id': i, 'property': p} for i, p in SAIDAS],
+        'inputs': [
+            {'id': 'hotel-dropdown', 'property': 'value', 'value': hotel},
+            {'id': 'ano-dropdown', 'property': 'value', 'value': ano},
+            {'id': 'mes-dropdown', 'property': 'value', 'value': mes},
+            {'id': 'start-date', 'property': 'date', 'value': None},
+            {'id': 'end-date', 'property': 'date', 'value': None},
+            {'id': 'versao-dados', 'property': 'data', 'value': 1},
+        ],
+        'changedPropIds': ['ano-dropdown.value'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8050')
+    parser.add_argument('--requisicoes', type=int, default=1000)
+    parser.add_argument('--concorrencia', type=int, default=8)
+    parser.add_argument('--anos', default='2000-2024', help='faixa de anos sorteados (ex.: 2000-2024)')
+    parser.add_argument('--hotel', default=None, help='hotel consultado (padrão: portfólio, ou o único hotel)')
+    args = parser.parse_args()
+
+    primeiro, ultimo = (int(a) for a in args.anos.split('-'))
+    random.seed(0)
+    filtros = [(random.choice([None] + list(range(primeiro, ultimo + 1))), random.choice([None] + list(range(1, 13))))
+               for _ in range(args.requisicoes)]
+    # Uma sessão por thread: requests.Session não é segura entre threads
+    sessoes = threading.local()
+    url = args.url.rstrip('/') + '/_dash-update-component'
+
+    def enviar(filtro):
+        if not hasattr(sessoes, 'sessao'):
+            sessoes.sessao = requests.Session()
+        inicio = time.perf_counter()
+        resposta = sessoes.sessao.post(url, json=montar_corpo(*filtro, hotel=args.hotel))
+        resposta.raise_for_status()
+        return time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+        latencias = sorted(executor.map(enviar, filtros))
+    duracao = time.perf_counter() - inicio
+
+    print(f"Requisições: {len(latencias)} em {duracao:.2f}s ({len(latencias) / duracao:.1f} req/s)")
+    print(f"Latência p50: {statistics.median(latencias) * 1000:.1f} ms")
+    print(f"Latência p99: {latencias[int(len(latencias) * 0.99) - 1] * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
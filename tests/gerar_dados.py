@@ -0,0 +1,169 @@
+"""
+tests/gerar_dados.py
+
+Gerador de dados sintéticos no mesmo formato de data/hotel_luxo_jan2000_dez2024.csv,
+de 1 a 100+ anos e para vários hotéis (um CSV por hotel, como espera a pasta
+HOTEL_PASTA_HOTEIS do app). Os dados são reprodutíveis: a mesma semente gera
+o mesmo arquivo. Exemplos:
+  python tests/gerar_dados.py --anos 25 --saida data/sintetico.csv
+  python tests/gerar_dados.py --anos 100 --hoteis 5 --saida data/hoteis
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from faker import Faker
+
+# Mesma ordem de colunas do CSV original
+COLUNAS = [
+    'id_registro', 'data', 'ano', 'mes', 'dia', 'nome_hotel', 'total_quartos', 'ocupacao_diaria',
+    'nome_cliente', 'tipo_de_quarto', 'forma_de_pagamento', 'quantidade_quartos', 'quantidade_diarias',
+    'valor_diaria', 'valor_total_diarias', 'valor_outros_consumos', 'total_pago', 'despesa_fixa',
+    'despesa_variavel', 'despesa_mao_obra_direta', 'despesa_financeira', 'despesa_administrativa',
+    'quartos_ocupados_dia', 'receita_quartos_dia', 'receita_total_dia', 'custo_total_dia',
+    'lucro_operacional_bruto_dia', 'adr_dia', 'revpar_dia', 'trevpar_dia', 'goppar_dia',
+]
+
+# Tipos de quarto e faixa da diária de cada um (R$)
+TIPOS_QUARTO = {'Standard': (300, 600), 'Duplo': (450, 850), 'Suite': (900, 1600)}
+FORMAS_PAGAMENTO = ['Cartão de Crédito', 'Cartão de Débito', 'Pix', 'Dinheiro', 'Transferência']
+
+# Hotéis do portfólio sintético: (nome, total de quartos), repetidos se preciso
+HOTEIS = [('Hotel Luxo', 100), ('Resort Mar Azul', 240), ('Pousada da Serra', 35),
+          ('Hotel Centro', 150), ('Eco Lodge', 20)]
+
+CLIENTES = 2000
+
+
+def gerar_hotel(anos, nome='Hotel Luxo', total_quartos=100, ano_inicial=2000, semente=42):
+    """
+    Gera as reservas de um hotel: ocupação diária com sazonalidade anual e
+    semanal, reservas de 1 ou 2 quartos que somam os quartos ocupados do dia
+    e valores do dia (receitas, despesas e KPIs) coerentes com as reservas.
+
+    :return: DataFrame com as colunas de COLUNAS
+    """
+    rng = np.random.default_rng(semente)
+    fake = Faker('pt_BR')
+    fake.seed_instance(semente)
+    clientes = np.array([fake.name() for _ in range(CLIENTES)])
+
+    dias = pd.date_range(f'{ano_inicial}-01-01', f'{ano_inicial + anos - 1}-12-31', freq='D')
+    sazonal = 0.55 + 0.2 * np.cos(2 * np.pi * (dias.dayofyear.to_numpy() - 15) / 365.25)
+    fim_de_semana = np.where(dias.dayofweek.to_numpy() >= 4, 0.08, 0.0)
+    ocupacao = np.clip(sazonal + fim_de_semana + rng.normal(0, 0.07, len(dias)), 0.05, 0.98)
+    ocupados = np.rint(ocupacao * total_quartos).astype(np.int64)
+
+    # Candidatas de 1 ou 2 quartos por dia; ficam as que cabem nos quartos
+    # ocupados do dia, e a última é ajustada para fechar a conta
+    dia_candidata = np.repeat(np.arange(len(dias)), ocupados)
+    quartos = rng.integers(1, 3, len(dia_candidata))
+    acumulado = np.cumsum(quartos)
+    inicio_dia = np.concatenate([[0], np.cumsum(ocupados)[:-1]])
+    base = np.concatenate([[0], acumulado])[inicio_dia][dia_candidata]
+    antes = acumulado - quartos - base
+    fica = antes < ocupados[dia_candidata]
+    dia_reserva = dia_candidata[fica]
+    quartos = np.minimum(quartos[fica], ocupados[dia_reserva] - antes[fica])
+    n = len(dia_reserva)
+
+    codigos_tipo = rng.choice(len(TIPOS_QUARTO), n, p=[0.5, 0.3, 0.2])
+    tipos = np.array(list(TIPOS_QUARTO))[codigos_tipo]
+    minimo, maximo = np.array(list(TIPOS_QUARTO.values()), dtype=float)[codigos_tipo].T
+    valor_diaria = (rng.uniform(minimo, maximo) * (0.8 + 0.4 * sazonal[dia_reserva])).round(2)
+    diarias = rng.integers(1, 8, n)
+    valor_total_diarias = (valor_diaria * diarias).round(2)
+    outros = rng.uniform(0, 400, n).round(2)
+    total_pago = (valor_total_diarias + outros).round(2)
+
+    def por_dia(valores):
+        return np.bincount(dia_reserva, weights=valores, minlength=len(dias)).round(2)
+
+    # Receita do dia: uma diária por quarto ocupado, mais os outros consumos
+    receita_quartos = por_dia(valor_diaria * quartos)
+    receita_total = (receita_quartos + por_dia(outros)).round(2)
+    despesa_fixa = 120.0 * total_quartos
+    despesa_variavel = (0.18 * receita_total).round(2)
+    mao_obra = 40.0 * total_quartos + 90.0 * ocupados
+    financeira = 10.0 * total_quartos
+    administrativa = 25.0 * total_quartos
+    custo_total = (despesa_fixa + despesa_variavel + mao_obra + financeira + administrativa).round(2)
+    lucro = (receita_total - custo_total).round(2)
+
+    datas = dias[dia_reserva]
+    df = pd.DataFrame({
+        'id_registro': np.arange(1, n + 1),
+        'data': datas.strftime('%Y-%m-%d'),
+        'ano': datas.year,
+        'mes': datas.month,
+        'dia': datas.day,
+        'nome_hotel': nome,
+        'total_quartos': total_quartos,
+        'ocupacao_diaria': (ocupados / total_quartos * 100).round(2)[dia_reserva],
+        'nome_cliente': clientes[rng.integers(0, CLIENTES, n)],
+        'tipo_de_quarto': tipos,
+        'forma_de_pagamento': rng.choice(FORMAS_PAGAMENTO, n),
+        'quantidade_quartos': quartos,
+        'quantidade_diarias': diarias,
+        'valor_diaria': valor_diaria,
+        'valor_total_diarias': valor_total_diarias,
+        'valor_outros_consumos': outros,
+        'total_pago': total_pago,
+        'despesa_fixa': despesa_fixa,
+        'despesa_variavel': despesa_variavel[dia_reserva],
+        'despesa_mao_obra_direta': mao_obra[dia_reserva],
+        'despesa_financeira': financeira,
+        'despesa_administrativa': administrativa,
+        'quartos_ocupados_dia': ocupados[dia_reserva],
+        'receita_quartos_dia': receita_quartos[dia_reserva],
+        'receita_total_dia': receita_total[dia_reserva],
+        'custo_total_dia': custo_total[dia_reserva],
+        'lucro_operacional_bruto_dia': lucro[dia_reserva],
+        'adr_dia': (receita_quartos / np.maximum(ocupados, 1)).round(2)[dia_reserva],
+        'revpar_dia': (receita_quartos / total_quartos).round(2)[dia_reserva],
+        'trevpar_dia': (receita_total / total_quartos).round(2)[dia_reserva],
+        'goppar_dia': (lucro / total_quartos).round(2)[dia_reserva],
+    })
+    return df[COLUNAS]
+
+
+def gerar_portfolio(pasta, anos, hoteis, ano_inicial=2000, semente=42):
+    """
+    Grava um CSV por hotel em `pasta` (ex.: data/hoteis), com tamanhos variados.
+
+    :return: Lista com os caminhos gravados
+    """
+    os.makedirs(pasta, exist_ok=True)
+    caminhos = []
+    for i in range(hoteis):
+        nome, total_quartos = HOTEIS[i % len(HOTEIS)]
+        if i >= len(HOTEIS):
+            nome = f'{nome} {i // len(HOTEIS) + 1}'
+        caminho = os.path.join(pasta, f"hotel_{i + 1:02d}.csv")
+        gerar_hotel(anos, nome, total_quartos, ano_inicial, semente + i).to_csv(caminho, index=False)
+        caminhos.append(caminho)
+    return caminhos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--anos', type=int, default=25)
+    parser.add_argument('--hoteis', type=int, default=1, help='com mais de um, --saida é uma pasta')
+    parser.add_argument('--ano-inicial', type=int, default=2000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default='data/sintetico.csv')
+    args = parser.parse_args()
+
+    if args.hoteis > 1:
+        for caminho in gerar_portfolio(args.saida, args.anos, args.hoteis, args.ano_inicial, args.semente):
+            print(f"Gravado: {caminho}")
+        return
+    df = gerar_hotel(args.anos, ano_inicial=args.ano_inicial, semente=args.semente)
+    os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+    df.to_csv(args.saida, index=False)
+    print(f"Gravado: {args.saida} ({len(df)} reservas)")
+
+if __name__ == "__main__":
+    main()
@@ -1,113 +1,147 @@
+"""
+tests/somar_datas_filtradas.py
+
+Métricas de vários períodos de uma vez (meses, semanas, janelas de campanha),
+sem perguntas interativas: os dados são carregados uma única vez e todos os
+intervalos são respondidos em uma passada vetorizada sobre as somas
+acumuladas do cubo (agregados.metricas_intervalos). Exemplos:
+  python tests/somar_datas_filtradas.py --inicio 01/06/2023 --fim 30/06/2023
+  python tests/somar_datas_filtradas.py --intervalos campanhas.csv --saida metricas.csv
+  python tests/somar_datas_filtradas.py --mensal --semanal --saida metricas.json
+
+O arquivo de intervalos (CSV ou JSON, lista de objetos) tem as colunas 'inicio'
+e 'fim' (AAAA-MM-DD ou DD/MM/AAAA, inclusive) e, opcionalmente, 'nome'.
+A vazão (intervalos por segundo) sai na saída de erros.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
 import pandas as pd
-from datetime import datetime
 
-# Função para carregar os dados
-def load_data(file_path):
-    """
-    Carrega o DataFrame a partir de um arquivo CSV.
-    """
-    try:
-        df = pd.read_csv(file_path)
-        # Converte a coluna 'data' para datetime, assumindo o formato ISO8601 (AAAA-MM-DD)
-        df['data'] = pd.to_datetime(df['data'], format='ISO8601')
-        return df
-    except Exception as e:
-        print(f"Erro ao carregar os dados: {e}")
-        return None
-
-# Função para filtrar os dados por período
-def filter_data_by_date(df, start_date, end_date):
+import app
+from data_processing import agregados
+
+
+def ler_datas(valores):
     """
-    Filtra o DataFrame pelo período entre start_date e end_date.
+    Converte textos de data em AAAA-MM-DD ou DD/MM/AAAA (os dois podem
+    aparecer no mesmo arquivo) para datetime.
     """
-    try:
-        # Converte as datas de entrada para o formato datetime
-        start_date = pd.to_datetime(start_date, format='%d/%m/%Y')
-        end_date = pd.to_datetime(end_date, format='%d/%m/%Y')
-        # Filtra o DataFrame
-        filtered_df = df[(df['data'] >= start_date) & (df['data'] <= end_date)]
-        return filtered_df
-    except Exception as e:
-        print(f"Erro ao filtrar os dados: {e}")
-        return None
-
-# Função para calcular as métricas
-def calculate_metrics(df):
+    valores = pd.Series(valores, dtype='object').astype(str).str.strip()
+    datas = pd.to_datetime(valores, format='ISO8601', errors='coerce')
+    brasileiras = datas.isna()
+    if brasileiras.any():
+        datas[brasileiras] = pd.to_datetime(valores[brasileiras], format='%d/%m/%Y', errors='coerce')
+    invalidas = valores[datas.isna()]
+    if not invalidas.empty:
+        raise ValueError(f"Datas inválidas: {', '.join(invalidas.head(5))}")
+    return pd.DatetimeIndex(datas)
+
+
+def ler_intervalos(caminho):
     """
-    Calcula as métricas de Revenue Management.
+    Lê o arquivo de intervalos (CSV ou JSON) e retorna um DataFrame com
+    'nome', 'inicio' e 'fim'.
     """
-    try:
-        # Total de quartos é fixo (100) e está na sétima coluna
-        total_quartos = df['total_quartos'].iloc[0]  # Pega o valor da primeira linha
-
-        # Receita total é a soma da receita total diária
-        receita_total = df['receita_total_dia'].sum()
-
-        # Ocupação média é a média de quartos ocupados em relação ao total de quartos
-        ocupacao_media = (df['quartos_ocupados_dia'].sum() / (total_quartos * len(df))) * 100
-
-        # ADR Médio é calculado usando a função do dashboard
-        adr_medio = calcular_adr(df['receita_quartos_dia'].sum(), df['quartos_ocupados_dia'].sum())
-
-        # GOP Médio é a média do lucro operacional bruto diário
-        gop_medio = df['lucro_operacional_bruto_dia'].mean()
-
-        # GOPPAR Médio é a média do GOPPAR diário
-        goppar_medio = df['goppar_dia'].mean()
-
-        return {
-            'Total Quartos': total_quartos,
-            'Receita Total': receita_total,
-            'Ocupação Média': ocupacao_media,
-            'ADR Médio': adr_medio,
-            'GOP Médio': gop_medio,
-            'GOPPAR Médio': goppar_medio
-        }
-    except Exception as e:
-        print(f"Erro ao calcular as métricas: {e}")
-        return None
-
-# Função para calcular o ADR (idêntica ao dashboard)
-def calcular_adr(receita_quartos_dia, quartos_ocupados_dia):
+    if caminho.lower().endswith('.json'):
+        intervalos = pd.read_json(caminho, orient='records', dtype=False)
+    else:
+        intervalos = pd.read_csv(caminho, dtype=str)
+    faltando = {'inicio', 'fim'} - set(intervalos.columns)
+    if faltando:
+        raise ValueError(f"Colunas ausentes em {caminho}: {', '.join(sorted(faltando))}")
+    if 'nome' not in intervalos.columns:
+        intervalos['nome'] = [f'intervalo {i + 1}' for i in range(len(intervalos))]
+    return pd.DataFrame({
+        'nome': intervalos['nome'].astype(str).to_numpy(),
+        'inicio': ler_datas(intervalos['inicio']),
+        'fim': ler_datas(intervalos['fim']),
+    })
+
+
+def intervalos_do_calendario(primeiro_dia, ultimo_dia, frequencia):
     """
-    Calcula a diária média (ADR).
+    Todos os meses ('mensal') ou semanas de segunda a domingo ('semanal') que
+    tocam o período [primeiro_dia, ultimo_dia].
     """
-    try:
-        return receita_quartos_dia / quartos_ocupados_dia
-    except ZeroDivisionError:
-        return 0  # Retorna 0 se quartos_ocupados for zero
+    if frequencia == 'mensal':
+        inicios = pd.date_range(primeiro_dia.replace(day=1), ultimo_dia, freq='MS')
+        fins = inicios + pd.offsets.MonthEnd(0)
+        nomes = inicios.strftime('mês %Y-%m')
+    else:
+        inicios = pd.date_range(primeiro_dia - pd.Timedelta(days=primeiro_dia.dayofweek), ultimo_dia, freq='7D')
+        fins = inicios + pd.Timedelta(days=6)
+        nomes = inicios.strftime('semana %G-W%V')
+    return pd.DataFrame({'nome': nomes, 'inicio': inicios, 'fim': fins})
+
+
+def gravar(resultado, caminho):
+    """Grava em CSV ou JSON (pela extensão); sem caminho, imprime o CSV na tela."""
+    if not caminho:
+        print(resultado.to_csv(index=False, date_format='%Y-%m-%d', float_format='%.2f'), end='')
+    elif caminho.lower().endswith('.json'):
+        resultado = resultado.assign(inicio=resultado['inicio'].dt.strftime('%Y-%m-%d'),
+                                     fim=resultado['fim'].dt.strftime('%Y-%m-%d'))
+        resultado.to_json(caminho, orient='records', force_ascii=False, indent=2)
+    else:
+        resultado.to_csv(caminho, index=False, date_format='%Y-%m-%d')
+
 
-# Função principal
 def main():
-    # Caminho para o arquivo CSV
-    file_path = 'data/hotel_luxo_jan2000_dez2024.csv'
-
-    # Carregar os dados
-    df = load_data(file_path)
-    if df is None:
-        return
-
-    # Solicitar as datas inicial e final
-    start_date = input("Digite a data inicial (DD/MM/AAAA): ")
-    end_date = input("Digite a data final (DD/MM/AAAA): ")
-
-    # Filtrar os dados pelo período
-    filtered_df = filter_data_by_date(df, start_date, end_date)
-    if filtered_df is None:
-        return
-
-    # Calcular as métricas
-    metrics = calculate_metrics(filtered_df)
-    if metrics is None:
-        return
-
-    # Exibir os resultados
-    print("\nMétricas no período de {} a {}:".format(start_date, end_date))
-    for key, value in metrics.items():
-        if key == 'ADR Médio':
-            print(f"{key}: R$ {value:.2f}")  # Formata o ADR Médio como moeda
-        else:
-            print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--arquivo', default=app.DATA_FILE, help='CSV do hotel')
+    parser.add_argument('--intervalos', help='arquivo CSV ou JSON com os intervalos')
+    parser.add_argument('--inicio', help='data inicial de um único intervalo (com --fim)')
+    parser.add_argument('--fim', help='data final de um único intervalo')
+    parser.add_argument('--mensal', action='store_true', help='acrescenta todos os meses do histórico')
+    parser.add_argument('--semanal', action='store_true', help='acrescenta todas as semanas do histórico')
+    parser.add_argument('--saida', help='arquivo .csv ou .json (padrão: CSV na tela)')
+    args = parser.parse_args()
+
+    if bool(args.inicio) != bool(args.fim):
+        parser.error('--inicio e --fim devem ser usados juntos')
+    if not (args.intervalos or args.inicio or args.mensal or args.semanal):
+        parser.error('informe --intervalos, --inicio/--fim, --mensal ou --semanal')
+
+    inicio = time.perf_counter()
+    df = app.calculate_metrics(app.load_data(args.arquivo, agregados.COLUNAS_ORIGEM))
+    cubo = agregados.construir_cubo(df)
+    carga = time.perf_counter() - inicio
+
+    try:
+        partes = []
+        if args.intervalos:
+            partes.append(ler_intervalos(args.intervalos))
+        if args.inicio:
+            partes.append(pd.DataFrame({'nome': ['intervalo'], 'inicio': ler_datas([args.inicio]),
+                                        'fim': ler_datas([args.fim])}))
+    except (OSError, ValueError) as e:
+        print(f"Erro ao ler os intervalos: {e}", file=sys.stderr)
+        sys.exit(1)
+    dias = cubo['diario'].index
+    for frequencia in ('mensal', 'semanal'):
+        if getattr(args, frequencia) and len(dias):
+            partes.append(intervalos_do_calendario(dias[0], dias[-1], frequencia))
+    if not partes:
+        print("Nenhum intervalo para consultar.", file=sys.stderr)
+        sys.exit(1)
+    intervalos = pd.concat(partes, ignore_index=True)
+
+    inicio = time.perf_counter()
+    metricas = agregados.metricas_intervalos(cubo, intervalos['inicio'], intervalos['fim'])
+    consulta = time.perf_counter() - inicio
+
+    resultado = pd.concat([intervalos[['nome']], metricas], axis=1)
+    gravar(resultado, args.saida)
+    print(f"{len(df)} reservas carregadas em {carga:.2f} s; {len(intervalos)} intervalos em "
+          f"{consulta * 1000:.2f} ms ({len(intervalos) / max(consulta, 1e-9):.0f} intervalos/s)", file=sys.stderr)
+    if args.saida:
+        print(f"Resultados gravados em {args.saida}", file=sys.stderr)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
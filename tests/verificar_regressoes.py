@@ -0,0 +1,140 @@
+"""
+tests/verificar_regressoes.py
+
+Casos que já quebraram e não devem voltar a quebrar, cada um com a sua
+verificação. Sem dependências além das do dashboard:
+  python tests/verificar_regressoes.py
+  python tests/verificar_regressoes.py --caso filtro   # só os casos com 'filtro' no nome
+
+Imprime OK ou FALHOU por caso e termina com código 1 se algum falhar.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import traceback
+from fractions import Fraction
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+
+from data_processing import agregados, previsao, process_data, reservas
+from tests import gerar_dados
+
+
+def filtro_valor_com_palavra_de_operador():
+    """Palavras como 'le' dentro de um valor entre aspas não são tomadas pelo operador."""
+    assert reservas.interpretar_filtro('{nome_cliente} contains "Michele Souza"') == \
+        [('nome_cliente', 'contains', 'Michele Souza', 'Michele Souza')]
+    assert reservas.interpretar_filtro('{tipo_de_quarto} = "Single "') == \
+        [('tipo_de_quarto', 'eq', 'Single ', 'Single ')]
+    assert reservas.interpretar_filtro('{valor_diaria} >= 100 && {nome_cliente} ne "a le b"') == \
+        [('valor_diaria', 'ge', 100.0, '100'), ('nome_cliente', 'ne', 'a le b', 'a le b')]
+    assert reservas.condicoes_invalidas('{nome_cliente} contains "Michele Souza"', {'nome_cliente': 'text'}) == []
+
+
+def _ajustar_serie(arquivo, nome):
+    dias = pd.date_range('2020-01-01', periods=previsao.MINIMO_DIAS * 2, freq='D')
+    serie = pd.Series(np.random.default_rng(len(nome)).uniform(10, 90, len(dias)), index=dias)
+    previsao.modelo_em_cache(arquivo, nome, serie)
+
+
+def previsao_workers_gravando_series_diferentes():
+    """Processos que ajustam séries diferentes do mesmo hotel ao mesmo tempo guardam todas."""
+    nomes = ['quartos_ocupados_dia', 'receita_quartos_dia', 'receita_total_dia', 'lucro_operacional_bruto_dia']
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = os.path.join(pasta, 'hotel.csv')
+        with multiprocessing.get_context('spawn').Pool(len(nomes)) as pool:
+            pool.starmap(_ajustar_serie, [(arquivo, nome) for nome in nomes])
+        for nome in nomes:
+            assert previsao._ler_modelo(previsao.caminho_cache(arquivo, nome)) is not None, nome
+
+
+def cards_com_media_em_meio_centavo():
+    """
+    Médias de valores em centavos que caem em meio centavo (como o GOP Médio de
+    setembro de 2023) saem do cubo como a média exata, qualquer que seja a ordem das somas.
+    """
+    rng = np.random.default_rng(2023)
+    dias = pd.date_range('2000-01-01', '2024-12-31', freq='D')
+    datas = np.repeat(dias, rng.integers(1, 7, len(dias)))
+    setembro = np.flatnonzero((datas.year == 2023) & (datas.month == 9))
+    if len(setembro) % 2:
+        datas = datas.delete(setembro[-1])
+        setembro = setembro[:-1]
+    centavos = rng.integers(-50000, 900000, (len(datas), 2))
+    # Soma do GOP de setembro de 2023 = n * k + n / 2 centavos: média em meio centavo
+    n = len(setembro)
+    centavos[setembro[-1], 1] += n // 2 - centavos[setembro, 1].sum() % n
+    df = pd.DataFrame({'data': datas, 'total_quartos': 100.0})
+    for coluna in agregados.ORIGEM_COLUNAS_DIA.values():
+        df[coluna] = 1.0
+    df['receita_total_dia'] = centavos[:, 0] / 100
+    df['GOP'] = centavos[:, 1] / 100
+    df['GOPPAR'] = df['GOP'] / 100
+    df['Ocupacao'] = df['ADR'] = 1.0
+    cubo = agregados.construir_cubo(df)
+
+    for ano, mes in [(2023, 9)] + [(ano, mes) for ano in (None, 2001, 2012, 2024) for mes in range(1, 13)]:
+        periodo = df[df['data'].dt.month == mes]
+        if ano:
+            periodo = periodo[periodo['data'].dt.year == ano]
+        media = Fraction(sum(int(c) for c in np.round(periodo['GOP'] * 100)), 100 * len(periodo))
+        cards = agregados.metricas_periodo(cubo, ano, mes)
+        assert cards['gop_medio'] == float(media), (ano, mes, cards['gop_medio'], media)
+        receita = Fraction(sum(int(c) for c in np.round(periodo['receita_total_dia'] * 100)), 100)
+        assert cards['receita_total'] == float(receita), (ano, mes, cards['receita_total'], receita)
+
+
+def ingestao_com_tipos_que_mudam_entre_blocos():
+    """
+    O primeiro bloco não fixa tipos que não cabem nos seguintes: uma coluna de
+    inteiros que ganha vazios e uma coluna de texto vazia no primeiro bloco.
+    """
+    df = gerar_dados.gerar_hotel(1)
+    df['quantidade_quartos'] = df['quantidade_quartos'].astype('Int64')
+    df.loc[150, 'quantidade_quartos'] = pd.NA
+    df.loc[:99, 'nome_hotel'] = None
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = os.path.join(pasta, 'hotel.csv')
+        df.to_csv(arquivo, index=False)
+        assert process_data.ingerir_em_blocos(arquivo, tamanho_bloco=100, ao_progresso=None) == len(df)
+        lido = process_data.load_and_process_data(arquivo)
+    assert lido['quantidade_quartos'].isna().sum() == 1
+    assert lido['quantidade_quartos'].sum() == df['quantidade_quartos'].sum()
+    assert lido['nome_hotel'].isna().sum() == 100 and lido['nome_hotel'].iloc[-1] == 'Hotel Luxo'
+
+
+CASOS = [
+    filtro_valor_com_palavra_de_operador,
+    cards_com_media_em_meio_centavo,
+    ingestao_com_tipos_que_mudam_entre_blocos,
+    previsao_workers_gravando_series_diferentes,
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--caso', default='', help='roda só os casos cujo nome contém este texto')
+    args = parser.parse_args()
+
+    falhas = 0
+    for caso in CASOS:
+        if args.caso not in caso.__name__:
+            continue
+        try:
+            caso()
+            print(f"OK      {caso.__name__}")
+        except Exception:
+            falhas += 1
+            print(f"FALHOU  {caso.__name__}")
+            traceback.print_exc()
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """
+    Cache em memória com despejo LRU (menos usado recentemente), expiração por
+    tempo (TTL) e limite de memória. Seguro para uso por várias threads.
+
+    :param max_itens: Número máximo de entradas
+    :param ttl: Validade de cada entrada, em segundos (None = sem expiração)
+    :param max_bytes: Limite aproximado de memória, medido pelo tamanho serializado
+                      (pickle) dos valores (None = sem limite)
+    """
+
+    def __init__(self, max_itens=128, ttl=None, max_bytes=None):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()  # chave -> (valor, instante, tamanho)
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+
+    def obter(self, chave):
+        """
+        Retorna (True, valor) se a chave estiver no cache e válida; senão (False, None).
+        """
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is not None and self.ttl is not None and time.monotonic() - item[1] > self.ttl:
+                self._remover(chave)
+                item = None
+            if item is None:
+                self.falhas += 1
+                return False, None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return True, item[0]
+
+    def guardar(self, chave, valor):
+        """
+        Guarda o valor e despeja as entradas mais antigas até respeitar os limites.
+        Valores maiores que o limite de memória inteiro não são guardados.
+        """
+        tamanho = self._tamanho(valor) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and tamanho > self.max_bytes:
+            return
+        with self._trava:
+            if chave in self._itens:
+                self._remover(chave)
+            self._itens[chave] = (valor, time.monotonic(), tamanho)
+            self._bytes += tamanho
+            while len(self._itens) > self.max_itens or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._remover(next(iter(self._itens)))
+                self.despejos += 1
+
+    def limpar(self):
+        """
+        Remove todas as entradas (ex.: quando o conjunto de dados é recarregado).
+        """
+        with self._trava:
+            self._itens.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        """
+        Contadores para dimensionar o cache: acertos, falhas, despejos, ocupação.
+        """
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'despejos': self.despejos,
+                'itens': len(self._itens),
+                'max_itens': self.max_itens,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _remover(self, chave):
+        _, _, tamanho = self._itens.pop(chave)
+        self._bytes -= tamanho
+
+    @staticmethod
+    def _tamanho(valor):
+        try:
+            return len(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return 0
@@ -0,0 +1,96 @@
+from decimal import Decimal, ROUND_HALF_EVEN
+
+import numpy as np
+from babel.core import Locale
+from babel.numbers import format_currency, get_currency_symbol
+
+# Padrão de moeda BRL/pt_BR resolvido uma única vez a partir do Babel
+# (o Babel refaz essa resolução a cada chamada de format_currency).
+_MOEDA = 'BRL'
+_LOCALE = 'pt_BR'
+_locale = Locale.parse(_LOCALE)
+_padrao = _locale.currency_formats['standard']
+_simbolo = get_currency_symbol(_MOEDA, _LOCALE)
+_PREFIXOS = tuple(p.replace('¤', _simbolo) for p in _padrao.prefix)  # (positivo, negativo)
+_SUFIXOS = tuple(s.replace('¤', _simbolo) for s in _padrao.suffix)
+_SEPARADOR_MILHAR = _locale.number_symbols['latn']['group']
+_SEPARADOR_DECIMAL = _locale.number_symbols['latn']['decimal']
+
+# O caminho rápido só vale para o padrão usual "¤ #,##0.00"; qualquer outro
+# formato é delegado ao Babel.
+_PADRAO_SIMPLES = _padrao.grouping == (3, 3) and _padrao.frac_prec == (2, 2) and _padrao.int_prec[0] == 1
+
+# Abaixo deste valor absoluto o arredondamento em ponto flutuante (valor * 100)
+# é seguro, exceto perto de um empate (ver formatar_brl_array).
+_LIMITE_RAPIDO = 1e9
+_MARGEM_EMPATE = 1e-4
+_CENTAVO = Decimal(1)
+
+
+def _montar(negativo, centavos):
+    """
+    Monta o texto a partir do sinal e do valor absoluto em centavos.
+    """
+    inteiro, fracao = divmod(centavos, 100)
+    texto_inteiro = f"{inteiro:,}".replace(',', _SEPARADOR_MILHAR)
+    return f"{_PREFIXOS[negativo]}{texto_inteiro}{_SEPARADOR_DECIMAL}{fracao:02d}{_SUFIXOS[negativo]}"
+
+
+def formatar_brl(valor):
+    """
+    Formata um valor como moeda brasileira (ex.: 'R$ 1.234,56'), com o mesmo
+    resultado, byte a byte, de format_currency(valor, 'BRL', locale='pt_BR').
+    Assim como o Babel, arredonda a representação decimal do número (str)
+    com arredondamento bancário (meio para o par).
+    """
+    if not _PADRAO_SIMPLES:
+        return format_currency(valor, _MOEDA, locale=_LOCALE)
+    try:
+        if isinstance(valor, (int, np.integer)) and not isinstance(valor, bool):
+            return _montar(bool(valor < 0), abs(int(valor)) * 100)
+        decimal = Decimal(str(valor))
+        if not decimal.is_finite():
+            return format_currency(valor, _MOEDA, locale=_LOCALE)
+        centavos = int(abs(decimal).scaleb(2).quantize(_CENTAVO, rounding=ROUND_HALF_EVEN))
+        return _montar(bool(decimal.is_signed()), centavos)
+    except Exception:
+        return format_currency(valor, _MOEDA, locale=_LOCALE)
+
+
+def formatar_brl_array(valores):
+    """
+    Formata um array (ou Series) de valores como moeda brasileira, com o mesmo
+    resultado de formatar_brl/format_currency para cada elemento.
+
+    Sinal e centavos são calculados de forma vetorizada; apenas valores muito
+    grandes, próximos de um empate no arredondamento ou não finitos seguem
+    elemento a elemento pelo caminho exato (Decimal).
+
+    :return: Lista de strings
+    """
+    valores = np.asarray(valores)
+    if not _PADRAO_SIMPLES or valores.dtype.kind not in 'iuf':
+        return [formatar_brl(v) for v in valores.tolist()]
+
+    if valores.dtype.kind in 'iu':
+        if valores.size and np.abs(valores).max() >= 2 ** 62 // 100:
+            return [formatar_brl(v) for v in valores.tolist()]
+        centavos = np.abs(valores.astype(np.int64)) * 100
+        negativos = valores < 0
+        return [_montar(n, c) for n, c in zip(negativos.tolist(), centavos.tolist())]
+
+    if valores.dtype != np.float64:
+        # str() de um float32 difere do str() do mesmo valor em float64
+        return [formatar_brl(v) for v in valores]
+
+    with np.errstate(invalid='ignore'):
+        escalado = np.abs(valores) * 100
+        centavos = np.rint(escalado)
+        distancia_empate = np.abs(escalado - np.floor(escalado) - 0.5)
+        rapido = (np.abs(valores) < _LIMITE_RAPIDO) & (distancia_empate > _MARGEM_EMPATE)
+    negativos = np.signbit(valores)
+
+    resultado = []
+    for valor, n, c, r in zip(valores.tolist(), negativos.tolist(), centavos.tolist(), rapido.tolist()):
+        resultado.append(_montar(n, int(c)) if r else formatar_brl(valor))
+    return resultado
@@ -1,20 +1,30 @@
+import numpy as np
+
+def _dividir(numerador, denominador):
+    """
+    Divide retornando 0 onde o denominador é zero.
+    Escalares lançariam ZeroDivisionError, mas Series/arrays devolvem inf/NaN;
+    aqui os dois casos são tratados da mesma forma.
+    """
+    if np.ndim(denominador) == 0:
+        return numerador / denominador if denominador != 0 else 0 * numerador
+    with np.errstate(divide='ignore', invalid='ignore'):
+        resultado = numerador / denominador
+    if hasattr(resultado, 'mask'):  # pandas Series
+        return resultado.mask(denominador == 0, 0)
+    return np.where(denominador == 0, 0, resultado)
+
 def calcular_ocupacao(quartos_ocupados, total_quartos):
     """
     Calcula a taxa de ocupação.
     """
-    try:
-        return (quartos_ocupados / total_quartos) * 100
-    except ZeroDivisionError:
-        return 0  # Retorna 0 se total_quartos for zero
+    return _dividir(quartos_ocupados, total_quartos) * 100  # 0 se total_quartos for zero
 
 def calcular_adr(receita_quartos_dia, quartos_ocupados_dia):
     """
     Calcula a diária média (ADR).
     """
-    try:
-        return receita_quartos_dia / quartos_ocupados_dia
-    except ZeroDivisionError:
-        return 0  # Retorna 0 se quartos_ocupados for zero
+    return _dividir(receita_quartos_dia, quartos_ocupados_dia)  # 0 se quartos_ocupados for zero
 
 def calcular_revpar(adr, ocupacao):
     """
@@ -26,10 +36,7 @@ def calcular_trevpar(receita_total, total_quartos):
     """
     Calcula a receita total por quarto disponível (TRevPAR).
     """
-    try:
-        return receita_total / total_quartos
-    except ZeroDivisionError:
-        return 0  # Retorna 0 se total_quartos for zero
+    return _dividir(receita_total, total_quartos)  # 0 se total_quartos for zero
 
 def calcular_gop(receita_total, custos_operacionais):
     """
@@ -41,7 +48,4 @@ def calcular_goppar(gop, total_quartos):
     """
     Calcula o lucro operacional bruto por quarto disponível (GOPPAR).
     """
-    try:
-        return gop / total_quartos
-    except ZeroDivisionError:
-        return 0  # Retorna 0 se total_quartos for zero
+    return _dividir(gop, total_quartos)  # 0 se total_quartos for zero
@@ -0,0 +1,173 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+# Instrumentação das etapas do conteúdo principal: tempo, linhas lidas, bytes da
+# resposta e variação de memória de cada etapa, expostos em /metrics (formato de
+# texto do Prometheus) e em um log JSON por callback.
+#   HOTEL_INSTRUMENTACAO=1        liga (variação de memória pelo RSS do processo)
+#   HOTEL_INSTRUMENTACAO=memoria  liga e mede as alocações pelo tracemalloc (mais lento)
+# Desligada (padrão), `medido` devolve a própria função, sem nenhum invólucro:
+# o custo é zero. A escolha vale para o processo inteiro (lida na importação).
+MODO = os.environ.get('HOTEL_INSTRUMENTACAO', '').strip().lower()
+ATIVA = MODO not in ('', '0', 'false', 'nao', 'não')
+MEDIR_ALOCACOES = MODO == 'memoria'
+
+# Limites (em segundos) dos intervalos do histograma de duração
+LIMITES_SEGUNDOS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+logger = logging.getLogger('hotel.instrumentacao')
+
+# Acumulados por etapa (contagem, soma de segundos, histograma, linhas, bytes, memória)
+_etapas = {}
+_trava = threading.Lock()
+
+# Pilha das etapas em andamento em cada thread: a etapa mais externa (o
+# callback) recebe as internas e gera uma linha de log com todas
+_local = threading.local()
+
+if ATIVA:
+    if not logger.handlers:
+        manipulador = logging.StreamHandler()
+        manipulador.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(manipulador)
+        logger.propagate = False
+    logger.setLevel(logging.INFO)
+    if MEDIR_ALOCACOES and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def _memoria_atual():
+    """
+    Bytes alocados (tracemalloc) ou residentes (RSS, em /proc) no momento;
+    None onde nenhum dos dois está disponível.
+    """
+    if MEDIR_ALOCACOES:
+        return tracemalloc.get_traced_memory()[0]
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def tamanho_json(valor):
+    """
+    Bytes da resposta serializada como o Dash a envia (plotly.io.json), e o
+    tempo gasto na serialização.
+    """
+    from plotly.io.json import to_json_plotly
+    inicio = time.perf_counter()
+    texto = to_json_plotly(valor)
+    return len(texto.encode('utf-8')), time.perf_counter() - inicio
+
+
+def _acumular(registro):
+    with _trava:
+        acumulado = _etapas.get(registro['etapa'])
+        if acumulado is None:
+            acumulado = _etapas[registro['etapa']] = {
+                'contagem': 0, 'segundos': 0.0, 'intervalos': [0] * len(LIMITES_SEGUNDOS),
+                'linhas': 0, 'bytes': 0, 'memoria': 0,
+            }
+        acumulado['contagem'] += 1
+        acumulado['segundos'] += registro['segundos']
+        for i, limite in enumerate(LIMITES_SEGUNDOS):
+            if registro['segundos'] <= limite:
+                acumulado['intervalos'][i] += 1
+        acumulado['linhas'] += registro.get('linhas') or 0
+        acumulado['bytes'] += registro.get('bytes') or 0
+        acumulado['memoria'] += registro.get('memoria_bytes') or 0
+
+
+def medido(etapa, linhas=None, resposta=False):
+    """
+    Decorador que mede cada chamada da função como a etapa `etapa`.
+
+    :param linhas: Função (resultado, *args, **kwargs) -> número de linhas lidas pela etapa
+    :param resposta: Se True, mede também o tamanho e o tempo de serialização
+                     JSON do resultado (a resposta de um callback)
+    """
+    def decorar(funcao):
+        if not ATIVA:
+            return funcao
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            pilha = getattr(_local, 'pilha', None)
+            if pilha is None:
+                pilha = _local.pilha = []
+            registro = {'etapa': etapa, 'segundos': 0.0}
+            pilha.append(registro)
+            memoria = _memoria_atual()
+            inicio = time.perf_counter()
+            try:
+                resultado = funcao(*args, **kwargs)
+            finally:
+                registro['segundos'] = time.perf_counter() - inicio
+                if memoria is not None:
+                    registro['memoria_bytes'] = _memoria_atual() - memoria
+                pilha.pop()
+
+            if linhas is not None:
+                registro['linhas'] = int(linhas(resultado, *args, **kwargs))
+            if resposta:
+                registro['bytes'], segundos = tamanho_json(resultado)
+                serializacao = {'etapa': 'serializacao_json', 'segundos': segundos, 'bytes': registro['bytes']}
+                _acumular(serializacao)
+                registro.setdefault('etapas', []).append(serializacao)
+            _acumular(registro)
+
+            if pilha:
+                pilha[-1].setdefault('etapas', []).append(registro)
+            else:
+                logger.info(json.dumps({'momento': time.time(), 'pid': os.getpid(), **registro}))
+            return resultado
+
+        return medida
+    return decorar
+
+
+def _amostras(nome, tipo, ajuda, amostras):
+    linhas = [f'# HELP {nome} {ajuda}', f'# TYPE {nome} {tipo}']
+    linhas += [f'{nome}{rotulos} {valor}' for rotulos, valor in amostras]
+    return linhas
+
+
+def texto_prometheus(extras=None):
+    """
+    Métricas acumuladas no formato de texto do Prometheus (um processo: com
+    vários workers do gunicorn, cada coleta mostra o worker que a atendeu).
+
+    :param extras: Lista opcional de (nome, tipo, ajuda, valor) sem rótulos
+    """
+    with _trava:
+        etapas = {etapa: dict(acumulado, intervalos=list(acumulado['intervalos']))
+                  for etapa, acumulado in sorted(_etapas.items())}
+
+    duracao = []
+    for etapa, acumulado in etapas.items():
+        for limite, quantidade in zip(LIMITES_SEGUNDOS, acumulado['intervalos']):
+            duracao.append((f'_bucket{{etapa="{etapa}",le="{limite}"}}', quantidade))
+        duracao.append((f'_bucket{{etapa="{etapa}",le="+Inf"}}', acumulado['contagem']))
+        duracao.append((f'_sum{{etapa="{etapa}"}}', round(acumulado['segundos'], 6)))
+        duracao.append((f'_count{{etapa="{etapa}"}}', acumulado['contagem']))
+
+    linhas = ['# HELP hotel_etapa_segundos Duração de cada etapa do dashboard',
+              '# TYPE hotel_etapa_segundos histogram']
+    linhas += [f'hotel_etapa_segundos{sufixo} {valor}' for sufixo, valor in duracao]
+    linhas += _amostras('hotel_etapa_linhas_total', 'counter', 'Linhas lidas pela etapa',
+                        [(f'{{etapa="{e}"}}', a['linhas']) for e, a in etapas.items()])
+    linhas += _amostras('hotel_etapa_bytes_total', 'counter', 'Bytes da resposta JSON da etapa',
+                        [(f'{{etapa="{e}"}}', a['bytes']) for e, a in etapas.items()])
+    origem = 'alocados (tracemalloc)' if MEDIR_ALOCACOES else 'residentes (RSS)'
+    linhas += _amostras('hotel_etapa_memoria_bytes', 'gauge', f'Soma da variação de bytes {origem} na etapa',
+                        [(f'{{etapa="{e}"}}', a['memoria']) for e, a in etapas.items()])
+    for nome, tipo, ajuda, valor in extras or []:
+        linhas += _amostras(nome, tipo, ajuda, [('', valor)])
+    return '\n'.join(linhas) + '\n'
+
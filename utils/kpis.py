@@ -0,0 +1,61 @@
+import numpy as np
+
+# Ordem das linhas da matriz de saída de calcular_kpis
+SAIDAS = ['Ocupacao', 'ADR', 'RevPAR', 'TRevPAR']
+
+
+def alocar_saida(n, dtype=np.float64):
+    """
+    Aloca a matriz (len(SAIDAS), n) onde calcular_kpis grava os resultados.
+    Reaproveitá-la entre chamadas evita novas alocações.
+    """
+    return np.empty((len(SAIDAS), n), dtype=dtype)
+
+
+def _dividir_em(numerador, denominador, out):
+    """
+    Divide elemento a elemento gravando em `out`; onde o denominador é zero o
+    resultado é 0 (e não inf/NaN, como aconteceria com arrays e Series).
+    """
+    out.fill(0)
+    np.divide(numerador, denominador, out=out, where=denominador != 0)
+    return out
+
+
+def calcular_kpis(quartos_ocupados, total_quartos, receita_quartos, receita_total, dtype=np.float64, out=None):
+    """
+    Calcula Ocupação (%), ADR, RevPAR e TRevPAR de todas as linhas de uma vez,
+    com os denominadores zero tratados explicitamente (resultado 0).
+
+    :param quartos_ocupados: Quartos ocupados no dia (array ou Series)
+    :param total_quartos: Total de quartos do hotel
+    :param receita_quartos: Receita de quartos do dia
+    :param receita_total: Receita total do dia
+    :param dtype: np.float64 (padrão) ou np.float32
+    :param out: Matriz pré-alocada (ver alocar_saida); se None, é alocada aqui
+    :return: Matriz (len(SAIDAS), n) com uma linha por KPI, na ordem de SAIDAS
+    """
+    quartos_ocupados = np.asarray(quartos_ocupados)
+    total_quartos = np.asarray(total_quartos)
+    receita_quartos = np.asarray(receita_quartos)
+    receita_total = np.asarray(receita_total)
+
+    if out is None:
+        out = alocar_saida(len(quartos_ocupados), dtype)
+    ocupacao, adr, revpar, trevpar = out
+
+    _dividir_em(quartos_ocupados, total_quartos, ocupacao)
+    ocupacao *= 100
+    _dividir_em(receita_quartos, quartos_ocupados, adr)
+    np.divide(ocupacao, 100, out=revpar)
+    revpar *= adr
+    _dividir_em(receita_total, total_quartos, trevpar)
+    return out
+
+
+def como_colunas(matriz):
+    """
+    Retorna {nome do KPI: linha da matriz} para atribuir as colunas a um DataFrame.
+    """
+    return dict(zip(SAIDAS, matriz))
+
@@ -0,0 +1,83 @@
+import numpy as np
+
+
+def _como_float(valores):
+    """
+    Converte valores numéricos ou datas (datetime64) em um array float64.
+    """
+    valores = np.asarray(valores)
+    if np.issubdtype(valores.dtype, np.datetime64):
+        valores = valores.astype('datetime64[ns]').astype(np.int64)
+    return valores.astype(np.float64)
+
+
+def indices_lttb(x, y, n_pontos):
+    """
+    Seleciona `n_pontos` índices pela técnica Largest-Triangle-Three-Buckets (LTTB),
+    que preserva a forma visual da série: em cada balde escolhe o ponto que forma o
+    maior triângulo com o ponto escolhido antes e a média do balde seguinte.
+
+    :param x: Valores do eixo X, em ordem crescente (números ou datas)
+    :param y: Valores do eixo Y
+    :param n_pontos: Quantidade de pontos desejada (inclui o primeiro e o último)
+    :return: Array de índices (int64) em ordem crescente
+    """
+    n = len(x)
+    if n_pontos >= n or n_pontos < 3:
+        return np.arange(n)
+
+    x = _como_float(x)
+    y = _como_float(y)
+    limites = np.linspace(1, n - 1, n_pontos - 1).astype(np.int64)
+
+    indices = np.empty(n_pontos, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_pontos - 2):
+        ini, fim = limites[i], limites[i + 1]
+        prox_fim = limites[i + 2] if i + 2 < len(limites) else n
+        mx = x[fim:prox_fim].mean()
+        my = y[fim:prox_fim].mean()
+        areas = np.abs((x[a] - mx) * (y[ini:fim] - y[a]) - (x[a] - x[ini:fim]) * (my - y[a]))
+        a = ini + int(np.argmax(areas))
+        indices[i + 1] = a
+    return indices
+
+
+def indices_minmax(x, y, n_pontos):
+    """
+    Seleciona até `n_pontos` índices guardando o mínimo e o máximo de Y em cada um
+    de `(n_pontos - 2) // 2` baldes de tamanho igual, além do primeiro e do último
+    pontos (preserva picos e vales).
+
+    :return: Array de índices (int64) em ordem crescente
+    """
+    n = len(x)
+    n_baldes = (n_pontos - 2) // 2
+    if n_pontos >= n or n_baldes < 1:
+        return np.arange(n)
+
+    y = _como_float(y)
+    baldes = (np.arange(n) * n_baldes) // n
+    ordem = np.lexsort((y, baldes))
+    inicios = np.searchsorted(baldes[ordem], np.arange(n_baldes), side='left')
+    fins = np.searchsorted(baldes[ordem], np.arange(n_baldes), side='right')
+    selecionados = np.concatenate([ordem[inicios], ordem[fins - 1], [0, n - 1]])
+    return np.unique(selecionados)
+
+
+METODOS = {
+    'lttb': indices_lttb,
+    'minmax': indices_minmax,
+}
+
+
+def reduzir(df, x, y, max_pontos, metodo='lttb'):
+    """
+    Reduz o DataFrame a no máximo `max_pontos` linhas pelo método escolhido
+    ('lttb' ou 'minmax'). O DataFrame deve estar ordenado por `x`.
+    """
+    if max_pontos is None or len(df) <= max_pontos:
+        return df
+    indices = METODOS[metodo](df[x].to_numpy(), df[y].to_numpy(), max_pontos)
+    return df.iloc[indices]
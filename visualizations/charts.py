@@ -1,6 +1,8 @@
-import plotly.express as px
+from utils import instrumentacao
+from visualizations import amostragem
 
-def create_line_chart(df, x, y, title):
+@instrumentacao.medido('create_line_chart', linhas=lambda fig, df, *a, **k: len(df))
+def create_line_chart(df, x, y, title, max_pontos=None, metodo='lttb'):
     """
     Cria um gráfico de linhas (line chart) com os dados fornecidos, aplicando estilo e formatação.
     
@@ -8,14 +10,22 @@ def create_line_chart(df, x, y, title):
     :param x: Nome da coluna para o eixo X
     :param y: Nome da coluna para o eixo Y
     :param title: Título do gráfico
+    :param max_pontos: Se informado, reduz a série no servidor a no máximo esse número
+                       de pontos antes de enviá-la ao navegador (DataFrame ordenado por x)
+    :param metodo: Método de redução: 'lttb' (Largest-Triangle-Three-Buckets) ou 'minmax'
     :return: Objeto Figure do Plotly com o gráfico de linhas
     """
+    # Importado na primeira chamada: o plotly.express leva ~0,2 s para carregar
+    import plotly.express as px
     try:
         # Verifica se o DataFrame está vazio
         if df.empty:
             print("DataFrame vazio em create_line_chart(). Retornando gráfico em branco.")
             return px.line()
 
+        # Reduz a quantidade de pontos (orçamento ~ largura do gráfico em pixels)
+        df = amostragem.reduzir(df, x, y, max_pontos, metodo)
+
         # Cria o gráfico de linhas
         fig = px.line(df, x=x, y=y, title=title)
         
@@ -37,6 +47,7 @@ def create_line_chart(df, x, y, title):
         print(f"Erro ao criar o gráfico de linhas: {e}")
         return None
 
+@instrumentacao.medido('create_pie_chart', linhas=lambda fig, df, *a, **k: len(df))
 def create_pie_chart(df, names, values, title):
     """
     Cria um gráfico de pizza/doce (pie chart) com os dados fornecidos, aplicando estilo e formatação.
@@ -47,6 +58,7 @@ def create_pie_chart(df, names, values, title):
     :param title: Título do gráfico
     :return: Objeto Figure do Plotly com o gráfico de pizza (ou rosca, se houver 'hole')
     """
+    import plotly.express as px
     try:
         # Verifica se o DataFrame está vazio
         if df.empty:
@@ -77,3 +89,43 @@ def create_pie_chart(df, names, values, title):
     except Exception as e:
         print(f"Erro ao criar o gráfico de pizza: {e}")
         return None
+
+@instrumentacao.medido('create_forecast_chart', linhas=lambda fig, historico, previsao, *a, **k: len(historico) + len(previsao))
+def create_forecast_chart(historico, previsao, y, title, max_pontos=None):
+    """
+    Cria o gráfico de previsão: histórico recente, previsão e a faixa do
+    intervalo de previsão, com o mesmo estilo do gráfico de linhas.
+
+    :param historico: DataFrame com 'data' e `y` (valores observados)
+    :param previsao: DataFrame com 'data', 'previsao', 'inferior' e 'superior'
+    :param y: Nome da coluna de valores do histórico
+    :param title: Título do gráfico
+    :param max_pontos: Se informado, reduz o histórico a no máximo esse número de pontos
+    :return: Objeto Figure do Plotly
+    """
+    import plotly.graph_objects as go
+    try:
+        historico = amostragem.reduzir(historico, 'data', y, max_pontos, 'lttb')
+        fig = go.Figure([
+            go.Scatter(x=historico['data'], y=historico[y], name='Histórico', mode='lines',
+                       line=dict(width=2, color='#1f77b4')),
+            go.Scatter(x=previsao['data'], y=previsao['superior'], mode='lines', line=dict(width=0),
+                       showlegend=False, hoverinfo='skip'),
+            go.Scatter(x=previsao['data'], y=previsao['inferior'], name='Intervalo de 95%', mode='lines',
+                       line=dict(width=0), fill='tonexty', fillcolor='rgba(255,127,14,0.2)'),
+            go.Scatter(x=previsao['data'], y=previsao['previsao'], name='Previsão', mode='lines',
+                       line=dict(width=2, color='#ff7f0e', dash='dash')),
+        ])
+        fig.update_layout(
+            title=dict(text=title, font=dict(size=16)),
+            title_x=0.5,
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(size=14),
+            legend=dict(font=dict(size=14)),
+            hovermode='x unified'
+        )
+        return fig
+    except Exception as e:
+        print(f"Erro ao criar o gráfico de previsão: {e}")
+        return None
@@ -0,0 +1,14 @@
+"""
+wsgi.py
+
+Ponto de entrada para servidores WSGI de produção. Exemplo:
+  gunicorn -c gunicorn.conf.py wsgi:server
+
+Os dados são carregados em create_app(); com `preload_app = True` (gunicorn.conf.py)
+isso acontece uma única vez no processo mestre, antes do fork dos workers.
+"""
+
+from app import create_app
+
+app = create_app()
+server = app.server